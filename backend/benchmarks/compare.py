@@ -0,0 +1,45 @@
+"""Compare two benchmark result files
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+METRICS = ['p50_ms', 'p99_ms', 'mean_ms', 'requests_per_sec']
+
+def load_results(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(row['mode'], row['endpoint']): row for row in report['results']}
+
+def change(before, after):
+    if not before or after is None:
+        return '    n/a'
+    return f'{(after - before) / before * 100:+6.1f}%'
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    baseline_report, baseline = load_results(args.baseline)
+    candidate_report, candidate = load_results(args.candidate)
+
+    print(f"baseline  {baseline_report['meta'].get('git_revision')}  size={baseline_report['meta']['size']:,}")
+    print(f"candidate {candidate_report['meta'].get('git_revision')}  size={candidate_report['meta']['size']:,}")
+    print()
+    print(f"{'mode':7} {'endpoint':16} " + ' '.join(f'{metric:>26}' for metric in METRICS))
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        cells = [
+            f"{before[metric]!s:>8} -> {after[metric]!s:>8} {change(before[metric], after[metric])}"
+            for metric in METRICS
+        ]
+        print(f'{key[0]:7} {key[1]:16} ' + ' '.join(cells))
+
+    for side, report in (('baseline', baseline_report), ('candidate', candidate_report)):
+        print(f"peak RSS ({side}): " + ', '.join(f'{k}={v} MB' for k, v in report['peak_rss_mb'].items()))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""Benchmark the /api/esg endpoints against a synthetic universe
+
+Run from the backend directory:
+
+    python -m benchmarks.run --size 1k --mode client
+    python -m benchmarks.run --size 100k --mode server --server wsgi --workers 4 --concurrency 16
+    python -m benchmarks.run --size 1m --mode both --output results.json
+    python -m benchmarks.compare before.json after.json
+
+Results are written as JSON: per endpoint p50/p90/p99/mean latency in ms,
+requests/sec and error count, plus peak RSS of the process(es) serving
+the requests.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from benchmarks.seed import parse_size, symbol_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BACKEND_DIR, 'src')
+
+BATCH_SIZE = 100
+SERVER_START_TIMEOUT = 120
+
+
+class Scenario:
+    """One endpoint under test; make_request(rng) returns (path, json_body)"""
+
+    def __init__(self, name, method, make_request):
+        self.name = name
+        self.method = method
+        self.make_request = make_request
+
+
+def build_scenarios(size):
+    def any_symbol(rng):
+        return symbol_for(rng.randrange(size))
+
+    return [
+        Scenario('analyze', 'POST', lambda rng: ('/api/esg/analyze?wait=30', {'symbol': any_symbol(rng)})),
+        Scenario('batch', 'POST', lambda rng: (
+            '/api/esg/analyze/batch',
+            {'symbols': [any_symbol(rng) for _ in range(BATCH_SIZE - 10)] + [f'X{i}' for i in range(10)]}
+        )),
+        Scenario('rankings', 'GET', lambda rng: (
+            f'/api/esg/rankings?limit=100&offset={rng.randrange(max(1, min(size, 10_000) - 100))}', None
+        )),
+        Scenario('rankings_sector', 'GET', lambda rng: ('/api/esg/rankings?limit=100&sector=Energy', None)),
+        Scenario('sectors', 'GET', lambda rng: ('/api/esg/sectors', None)),
+        Scenario('metrics', 'GET', lambda rng: ('/api/esg/metrics', None)),
+        Scenario('trends', 'GET', lambda rng: ('/api/esg/trends?granularity=day', None)),
+        Scenario('trends_symbol', 'GET', lambda rng: (
+            f'/api/esg/trends?granularity=day&symbol={any_symbol(rng)}', None
+        ))
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(name, mode, latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    to_ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'endpoint': name,
+        'mode': mode,
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': to_ms(percentile(latencies, 0.50)),
+        'p90_ms': to_ms(percentile(latencies, 0.90)),
+        'p99_ms': to_ms(percentile(latencies, 0.99)),
+        'mean_ms': to_ms(sum(latencies) / len(latencies)) if latencies else None,
+        'requests_per_sec': round((len(latencies) + errors) / elapsed, 1) if elapsed else None
+    }
+
+
+class ClientDriver:
+    """Drives the Flask app in-process through its test client (one request at a time)"""
+
+    mode = 'client'
+
+    def __init__(self):
+        sys.path.insert(0, SRC_DIR)
+        from main import app
+        self.client = app.test_client()
+
+    def request(self, method, path, body):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code
+
+    def run(self, scenario, count, concurrency, rng):
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(count):
+            path, body = scenario.make_request(rng)
+            request_started = time.perf_counter()
+            status = self.request(scenario.method, path, body)
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - request_started)
+        return latencies, errors, time.perf_counter() - started
+
+    def peak_rss_mb(self):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class HttpDriver:
+    """Drives a running server over HTTP with a pool of client threads"""
+
+    mode = 'server'
+
+    def __init__(self, base_url, rss_sampler=None):
+        self.base_url = base_url
+        self.rss_sampler = rss_sampler
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _one(self, scenario, seed):
+        path, body = scenario.make_request(random.Random(seed))
+        started = time.perf_counter()
+        try:
+            response = self._session().request(scenario.method, self.base_url + path, json=body, timeout=60)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    def run(self, scenario, count, concurrency, rng):
+        seeds = [rng.random() for _ in range(count)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda seed: self._one(scenario, seed), seeds))
+        elapsed = time.perf_counter() - started
+        latencies = [latency for ok, latency in outcomes if ok]
+        return latencies, count - len(latencies), elapsed
+
+    def peak_rss_mb(self):
+        return self.rss_sampler.peak_mb if self.rss_sampler else None
+
+
+class RssSampler(threading.Thread):
+    """Tracks the peak combined RSS of a process tree by polling /proc (Linux only)"""
+
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stopped = threading.Event()
+
+    def _tree(self, pid):
+        pids = [pid]
+        try:
+            with open(f'/proc/{pid}/task/{pid}/children') as f:
+                for child in f.read().split():
+                    pids.extend(self._tree(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    def _rss_kb(self, pid):
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def run(self):
+        while not self._stopped.is_set():
+            total_kb = sum(self._rss_kb(pid) for pid in self._tree(self.pid))
+            self.peak_mb = max(self.peak_mb, round(total_kb / 1024, 1))
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, workers, env):
+    """Start gunicorn (sync WSGI or uvicorn ASGI workers) and wait until it answers"""
+    port = _free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}']
+    if kind == 'asgi':
+        command += ['-k', 'uvicorn.workers.UvicornWorker', 'src.asgi:app']
+    else:
+        command += ['--threads', '4', 'src.main:app']
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{kind} server exited with status {process.returncode}')
+        try:
+            requests.get(base_url + '/api/esg/sectors', timeout=2)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'{kind} server did not start within {SERVER_START_TIMEOUT}s')
+
+
+def run_suite(driver, scenarios, count, concurrency, warmup, seed):
+    results = []
+    for scenario in scenarios:
+        rng = random.Random(seed)
+        if warmup:
+            driver.run(scenario, warmup, concurrency, rng)
+        latencies, errors, elapsed = driver.run(scenario, count, concurrency, rng)
+        result = summarize(scenario.name, driver.mode, latencies, errors, elapsed)
+        print(f"   {driver.mode:6} {scenario.name:16} p50={result['p50_ms']}ms "
+              f"p99={result['p99_ms']}ms {result['requests_per_sec']} req/s errors={errors}",
+              file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ESG API endpoints')
+    parser.add_argument('--size', default='1k', help='Universe size: 1k, 100k, 1m or a number')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='client')
+    parser.add_argument('--server', choices=['wsgi', 'asgi'], default='wsgi', help='Server flavour for --mode server')
+    parser.add_argument('--workers', type=int, default=4, help='Server worker processes')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads for --mode server')
+    parser.add_argument('--endpoints', help='Comma-separated subset of endpoints to run')
+    parser.add_argument('--database-url', help='Use this database instead of a temporary SQLite file')
+    parser.add_argument('--skip-seed', action='store_true', help='Reuse the data already in --database-url')
+    parser.add_argument('--history-days', type=int, default=3, help='Daily snapshots seeded for trends')
+    parser.add_argument('--analysis-delay', type=float, default=0.0, help='ESG_ANALYSIS_DELAY for the app')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the response cache (TTL 0)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for request parameters')
+    parser.add_argument('--output', help='Write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    scenarios = build_scenarios(size)
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    workdir = tempfile.mkdtemp(prefix='esg-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        ESG_ANALYSIS_DELAY=str(args.analysis_delay),
+        PYTHONPATH=BACKEND_DIR
+    )
+    if args.no_cache:
+        env['ESG_RESPONSE_CACHE_TTL'] = '0'
+
+    if not args.skip_seed:
+        # Seed in a child process so its memory does not count towards peak RSS
+        print(f"🌱 Seeding {size:,} companies into {database_url}", file=sys.stderr)
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.seed', '--size', str(size),
+             '--history-days', str(args.history_days)],
+            cwd=BACKEND_DIR, env=env, check=True
+        )
+
+    report = {
+        'meta': {
+            'size': size,
+            'mode': args.mode,
+            'server': args.server if args.mode != 'client' else None,
+            'workers': args.workers if args.mode != 'client' else None,
+            'concurrency': args.concurrency if args.mode != 'client' else 1,
+            'requests_per_endpoint': args.requests,
+            'response_cache': not args.no_cache,
+            'analysis_delay': args.analysis_delay,
+            'database': database_url.split(':', 1)[0],
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'started_at': datetime.utcnow().isoformat()
+        },
+        'results': [],
+        'peak_rss_mb': {}
+    }
+
+    if args.mode in ('server', 'both'):
+        process, base_url = start_server(args.server, args.workers, env)
+        sampler = RssSampler(process.pid)
+        sampler.start()
+        try:
+            driver = HttpDriver(base_url, sampler)
+            report['results'] += run_suite(driver, scenarios, args.requests, args.concurrency, args.warmup, args.seed)
+            report['peak_rss_mb']['server'] = driver.peak_rss_mb()
+        finally:
+            sampler.stop()
+            process.terminate()
+            process.wait(timeout=30)
+
+    if args.mode in ('client', 'both'):
+        os.environ.update(env)
+        driver = ClientDriver()
+        report['results'] += run_suite(driver, scenarios, args.requests, 1, args.warmup, args.seed)
+        report['peak_rss_mb']['client'] = driver.peak_rss_mb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"✅ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+SECTORS = [
+    'Technology', 'Healthcare', 'Financial Services', 'Energy', 'Consumer Goods',
+    'Automotive', 'E-commerce', 'Media & Entertainment', 'Industrials', 'Utilities'
+]
+GOALS = [
+    'Net zero emissions by 2030', 'Carbon neutral by 2030', '100% renewable energy',
+    'Zero waste operations', 'Water positive by 2030', 'Sustainable supply chain',
+    'Diverse workforce', 'Ethical AI development'
+]
+INITIATIVES = [
+    'Battery recycling program', 'Renewable energy projects', 'Supplier diversity',
+    'Transparent reporting', 'Employee wellbeing', 'Climate Innovation Fund',
+    'STEM education programs', 'Electric delivery fleet'
+]
+
+# Named universe sizes accepted on the command line
+UNIVERSES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000
+}
+
+def symbol_for(i):
+    """Synthetic ticker for row i, unique and at most 10 characters"""
+    return f'B{i:07d}'
+
+def synthetic_companies(count, seed=42):
+    """Yield count reproducible company records in loader format"""
+    rng = random.Random(seed)
+    for i in range(count):
+        environmental = rng.randint(30, 99)
+        social = rng.randint(30, 99)
+        governance = rng.randint(30, 99)
+        yield {
+            'symbol': symbol_for(i),
+            'name': f'Benchmark Company {i}',
+            'sector': SECTORS[rng.randrange(len(SECTORS))],
+            'environmental': environmental,
+            'social': social,
+            'governance': governance,
+            'carbon_neutral': rng.random() < 0.3,
+            'renewable_energy': rng.randint(0, 100),
+            'sustainability_goals': rng.sample(GOALS, 3),
+            'key_initiatives': rng.sample(INITIATIVES, 3)
+        }
+
+def seed_universe(count, history_days=3, chunk_size=10_000):
+    """Load a synthetic universe plus daily history snapshots into the configured database
+
+    Must run after DATABASE_URL points at the benchmark database, since the
+    app's engine is created on import.
+    """
+    from database.config import engine, init_db
+    from models.esg_sector_summary import rebuild_sector_summaries
+    from models.esg_score_history import snapshot_universe
+    from services.company_loader import iter_chunks, upsert_companies
+
+    init_db()
+    started = time.perf_counter()
+    for rows in iter_chunks(synthetic_companies(count), chunk_size):
+        with engine.begin() as connection:
+            upsert_companies(connection, rows)
+
+    with engine.begin() as connection:
+        rebuild_sector_summaries(connection)
+        now = datetime.utcnow()
+        for day in range(history_days, 0, -1):
+            snapshot_universe(connection, recorded_at=now - timedelta(days=day))
+    return time.perf_counter() - started
+
+def parse_size(value):
+    """Universe size from a name in UNIVERSES or a plain integer"""
+    return UNIVERSES.get(value.lower()) or int(value)
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed a synthetic ESG universe for benchmarking')
+    parser.add_argument('--size', default='1k', help='Universe size: 1k, 100k, 1m or a number')
+    parser.add_argument('--history-days', type=int, default=3, help='Daily score snapshots to record')
+    parser.add_argument('--database-url', help='Target database (default: DATABASE_URL)')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+    count = parse_size(args.size)
+    elapsed = seed_universe(count, history_days=args.history_days)
+    print(f"✅ Seeded {count:,} companies in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import asyncio
+import os
+import re
+import sys
+import time
+# DON'T CHANGE: Add the src directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags
+
+from database.async_config import dispose_async_engine, get_async_sessionmaker
+from main import app as wsgi_app
+from routes.esg import (
+    ANALYSIS_DELAY_SECONDS, MAX_ANALYSIS_WAIT_SECONDS, QUEUE_FULL_RETRY_AFTER, READ_ENDPOINTS,
+    analyze_symbols, batch_payload, cached_analysis, inline_wait, job_payload, portfolio_payload, validate_symbol
+)
+from services import json_codec, live_updates, telemetry
+from services.analysis_jobs import analysis_jobs, QueueFull, RUNNING
+from services.response_cache import (
+    CACHE_CONTROL, DEFAULT_TTL_SECONDS, cache_key, make_entry, response_cache
+)
+
+# Largest request body accepted by the native handlers
+MAX_BODY_BYTES = 1024 * 1024
+# Portfolio requests carry up to ESG_MAX_PORTFOLIO_HOLDINGS holdings
+MAX_PORTFOLIO_BODY_BYTES = 16 * 1024 * 1024
+
+class RequestTooLarge(Exception):
+    pass
+
+STREAM_PATH = '/api/esg/stream'
+
+_JOB_PATH = re.compile(r'^/api/esg/analyze/(?P<job_id>[0-9a-f]{32})$')
+
+class ESGAsgiApp:
+    """ASGI server for the ESG API
+
+    The hot endpoints (analyze, batch, portfolio, rankings, trends, sectors,
+    metrics) run as coroutines on an async database driver and the live
+    update stream is held open without a thread per client; anything else
+    falls through to the Flask app.
+    """
+
+    def __init__(self, flask_app):
+        self.fallback = WsgiToAsgi(flask_app)
+        # Strong references so pending analyses are not garbage collected
+        self._tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return await self.fallback(scope, receive, send)
+
+        native = self._route(scope['method'], scope['path'])
+        if native is None:
+            return await self.fallback(scope, receive, send)
+        route, handler = native
+        # A stream lasts as long as the client stays connected; it would only skew request latencies
+        if telemetry.METRICS_ENABLED and route != STREAM_PATH:
+            return await self._instrumented(route, handler, scope, receive, send)
+        return await self._handle(handler, scope, receive, send)
+
+    def _route(self, method, path):
+        """(route, handler) for requests served natively, None for the Flask fallback"""
+        if method == 'GET' and path in READ_ENDPOINTS:
+            payload_fn = READ_ENDPOINTS[path]
+            return path, lambda scope, receive, send: self._read(scope, send, payload_fn)
+        if method == 'GET' and path == STREAM_PATH:
+            return path, lambda scope, receive, send: self._stream(receive, send)
+        if method == 'POST' and path == '/api/esg/analyze':
+            return path, self._analyze
+        if method == 'POST' and path == '/api/esg/analyze/batch':
+            return path, lambda scope, receive, send: self._analyze_batch(receive, send)
+        if method == 'POST' and path == '/api/esg/portfolio':
+            return path, lambda scope, receive, send: self._portfolio(receive, send)
+        match = _JOB_PATH.match(path)
+        if method == 'GET' and match:
+            job_id = match.group('job_id')
+            return '/api/esg/analyze/<job_id>', lambda scope, receive, send: self._analysis_job(scope, send, job_id)
+        return None
+
+    async def _handle(self, handler, scope, receive, send):
+        """Run a native handler; errors it did not answer itself get the blueprint's JSON 500"""
+        started = False
+
+        async def send_and_track(message):
+            nonlocal started
+            started = started or message['type'] == 'http.response.start'
+            await send(message)
+
+        try:
+            return await handler(scope, receive, send_and_track)
+        except RequestTooLarge:
+            return await _send_json(send, 413, {'error': 'Request body too large'})
+        except Exception as e:
+            if started:
+                raise  # too late for an error response; the server drops the connection
+            return await _send_json(send, 500, {'error': str(e)})
+
+    async def _instrumented(self, route, handler, scope, receive, send):
+        """Run a native handler while recording the same metrics as the Flask hooks"""
+        status = 500
+
+        async def send_and_record_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        stats = telemetry.start_request()
+        try:
+            await self._handle(handler, scope, receive, send_and_record_status)
+        finally:
+            telemetry.finish_request(scope['method'], route, status, time.perf_counter() - started, stats)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await dispose_async_engine()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read(self, scope, send, payload_fn):
+        """Serve a read-only endpoint from the response cache or the async session"""
+        args = _query_args(scope)
+        key = cache_key(scope['path'], args)
+        entry = response_cache.get(key)
+
+        if entry is None:
+            try:
+                async with get_async_sessionmaker()() as session:
+                    payload, headers = await session.run_sync(payload_fn, args)
+            except ValueError as e:
+                return await _send_json(send, 400, {'error': str(e)})
+            except Exception as e:
+                return await _send_json(send, 500, {'error': str(e)})
+            entry = make_entry(_encode(payload), 'application/json', headers.items(), DEFAULT_TTL_SECONDS)
+            response_cache.set(key, entry)
+
+        cache_headers = [('ETag', f'"{entry.etag}"'), ('Cache-Control', CACHE_CONTROL)]
+        if parse_etags(_header(scope, b'if-none-match')).contains(entry.etag):
+            return await _send(send, 304, b'', cache_headers)
+        return await _send(send, 200, entry.body, [
+            ('Content-Type', entry.mimetype), *entry.headers, *cache_headers
+        ])
+
+    async def _analyze(self, scope, receive, send):
+        """Queue an analysis as an asyncio task; no thread waits on the simulated delay"""
+        try:
+            data = json_codec.decode(await _read_body(receive) or b'{}')
+        except ValueError:
+            return await _send_json(send, 400, {'error': 'Request body must be JSON'})
+        if not isinstance(data, dict):
+            return await _send_json(send, 400, {'error': 'Request body must be a JSON object'})
+
+        symbol, error = validate_symbol(data.get('symbol', ''))
+        if error:
+            return await _send_json(send, 400, {'error': error})
+
+        # The company table may need a refresh from the database; keep that off the event loop
+        key, result = await asyncio.to_thread(cached_analysis, symbol)
+        if result is not None:
+            return await _send_json(send, 200, result)
+
+        # Concurrent requests for the same analysis share one in-flight job
+        try:
+            job, created = analysis_jobs.create(symbol, key=key)
+        except QueueFull as e:
+            return await _send_json(send, 503, {'error': str(e)}, [('Retry-After', QUEUE_FULL_RETRY_AFTER)])
+        if created:
+            task = asyncio.get_running_loop().create_task(self._run_analysis(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await self._job_response(scope, send, job, inline_wait(_header(scope, b'prefer')))
+
+    async def _run_analysis(self, job):
+        job.status = RUNNING
+        try:
+            await asyncio.sleep(ANALYSIS_DELAY_SECONDS)
+            results = await asyncio.to_thread(analyze_symbols, [job.symbol])
+            analysis_jobs.finish(job, result=results[0])
+        except Exception as e:
+            analysis_jobs.finish(job, error=str(e))
+
+    async def _analysis_job(self, scope, send, job_id):
+        job = analysis_jobs.get(job_id)
+        if job is None:
+            return await _send_json(send, 404, {'error': 'Analysis job not found'})
+        return await self._job_response(scope, send, job)
+
+    async def _job_response(self, scope, send, job, default_wait=0):
+        try:
+            wait = float(_query_args(scope).get('wait', default_wait))
+        except ValueError:
+            wait = 0
+        if wait > 0:
+            await job.wait_async(min(wait, MAX_ANALYSIS_WAIT_SECONDS))
+        status_code, payload, headers = job_payload(job)
+        return await _send_json(send, status_code, payload, headers.items())
+
+    async def _analyze_batch(self, receive, send):
+        try:
+            data = json_codec.decode(await _read_body(receive) or b'{}')
+        except ValueError:
+            return await _send_json(send, 400, {'error': 'Request body must be JSON'})
+
+        # Vectorized scoring is CPU-bound; keep it off the event loop
+        try:
+            status_code, payload = await asyncio.to_thread(batch_payload, data)
+        except Exception as e:
+            return await _send_json(send, 500, {'error': str(e)})
+        return await _send_json(send, status_code, payload)
+
+    async def _stream(self, receive, send):
+        """Server-sent events from the worker's broadcaster; an idle client costs no thread"""
+        try:
+            subscription = live_updates.broadcaster.subscribe(loop=asyncio.get_running_loop())
+        except live_updates.TooManyClients as e:
+            return await _send_json(send, 503, {'error': str(e)})
+
+        async def close_on_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            subscription.close()
+
+        watcher = asyncio.get_running_loop().create_task(close_on_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                    (b'access-control-allow-origin', b'*')
+                ]
+            })
+            await send({'type': 'http.response.body', 'body': live_updates.RETRY_FRAME, 'more_body': True})
+            while not subscription.closed:
+                frames = await subscription.wait()
+                if subscription.closed:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': b''.join(frames) or live_updates.HEARTBEAT_FRAME,
+                    'more_body': True
+                })
+            await send({'type': 'http.response.body', 'body': b''})
+        except OSError:
+            pass  # the client went away mid-send
+        finally:
+            watcher.cancel()
+            live_updates.broadcaster.unsubscribe(subscription)
+
+    async def _portfolio(self, receive, send):
+        try:
+            data = json_codec.decode(await _read_body(receive, MAX_PORTFOLIO_BODY_BYTES) or b'{}')
+        except ValueError:
+            return await _send_json(send, 400, {'error': 'Request body must be JSON'})
+
+        # One vectorized pass, but over up to 100k holdings; keep it off the event loop
+        try:
+            status_code, payload = await asyncio.to_thread(portfolio_payload, data)
+        except Exception as e:
+            return await _send_json(send, 500, {'error': str(e)})
+        return await _send_json(send, status_code, payload)
+
+def _query_args(scope):
+    return MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+async def _read_body(receive, limit=MAX_BODY_BYTES):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > limit:
+            raise RequestTooLarge()
+        if not message.get('more_body'):
+            return bytes(body)
+
+def _encode(payload):
+    if not telemetry.METRICS_ENABLED:
+        return json_codec.encode(payload)
+    started = time.perf_counter()
+    body = json_codec.encode(payload)
+    telemetry.observe_serialization(time.perf_counter() - started)
+    return body
+
+async def _send(send, status, body, headers):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (name.lower().encode('latin-1'), str(value).encode('latin-1'))
+            for name, value in [
+                *headers, ('Content-Length', len(body)), ('Access-Control-Allow-Origin', '*'),
+                ('Access-Control-Expose-Headers', 'Location, Retry-After')
+            ]
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _send_json(send, status, payload, headers=()):
+    await _send(send, status, _encode(payload), [('Content-Type', 'application/json'), *headers])
+
+app = ESGAsgiApp(wsgi_app)
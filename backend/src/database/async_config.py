@@ -0,0 +1,57 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS
+)
+
+# Async drivers used by the ASGI server for each backend
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite'
+}
+
+async_engine = None
+AsyncSessionLocal = None
+
+def async_database_url(url):
+    """Rewrite a sync DATABASE_URL to use the matching async driver"""
+    scheme, _, rest = url.partition('://')
+    backend = scheme.split('+')[0]
+    if backend == 'postgres':
+        backend = 'postgresql'
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {backend}')
+    return f'{ASYNC_DRIVERS[backend]}://{rest}'
+
+def _async_engine_options(url):
+    if url.startswith('postgresql'):
+        connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args['server_settings'] = {'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)}
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': DB_POOL_PRE_PING,
+            'connect_args': connect_args
+        }
+    return {}
+
+def get_async_sessionmaker():
+    """Async session factory, creating the async engine on first use"""
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        url = async_database_url(DATABASE_URL)
+        async_engine = create_async_engine(url, **_async_engine_options(url))
+        AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+async def dispose_async_engine():
+    """Close pooled async connections, e.g. on server shutdown"""
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    AsyncSessionLocal = None
@@ -1,27 +1,66 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
 
-import os
-
 # Database URL - Use PostgreSQL in production, SQLite in development
 DATABASE_URL = os.getenv('DATABASE_URL', "sqlite:///./esg_intelligence.db")
 
-# Create engine with appropriate connect_args
-if DATABASE_URL.startswith('postgresql'):
-    # PostgreSQL (production)
-    engine = create_engine(DATABASE_URL)
-else:
-    # SQLite (development)
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+# Connection pool settings (per worker process)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# Server-side statement timeout in milliseconds, 0 disables it
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+
+def _engine_options(url):
+    """Keyword arguments for create_engine based on the backend and pool settings"""
+    if url.startswith('postgresql'):
+        # PostgreSQL (production)
+        connect_args = {}
+        if DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+        return {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': DB_POOL_PRE_PING,
+            'connect_args': connect_args
+        }
+    
+    # SQLite (development); a busy timeout stands in for statement timeouts on locks
+    connect_args = {"check_same_thread": False}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args['timeout'] = DB_STATEMENT_TIMEOUT_MS / 1000
+    return {'connect_args': connect_args}
+
+# Create engine with appropriate pool and connect_args
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+
+def _reset_pool_after_fork():
+    # A forked worker must not reuse sockets opened by its parent; drop them without closing
+    engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Session shared by everything handling one request; released on app context teardown
+db_session = scoped_session(SessionLocal)
+
+def init_app(app):
+    """Return the request-scoped session to the pool when each request ends"""
+    @app.teardown_appcontext
+    def remove_db_session(exception=None):
+        db_session.remove()
+
 # Create Base class
 Base = declarative_base()
 
@@ -33,6 +72,36 @@ def get_db():
     finally:
         db.close()
 
+def upsert_insert(connection):
+    """Dialect insert() supporting ON CONFLICT DO UPDATE, or None if the backend has none"""
+    return {
+        'postgresql': postgresql.insert,
+        'sqlite': sqlite.insert
+    }.get(connection.dialect.name)
+
 def init_db():
-    """Initialize database with tables"""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    """Initialize database with tables and any indexes missing from existing tables"""
+    # Import models so they register with Base.metadata
+    import models.esg_company  # noqa: F401
+    import models.esg_company_tag  # noqa: F401
+    import models.esg_company_change  # noqa: F401
+    import models.esg_sector_summary  # noqa: F401
+    import models.esg_score_history  # noqa: F401
+    
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    # Derived tables added after the companies were loaded start empty; fill them here, never on a read path
+    _backfill(models.esg_sector_summary.backfill_sector_summaries)
+    _backfill(models.esg_company_tag.backfill_company_tags)
+
+def _backfill(fill):
+    """Run fill(connection) in its own transaction, tolerating a worker that raced us to it"""
+    try:
+        with engine.begin() as connection:
+            fill(connection)
+    except IntegrityError:
+        # Another worker starting at the same time filled the table first
+        pass
@@ -2,22 +2,15 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database.config import SessionLocal, engine
-from models.esg_company import ESGCompany, Base
+from database.config import engine, init_db
+from models.esg_sector_summary import rebuild_sector_summaries
+from models.esg_score_history import snapshot_universe
+from services.company_loader import normalize, upsert_companies
 
 def populate_database():
     """Populate database with initial ESG company data"""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    
-    db = SessionLocal()
-    
-    try:
-        # Clear existing data (only if table exists)
-        db.query(ESGCompany).delete()
-        db.commit()
-    except:
-        pass  # Table doesn't exist yet, that's fine
+    # Create tables and indexes
+    init_db()
     
     # Sample ESG company data
     companies = [
@@ -85,26 +78,46 @@ def populate_database():
             'renewable_energy_percentage': 65.0,
             'sustainability_goals': 'AI for climate solutions|Sustainable computing|Diverse workforce|Ethical AI development',
             'key_initiatives': 'Energy efficient GPUs|STEM education programs|Responsible AI research|Supply chain transparency'
+        },
+        {
+            'symbol': 'META',
+            'name': 'Meta Platforms Inc.',
+            'sector': 'Technology',
+            'environmental_score': 82.0,
+            'social_score': 76.0,
+            'governance_score': 78.0,
+            'overall_score': 79.0,
+            'carbon_neutral': True,
+            'renewable_energy_percentage': 100.0,
+            'sustainability_goals': 'Net zero emissions by 2030|Digital inclusion|Privacy protection|Responsible innovation',
+            'key_initiatives': '100% renewable energy|Digital literacy programs|Content moderation|Transparent governance'
+        },
+        {
+            'symbol': 'AMZN',
+            'name': 'Amazon.com Inc.',
+            'sector': 'E-commerce',
+            'environmental_score': 78.0,
+            'social_score': 82.0,
+            'governance_score': 85.0,
+            'overall_score': 82.0,
+            'carbon_neutral': False,
+            'renewable_energy_percentage': 85.0,
+            'sustainability_goals': 'Net zero carbon by 2040|Climate pledge fund|Sustainable packaging|Employee development',
+            'key_initiatives': 'Electric delivery fleet|Renewable energy projects|Skills training programs|Supplier diversity'
         }
     ]
     
     try:
-        # Clear existing data
-        db.query(ESGCompany).delete()
-        
-        # Add new companies
-        for company_data in companies:
-            company = ESGCompany(**company_data)
-            db.add(company)
+        # Upsert so re-running (e.g. on every deploy) leaves unchanged rows untouched
+        with engine.begin() as connection:
+            upsert_companies(connection, [normalize(company) for company in companies])
+            rebuild_sector_summaries(connection)
+            snapshot_universe(connection)
         
-        db.commit()
         print("✅ Database populated successfully with ESG company data!")
         
     except Exception as e:
         print(f"❌ Error populating database: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
 if __name__ == "__main__":
     populate_database() 
\ No newline at end of file
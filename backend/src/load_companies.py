@@ -0,0 +1,67 @@
+import argparse
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.config import engine, init_db
+from models.esg_sector_summary import rebuild_sector_summaries
+from models.esg_score_history import snapshot_universe
+from services.company_loader import DEFAULT_CHUNK_SIZE, READERS, iter_chunks, upsert_companies
+
+# Invalid records printed before the loader only counts them
+MAX_REPORTED_ERRORS = 20
+
+def load_companies(path, file_format=None, chunk_size=DEFAULT_CHUNK_SIZE, snapshot=True):
+    """Stream a CSV/JSONL company file into esg_companies with chunked upserts"""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format == 'ndjson':
+        file_format = 'jsonl'
+    if file_format not in READERS:
+        raise ValueError(f'Unsupported format: {file_format} (expected csv or jsonl)')
+
+    init_db()
+    skipped = 0
+
+    def report_error(position, message):
+        nonlocal skipped
+        skipped += 1
+        if skipped <= MAX_REPORTED_ERRORS:
+            print(f"⚠️  Skipping record {position}: {message}", file=sys.stderr)
+
+    started = time.perf_counter()
+    loaded = 0
+    for rows in iter_chunks(READERS[file_format](path), chunk_size, on_error=report_error):
+        # One transaction per chunk keeps memory and lock time bounded
+        with engine.begin() as connection:
+            loaded += upsert_companies(connection, rows)
+        elapsed = time.perf_counter() - started
+        print(f"   {loaded:,} rows ({loaded / elapsed:,.0f} rows/sec)")
+
+    # Derived tables are refreshed once per load rather than per row
+    with engine.begin() as connection:
+        rebuild_sector_summaries(connection)
+        if snapshot:
+            snapshot_universe(connection)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Loaded {loaded:,} companies in {elapsed:.1f}s "
+          f"({loaded / elapsed if elapsed else 0:,.0f} rows/sec), skipped {skipped:,} invalid records")
+    return loaded, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load ESG companies from CSV or JSONL')
+    parser.add_argument('path', help='CSV (with header) or JSONL file to load')
+    parser.add_argument('--format', choices=sorted(READERS), help='Input format (default: from file extension)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per upsert batch')
+    parser.add_argument('--no-snapshot', action='store_true', help='Do not record a score history snapshot')
+    args = parser.parse_args()
+
+    try:
+        load_companies(args.path, args.format, args.chunk_size, snapshot=not args.no_snapshot)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error loading companies: {e}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,34 +3,47 @@ import sys
 # DON'T CHANGE: Add the src directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 
+from database.config import init_app, init_db
+from services import telemetry
+from services.json_codec import FastJSONProvider
+from services.static_assets import STATIC_DIR, StaticSite
+
 # Import blueprints
 from routes.esg import esg_bp
+from routes.metrics import metrics_bp
 
 def create_app():
-    app = Flask(__name__, static_folder='static', static_url_path='')
+    # The frontend is served from an in-memory manifest (below), not Flask's static route
+    app = Flask(__name__, static_folder=None)
+    app.json = FastJSONProvider(app)
+    
+    # Make sure tables and indexes exist before serving requests
+    init_db()
+    init_app(app)
+    
+    # Request metrics and the slow-request profiler, both opt-in
+    telemetry.init_app(app)
     
-    # Enable CORS for all routes
-    CORS(app, origins="*")
+    # Enable CORS for all routes; the dashboard reads Retry-After to pace analysis job polls
+    CORS(app, origins="*", expose_headers=['Location', 'Retry-After'])
     
     # Register blueprints
     app.register_blueprint(esg_bp)
+    app.register_blueprint(metrics_bp)
     
-    @app.route('/')
-    def serve_frontend():
-        """Serve the React frontend"""
-        return send_from_directory(app.static_folder, 'index.html')
+    site = StaticSite(STATIC_DIR or os.path.join(app.root_path, 'static'))
     
+    @app.route('/')
     @app.route('/<path:path>')
-    def serve_static_files(path):
-        """Serve static files"""
-        try:
-            return send_from_directory(app.static_folder, path)
-        except:
-            # If file not found, serve index.html for React routing
-            return send_from_directory(app.static_folder, 'index.html')
+    def serve_frontend(path=''):
+        """Serve the React frontend; unknown extensionless paths get index.html for React routing"""
+        asset = site.resolve(path)
+        if asset is None:
+            return jsonify({'error': 'Not found'}), 404
+        return site.response(asset)
     
     return app
 
@@ -1,11 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index
 from datetime import datetime
 
-Base = declarative_base()
+from database.config import Base
 
 class ESGCompany(Base):
     __tablename__ = 'esg_companies'
+    __table_args__ = (
+        # Rankings walk the universe in overall_score order, optionally within a sector
+        Index('ix_esg_companies_overall_score', 'overall_score'),
+        Index('ix_esg_companies_sector_overall_score', 'sector', 'overall_score'),
+        # Common screening shapes: pillar thresholds, carbon-neutral leaders, sector + environmental
+        Index('ix_esg_companies_environmental_score', 'environmental_score'),
+        Index('ix_esg_companies_social_score', 'social_score'),
+        Index('ix_esg_companies_governance_score', 'governance_score'),
+        Index('ix_esg_companies_carbon_neutral_overall_score', 'carbon_neutral', 'overall_score'),
+        Index('ix_esg_companies_sector_environmental_score', 'sector', 'environmental_score'),
+    )
     
     id = Column(Integer, primary_key=True)
     symbol = Column(String(10), unique=True, nullable=False)
@@ -27,7 +37,7 @@ class ESGCompany(Base):
     key_initiatives = Column(Text)      # JSON string
     
     # Metadata
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     data_source = Column(String(100), default='ESG Intelligence Engine')
     
     def to_dict(self):
@@ -0,0 +1,153 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, Index, Integer, String, and_, delete, event, func, insert, inspect,
+    select, update
+)
+from sqlalchemy.orm import Session
+
+from database.config import Base, upsert_insert
+from models.esg_company import ESGCompany
+
+# Deletions are remembered this long; change cursors from before a pruned deletion must resync
+TOMBSTONE_RETENTION_DAYS = float(os.environ.get('ESG_TOMBSTONE_RETENTION_DAYS', 30))
+
+_SEQUENCE_KEY = 'esg_change_sequence'
+
+class ESGChangeCounter(Base):
+    """Single-row counter handing out change sequence numbers"""
+    __tablename__ = 'esg_change_counter'
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    # Highest sequence of a deletion already pruned; cursors before it must resync
+    pruned_through = Column(BigInteger, nullable=False, default=0)
+
+class ESGCompanyChange(Base):
+    """The latest change to a company symbol, in change sequence order"""
+    __tablename__ = 'esg_company_changes'
+    __table_args__ = (
+        # Delta sync walks changes after a (seq, symbol) cursor
+        Index('ix_esg_company_changes_seq_symbol', 'seq', 'symbol'),
+        Index('ix_esg_company_changes_deleted_changed_at', 'deleted', 'changed_at'),
+    )
+
+    symbol = Column(String(10), primary_key=True)
+    seq = Column(BigInteger, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+@event.listens_for(ESGChangeCounter.__table__, 'after_create')
+def _seed_counter(target, connection, **kw):
+    connection.execute(insert(target).values(id=1, value=0, pruned_through=0))
+
+def change_sequence(connection):
+    """Sequence number of the company changes made by the connection's current transaction
+
+    The counter row is bumped once per transaction, inside it. Its row lock
+    is held until commit, so writers take numbers in commit order: once a
+    number is visible, every smaller one has committed or rolled back.
+    """
+    transaction = connection.get_transaction()
+    current = connection.info.get(_SEQUENCE_KEY)
+    if current is not None and current[0] is transaction:
+        return current[1]
+    counter = ESGChangeCounter.__table__
+    bumped = connection.execute(
+        update(counter).where(counter.c.id == 1).values(value=counter.c.value + 1)
+    ).rowcount
+    if not bumped:
+        connection.execute(insert(counter).values(id=1, value=1, pruned_through=0))
+    sequence = connection.execute(select(counter.c.value).where(counter.c.id == 1)).scalar_one()
+    connection.info[_SEQUENCE_KEY] = (transaction, sequence)
+    return sequence
+
+def current_sequence(connection):
+    """(latest committed sequence, pruned_through) as seen by this connection"""
+    counter = ESGChangeCounter.__table__
+    row = connection.execute(select(counter.c.value, counter.c.pruned_through).where(counter.c.id == 1)).first()
+    return (row.value, row.pruned_through) if row is not None else (0, 0)
+
+def record_changes(connection, symbols, deleted=False):
+    """Log symbols as changed (or deleted) by the current transaction"""
+    symbols = list(dict.fromkeys(symbol for symbol in symbols if symbol))
+    if not symbols:
+        return
+    sequence = change_sequence(connection)
+    now = datetime.utcnow()
+    table = ESGCompanyChange.__table__
+    rows = [{'symbol': symbol, 'seq': sequence, 'deleted': deleted, 'changed_at': now} for symbol in symbols]
+
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is None:
+        connection.execute(delete(table).where(table.c.symbol.in_(symbols)))
+        connection.execute(insert(table), rows)
+    else:
+        stmt = dialect_insert(table)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.symbol],
+            set_={name: stmt.excluded[name] for name in ('seq', 'deleted', 'changed_at')}
+        ), rows)
+    if deleted:
+        _prune(connection, now)
+
+def _prune(connection, now):
+    # Runs after change_sequence(), so this transaction already holds the counter row
+    table = ESGCompanyChange.__table__
+    counter = ESGChangeCounter.__table__
+    expired = and_(table.c.deleted, table.c.changed_at < now - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+    through = connection.execute(select(func.max(table.c.seq)).where(expired)).scalar()
+    if through is None:
+        return
+    connection.execute(delete(table).where(expired))
+    _, pruned_through = current_sequence(connection)
+    if through > pruned_through:
+        connection.execute(update(counter).where(counter.c.id == 1).values(pruned_through=through))
+
+@event.listens_for(ESGCompany, 'after_insert')
+def _changes_after_insert(mapper, connection, target):
+    record_changes(connection, [target.symbol])
+
+@event.listens_for(ESGCompany, 'after_update')
+def _changes_after_update(mapper, connection, target):
+    # A renamed symbol disappears under its old name
+    history = inspect(target).attrs.symbol.history
+    if history.has_changes() and history.deleted:
+        record_changes(connection, history.deleted, deleted=True)
+    record_changes(connection, [target.symbol])
+
+@event.listens_for(ESGCompany, 'after_delete')
+def _changes_after_delete(mapper, connection, target):
+    record_changes(connection, [target.symbol], deleted=True)
+
+def _statement_symbols(orm_execute_state):
+    # Symbols passed as parameters to an ORM bulk insert
+    parameters = orm_execute_state.parameters
+    if isinstance(parameters, dict):
+        parameters = [parameters]
+    return [row.get('symbol') for row in parameters or () if isinstance(row, dict)]
+
+@event.listens_for(Session, 'do_orm_execute')
+def _changes_for_bulk_write(orm_execute_state):
+    # Statement-level writes skip the per-row hooks: find the affected symbols around the statement
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not ESGCompany:
+        return None
+    connection = orm_execute_state.session.connection()
+    if orm_execute_state.is_insert:
+        result = orm_execute_state.invoke_statement()
+        record_changes(connection, _statement_symbols(orm_execute_state))
+        return result
+
+    companies = ESGCompany.__table__
+    query = select(companies.c.symbol)
+    if orm_execute_state.statement.whereclause is not None:
+        query = query.where(orm_execute_state.statement.whereclause)
+    symbols = connection.execute(query, orm_execute_state.parameters or {}).scalars().all()
+    result = orm_execute_state.invoke_statement()
+    # Bulk updates are logged under the symbols they matched; they are not expected to rename
+    record_changes(connection, symbols, deleted=orm_execute_state.is_delete)
+    return result
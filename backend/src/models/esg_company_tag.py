@@ -0,0 +1,117 @@
+from sqlalchemy import Column, Integer, String, Index, delete, event, exists, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from database.config import Base
+from models.esg_company import ESGCompany
+
+GOAL = 'goal'
+INITIATIVE = 'initiative'
+
+# Longest single goal or initiative; writers validate against it rather than fail a whole batch
+MAX_TAG_LENGTH = 300
+
+# Pipe-joined ESGCompany columns normalized into tag rows
+_TAG_COLUMNS = (
+    (GOAL, 'sustainability_goals'),
+    (INITIATIVE, 'key_initiatives')
+)
+
+class ESGCompanyTag(Base):
+    """One sustainability goal or key initiative of a company, in listed order"""
+    __tablename__ = 'esg_company_tags'
+    __table_args__ = (
+        # "Which companies have initiative X" is an index lookup rather than a scan
+        Index('ix_esg_company_tags_kind_text', 'kind', 'text'),
+    )
+
+    symbol = Column(String(10), primary_key=True)
+    kind = Column(String(10), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    text = Column(String(MAX_TAG_LENGTH), nullable=False)
+
+def split_tags(text):
+    """Individual entries of a pipe-joined goals/initiatives column"""
+    return [item.strip() for item in text.split('|') if item.strip()] if text else []
+
+def tag_rows(symbol, goals_text, initiatives_text):
+    """Tag rows for one company from its pipe-joined columns"""
+    return [
+        {'symbol': symbol, 'kind': kind, 'position': position, 'text': text}
+        for kind, joined in ((GOAL, goals_text), (INITIATIVE, initiatives_text))
+        for position, text in enumerate(split_tags(joined))
+    ]
+
+def replace_tags(connection, companies):
+    """Rewrite the tags of the given companies
+
+    companies is an iterable of (symbol, sustainability_goals,
+    key_initiatives) tuples holding the pipe-joined column values.
+    """
+    table = ESGCompanyTag.__table__
+    companies = list(companies)
+    if not companies:
+        return 0
+    connection.execute(delete(table).where(table.c.symbol.in_([symbol for symbol, _, _ in companies])))
+    rows = [row for company in companies for row in tag_rows(*company)]
+    if rows:
+        connection.execute(insert(table), rows)
+    return len(rows)
+
+def rebuild_company_tags(connection, chunk_size=5000):
+    """Recompute every tag row from esg_companies"""
+    companies = ESGCompany.__table__
+    connection.execute(delete(ESGCompanyTag.__table__))
+    # Streaming is set on the statement; on the connection it would also apply to the inserts
+    result = connection.execute(
+        select(companies.c.symbol, companies.c.sustainability_goals, companies.c.key_initiatives)
+        .execution_options(stream_results=True)
+    )
+    for chunk in result.partitions(chunk_size):
+        rows = [row for company in chunk for row in tag_rows(*company)]
+        if rows:
+            connection.execute(insert(ESGCompanyTag.__table__), rows)
+
+def backfill_company_tags(connection):
+    """Build the tags of a company table loaded before they were normalized; True if it did"""
+    companies = ESGCompany.__table__
+    if connection.scalar(select(exists().where(ESGCompanyTag.__table__.c.symbol.isnot(None)))):
+        return False
+    tagged = or_(companies.c.sustainability_goals.isnot(None), companies.c.key_initiatives.isnot(None))
+    if not connection.scalar(select(exists().where(tagged))):
+        return False
+    rebuild_company_tags(connection)
+    return True
+
+def _tags_of(target):
+    return (target.symbol, target.sustainability_goals, target.key_initiatives)
+
+@event.listens_for(ESGCompany, 'after_insert')
+def _tags_after_insert(mapper, connection, target):
+    replace_tags(connection, [_tags_of(target)])
+
+@event.listens_for(ESGCompany, 'after_update')
+def _tags_after_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.symbol.history.has_changes():
+        old_symbol = state.attrs.symbol.history.deleted
+        if old_symbol:
+            connection.execute(delete(ESGCompanyTag.__table__).where(ESGCompanyTag.symbol == old_symbol[0]))
+    elif not any(state.attrs[column].history.has_changes() for _, column in _TAG_COLUMNS):
+        return
+    replace_tags(connection, [_tags_of(target)])
+
+@event.listens_for(ESGCompany, 'after_delete')
+def _tags_after_delete(mapper, connection, target):
+    connection.execute(delete(ESGCompanyTag.__table__).where(ESGCompanyTag.symbol == target.symbol))
+
+@event.listens_for(Session, 'do_orm_execute')
+def _tags_after_bulk_write(orm_execute_state):
+    # Statement-level writes don't go through the per-row hooks; rebuild in the same transaction
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not ESGCompany:
+        return None
+    result = orm_execute_state.invoke_statement()
+    rebuild_company_tags(orm_execute_state.session.connection())
+    return result
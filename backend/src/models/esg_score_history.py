@@ -0,0 +1,157 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, event, insert, inspect, select
+from datetime import datetime, timedelta
+
+from database.config import Base, upsert_insert
+from models.esg_company import ESGCompany
+
+# Rollup scopes: the whole universe, one sector, or one symbol
+SCOPE_ALL = 'all'
+SCOPE_SECTOR = 'sector'
+SCOPE_SYMBOL = 'symbol'
+
+DAY = 'day'
+WEEK = 'week'
+MONTH = 'month'
+
+# Daily points per symbol are read straight from the history table
+ROLLUP_GRANULARITIES = {
+    SCOPE_ALL: (DAY, WEEK, MONTH),
+    SCOPE_SECTOR: (DAY, WEEK, MONTH),
+    SCOPE_SYMBOL: (WEEK, MONTH)
+}
+
+_SCORE_ATTRIBUTES = ('environmental_score', 'social_score', 'governance_score', 'overall_score')
+
+class ESGScoreHistory(Base):
+    """Append-only score snapshots, one narrow row per (symbol, timestamp)"""
+    __tablename__ = 'esg_score_history'
+
+    symbol = Column(String(10), primary_key=True)
+    recorded_at = Column(DateTime, primary_key=True)
+    environmental = Column(Float, nullable=False)
+    social = Column(Float, nullable=False)
+    governance = Column(Float, nullable=False)
+    overall = Column(Float, nullable=False)
+
+class ESGScoreRollup(Base):
+    """Running sums of history samples per scope, granularity and period"""
+    __tablename__ = 'esg_score_rollups'
+
+    scope = Column(String(10), primary_key=True)
+    scope_key = Column(String(100), primary_key=True)
+    granularity = Column(String(10), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+
+    samples = Column(Integer, nullable=False, default=0)
+    environmental_total = Column(Float, nullable=False, default=0.0)
+    social_total = Column(Float, nullable=False, default=0.0)
+    governance_total = Column(Float, nullable=False, default=0.0)
+    overall_total = Column(Float, nullable=False, default=0.0)
+
+_TOTAL_COLUMNS = ('samples', 'environmental_total', 'social_total', 'governance_total', 'overall_total')
+
+def period_start(day, granularity):
+    """First day of the day/week/month period containing day"""
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == MONTH:
+        return day.replace(day=1)
+    return day
+
+def _upsert_rollups(connection, totals):
+    table = ESGScoreRollup.__table__
+    rows = [
+        {
+            'scope': scope, 'scope_key': scope_key, 'granularity': granularity,
+            'period_start': start, **dict(zip(_TOTAL_COLUMNS, sums))
+        }
+        for (scope, scope_key, granularity, start), sums in totals.items()
+    ]
+    if not rows:
+        return
+
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.scope_key, table.c.granularity, table.c.period_start],
+            set_={name: table.c[name] + stmt.excluded[name] for name in _TOTAL_COLUMNS}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        key = (
+            (table.c.scope == row['scope']) & (table.c.scope_key == row['scope_key'])
+            & (table.c.granularity == row['granularity'])
+            & (table.c.period_start == row['period_start'])
+        )
+        updated = connection.execute(
+            table.update().where(key).values({name: table.c[name] + row[name] for name in _TOTAL_COLUMNS})
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table).values(**row))
+
+def append_scores(connection, snapshots, recorded_at=None):
+    """Append score snapshots and fold them into the rollups
+
+    snapshots is an iterable of (symbol, sector, environmental, social,
+    governance, overall) tuples, all recorded at the same instant.
+    """
+    recorded_at = recorded_at or datetime.utcnow()
+    day = recorded_at.date()
+    history = []
+    totals = {}
+
+    for symbol, sector, environmental, social, governance, overall in snapshots:
+        history.append({
+            'symbol': symbol,
+            'recorded_at': recorded_at,
+            'environmental': environmental,
+            'social': social,
+            'governance': governance,
+            'overall': overall
+        })
+        sample = (1, environmental, social, governance, overall)
+        for scope, scope_key in ((SCOPE_ALL, ''), (SCOPE_SECTOR, sector), (SCOPE_SYMBOL, symbol)):
+            for granularity in ROLLUP_GRANULARITIES[scope]:
+                key = (scope, scope_key, granularity, period_start(day, granularity))
+                current = totals.get(key)
+                totals[key] = sample if current is None else tuple(a + b for a, b in zip(current, sample))
+
+    if history:
+        connection.execute(insert(ESGScoreHistory.__table__), history)
+        _upsert_rollups(connection, totals)
+    return len(history)
+
+def snapshot_universe(connection, recorded_at=None, chunk_size=5000):
+    """Record the current scores of every company, e.g. from a daily job"""
+    companies = ESGCompany.__table__
+    # Streaming is set on the statement; on the connection it would also apply to the inserts
+    result = connection.execute(
+        select(
+            companies.c.symbol, companies.c.sector, companies.c.environmental_score,
+            companies.c.social_score, companies.c.governance_score, companies.c.overall_score
+        ).execution_options(stream_results=True)
+    )
+    recorded_at = recorded_at or datetime.utcnow()
+    recorded = 0
+    for chunk in result.partitions(chunk_size):
+        recorded += append_scores(connection, chunk, recorded_at)
+    return recorded
+
+def _snapshot(target):
+    return (
+        target.symbol, target.sector, target.environmental_score, target.social_score,
+        target.governance_score, target.overall_score
+    )
+
+@event.listens_for(ESGCompany, 'after_insert')
+def _history_after_insert(mapper, connection, target):
+    append_scores(connection, [_snapshot(target)])
+
+@event.listens_for(ESGCompany, 'after_update')
+def _history_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in _SCORE_ATTRIBUTES):
+        append_scores(connection, [_snapshot(target)])
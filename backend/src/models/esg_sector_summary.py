@@ -0,0 +1,277 @@
+from sqlalchemy import Column, Integer, String, Float, case, delete, event, exists, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from database.config import Base, upsert_insert
+from models.esg_company import ESGCompany
+
+# Score distribution buckets on overall_score: excellent 85+, good 70-84, fair 55-69, poor <55
+EXCELLENT_THRESHOLD = 85
+GOOD_THRESHOLD = 70
+FAIR_THRESHOLD = 55
+
+# Company attributes that feed the summary
+_TRACKED_ATTRIBUTES = (
+    'sector', 'environmental_score', 'social_score', 'governance_score',
+    'overall_score', 'carbon_neutral'
+)
+
+class ESGSectorSummary(Base):
+    """Materialized per-sector totals, kept in step with esg_companies on every write"""
+    __tablename__ = 'esg_sector_summaries'
+
+    sector = Column(String(100), primary_key=True)
+    companies_count = Column(Integer, nullable=False, default=0)
+
+    # Running sums; means are derived on read
+    environmental_total = Column(Float, nullable=False, default=0.0)
+    social_total = Column(Float, nullable=False, default=0.0)
+    governance_total = Column(Float, nullable=False, default=0.0)
+    overall_total = Column(Float, nullable=False, default=0.0)
+
+    carbon_neutral_count = Column(Integer, nullable=False, default=0)
+    excellent_count = Column(Integer, nullable=False, default=0)
+    good_count = Column(Integer, nullable=False, default=0)
+    fair_count = Column(Integer, nullable=False, default=0)
+    poor_count = Column(Integer, nullable=False, default=0)
+
+    # Highest overall_score in the sector (ties: lowest symbol), refreshed after each write
+    leader_symbol = Column(String(10))
+    leader_score = Column(Float)
+
+    def mean(self, total):
+        """Mean of a running total over the sector's companies"""
+        return round(total / self.companies_count, 1) if self.companies_count else 0.0
+
+    def to_dict(self):
+        """Convert model to dictionary for API responses"""
+        return {
+            'sector': self.sector,
+            'environmental': self.mean(self.environmental_total),
+            'social': self.mean(self.social_total),
+            'governance': self.mean(self.governance_total),
+            'overall': self.mean(self.overall_total),
+            'companies_count': self.companies_count,
+            'carbon_neutral_count': self.carbon_neutral_count
+        }
+
+_DELTA_COLUMNS = (
+    'companies_count', 'environmental_total', 'social_total', 'governance_total',
+    'overall_total', 'carbon_neutral_count', 'excellent_count', 'good_count',
+    'fair_count', 'poor_count'
+)
+
+def _bucket(overall):
+    if overall >= EXCELLENT_THRESHOLD:
+        return 'excellent_count'
+    if overall >= GOOD_THRESHOLD:
+        return 'good_count'
+    if overall >= FAIR_THRESHOLD:
+        return 'fair_count'
+    return 'poor_count'
+
+def _contribution(values, sign):
+    """Summary deltas for adding (sign=1) or removing (sign=-1) one company"""
+    delta = dict.fromkeys(_DELTA_COLUMNS, 0)
+    delta['companies_count'] = sign
+    delta['environmental_total'] = sign * values['environmental_score']
+    delta['social_total'] = sign * values['social_score']
+    delta['governance_total'] = sign * values['governance_score']
+    delta['overall_total'] = sign * values['overall_score']
+    delta['carbon_neutral_count'] = sign if values['carbon_neutral'] else 0
+    delta[_bucket(values['overall_score'])] += sign
+    return delta
+
+def _apply_delta(connection, sector, delta):
+    """Atomically add delta to the sector's summary row, creating it if needed"""
+    table = ESGSectorSummary.__table__
+    dialect_insert = upsert_insert(connection)
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(sector=sector, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.sector],
+            set_={name: table.c[name] + stmt.excluded[name] for name in _DELTA_COLUMNS}
+        )
+        connection.execute(stmt)
+        return
+
+    updated = connection.execute(
+        table.update()
+        .where(table.c.sector == sector)
+        .values({name: table.c[name] + value for name, value in delta.items()})
+    )
+    if updated.rowcount == 0:
+        connection.execute(insert(table).values(sector=sector, **delta))
+
+def _refresh_leaders(connection, sectors=None):
+    """Re-read the leader of the given sectors (all if None), one index seek each"""
+    table = ESGSectorSummary.__table__
+    companies = ESGCompany.__table__
+
+    def leader(column):
+        # Served by the (sector, overall_score) index
+        return (
+            select(column)
+            .where(companies.c.sector == table.c.sector)
+            .order_by(companies.c.overall_score.desc(), companies.c.symbol)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+    stmt = update(table).values(leader_symbol=leader(companies.c.symbol), leader_score=leader(companies.c.overall_score))
+    if sectors is not None:
+        sectors = [sector for sector in set(sectors) if sector is not None]
+        if not sectors:
+            return
+        stmt = stmt.where(table.c.sector.in_(sectors))
+    connection.execute(stmt)
+
+def rebuild_sector_summaries(connection):
+    """Recompute every summary row from esg_companies in one aggregate query"""
+    table = ESGSectorSummary.__table__
+    companies = ESGCompany.__table__
+    overall = companies.c.overall_score
+
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    aggregate = select(
+        companies.c.sector,
+        func.count(),
+        func.coalesce(func.sum(companies.c.environmental_score), 0.0),
+        func.coalesce(func.sum(companies.c.social_score), 0.0),
+        func.coalesce(func.sum(companies.c.governance_score), 0.0),
+        func.coalesce(func.sum(overall), 0.0),
+        count_where(companies.c.carbon_neutral.is_(True)),
+        count_where(overall >= EXCELLENT_THRESHOLD),
+        count_where((overall >= GOOD_THRESHOLD) & (overall < EXCELLENT_THRESHOLD)),
+        count_where((overall >= FAIR_THRESHOLD) & (overall < GOOD_THRESHOLD)),
+        count_where(overall < FAIR_THRESHOLD)
+    ).group_by(companies.c.sector)
+
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select(['sector', *_DELTA_COLUMNS], aggregate))
+    _refresh_leaders(connection)
+
+def backfill_sector_summaries(connection):
+    """Build the summaries of a company table loaded before they existed; True if it did"""
+    table = ESGSectorSummary.__table__
+    companies = ESGCompany.__table__
+    if connection.scalar(select(exists().where(table.c.sector.isnot(None)))):
+        return False
+    if not connection.scalar(select(exists().where(companies.c.id.isnot(None)))):
+        return False
+    rebuild_sector_summaries(connection)
+    return True
+
+def _current_values(target):
+    return {name: getattr(target, name) for name in _TRACKED_ATTRIBUTES}
+
+def _previous_values(target):
+    state = inspect(target)
+    values = {}
+    for name in _TRACKED_ATTRIBUTES:
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    return values
+
+def _has_changes(target):
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in _TRACKED_ATTRIBUTES)
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+# Load the previous value on assignment, so updates to expired rows still know what to subtract
+for _name in _TRACKED_ATTRIBUTES:
+    event.listen(getattr(ESGCompany, _name), 'set', _load_old_value, active_history=True)
+
+@event.listens_for(ESGCompany, 'after_insert')
+def _summary_after_insert(mapper, connection, target):
+    values = _current_values(target)
+    _apply_delta(connection, values['sector'], _contribution(values, 1))
+    _refresh_leaders(connection, [values['sector']])
+
+@event.listens_for(ESGCompany, 'before_update')
+def _summary_before_update(mapper, connection, target):
+    # Runs before the UPDATE so attribute history still holds the old values
+    if not _has_changes(target):
+        return
+    old, new = _previous_values(target), _current_values(target)
+    _apply_delta(connection, old['sector'], _contribution(old, -1))
+    _apply_delta(connection, new['sector'], _contribution(new, 1))
+
+@event.listens_for(ESGCompany, 'after_update')
+def _summary_after_update(mapper, connection, target):
+    # Leaders are re-read once the UPDATE is visible; a renamed symbol can change a tie too
+    state = inspect(target)
+    if not (_has_changes(target) or state.attrs.symbol.history.has_changes()):
+        return
+    _refresh_leaders(connection, [_previous_values(target)['sector'], target.sector])
+
+@event.listens_for(ESGCompany, 'before_delete')
+def _summary_before_delete(mapper, connection, target):
+    values = _current_values(target)
+    _apply_delta(connection, values['sector'], _contribution(values, -1))
+
+@event.listens_for(ESGCompany, 'after_delete')
+def _summary_after_delete(mapper, connection, target):
+    _refresh_leaders(connection, [target.sector])
+
+def _tracked_rows(connection, condition, parameters=None):
+    companies = ESGCompany.__table__
+    columns = [companies.c.id, *(companies.c[name] for name in _TRACKED_ATTRIBUTES)]
+    return connection.execute(select(*columns).where(condition), parameters or {}).mappings().all()
+
+def _add_contributions(deltas, rows, sign):
+    for row in rows:
+        delta = deltas.setdefault(row['sector'], dict.fromkeys(_DELTA_COLUMNS, 0))
+        for name, value in _contribution(row, sign).items():
+            delta[name] += value
+
+def _parameter_values(orm_execute_state, name):
+    # Values of one column across the parameters of an executemany statement
+    parameters = orm_execute_state.parameters
+    if isinstance(parameters, dict):
+        parameters = [parameters]
+    return [row.get(name) for row in parameters or () if isinstance(row, dict) and row.get(name) is not None]
+
+@event.listens_for(Session, 'do_orm_execute')
+def _summary_after_bulk_write(orm_execute_state):
+    # Statement-level writes skip the per-row hooks: subtract the rows they match and add them back afterwards
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not ESGCompany:
+        return None
+    connection = orm_execute_state.session.connection()
+    companies = ESGCompany.__table__
+    deltas = {}
+
+    if orm_execute_state.is_insert:
+        result = orm_execute_state.invoke_statement()
+        symbols = _parameter_values(orm_execute_state, 'symbol')
+        if not symbols:
+            # Values given inline rather than as parameters: nothing to key the delta on
+            rebuild_sector_summaries(connection)
+            return result
+        _add_contributions(deltas, _tracked_rows(connection, companies.c.symbol.in_(symbols)), 1)
+    else:
+        if isinstance(orm_execute_state.parameters, list):
+            # Bulk update by primary key
+            condition = companies.c.id.in_(_parameter_values(orm_execute_state, 'id'))
+        elif orm_execute_state.statement.whereclause is not None:
+            condition = orm_execute_state.statement.whereclause
+        else:
+            condition = companies.c.id.isnot(None)
+        parameters = orm_execute_state.parameters if isinstance(orm_execute_state.parameters, dict) else None
+        before = _tracked_rows(connection, condition, parameters)
+        result = orm_execute_state.invoke_statement()
+        _add_contributions(deltas, before, -1)
+        if orm_execute_state.is_update and before:
+            _add_contributions(deltas, _tracked_rows(connection, companies.c.id.in_([row['id'] for row in before])), 1)
+
+    for sector, delta in deltas.items():
+        _apply_delta(connection, sector, delta)
+    _refresh_leaders(connection, list(deltas))
+    return result
@@ -0,0 +1,14 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.static_assets import STATIC_DIR, precompress
+
+def precompress_frontend():
+    """Write .gz/.br variants of the built frontend so workers load them instead of compressing at startup"""
+    directory = STATIC_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    written = precompress(directory)
+    print(f"✅ Wrote {written} compressed variants in {directory}")
+
+if __name__ == "__main__":
+    precompress_frontend()
@@ -1,407 +1,528 @@
-from flask import Blueprint, request, jsonify
-import random
+from flask import Blueprint, Response, request, jsonify
+import hashlib
+import math
+import os
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import numpy as np
+from werkzeug.datastructures import MultiDict
+
+from database.config import db_session
+from services import (
+    aggregates, changes, company_events, export, json_codec, live_updates, portfolio, rankings, scoring, screening, search, trends
+)
+from services.analysis_cache import analysis_cache
+from services.analysis_jobs import analysis_jobs, COMPLETED, FAILED, QueueFull
+from services.company_table import company_tables
+from services.rankings import ranking_index
+from services.search import search_index
+from services.response_cache import cached_response, response_cache
 
 esg_bp = Blueprint('esg', __name__)
 
-# ESG Company Database
-ESG_COMPANIES = {
-    'TSLA': {
-        'name': 'Tesla Inc.',
-        'sector': 'Automotive',
-        'environmental': 92,
-        'social': 78,
-        'governance': 85,
-        'overall': 85,
-        'carbon_neutral': True,
-        'renewable_energy': 95,
-        'sustainability_goals': [
-            'Accelerate sustainable transport',
-            'Zero emissions manufacturing',
-            'Renewable energy ecosystem',
-            'Sustainable supply chain'
-        ],
-        'key_initiatives': [
-            'Gigafactory renewable energy',
-            'Battery recycling program',
-            'Employee safety excellence',
-            'Transparent reporting'
-        ]
-    },
-    'MSFT': {
-        'name': 'Microsoft Corporation',
-        'sector': 'Technology',
-        'environmental': 88,
-        'social': 94,
-        'governance': 95,
-        'overall': 92,
-        'carbon_neutral': True,
-        'renewable_energy': 100,
-        'sustainability_goals': [
-            'Carbon negative by 2030',
-            '100% renewable energy',
-            'Zero waste operations',
-            'Water positive by 2030'
-        ],
-        'key_initiatives': [
-            'AI for Earth program',
-            'Climate Innovation Fund',
-            'Diverse workforce initiatives',
-            'Transparent governance'
-        ]
-    },
-    'AAPL': {
-        'name': 'Apple Inc.',
-        'sector': 'Technology',
-        'environmental': 91,
-        'social': 86,
-        'governance': 90,
-        'overall': 89,
-        'carbon_neutral': True,
-        'renewable_energy': 100,
-        'sustainability_goals': [
-            'Carbon neutral by 2030',
-            '100% recycled materials',
-            'Zero waste to landfill',
-            'Renewable energy supply chain'
-        ],
-        'key_initiatives': [
-            'Supplier Clean Energy Program',
-            'Recycling robot Daisy',
-            'Privacy protection',
-            'Accessibility features'
-        ]
-    },
-    'NFLX': {
-        'name': 'Netflix Inc.',
-        'sector': 'Media & Entertainment',
-        'environmental': 75,
-        'social': 88,
-        'governance': 82,
-        'overall': 82,
-        'carbon_neutral': True,
-        'renewable_energy': 78,
-        'sustainability_goals': [
-            'Net zero emissions by 2030',
-            'Diverse content creation',
-            'Global accessibility',
-            'Responsible content'
-        ],
-        'key_initiatives': [
-            'Carbon offset programs',
-            'Inclusive storytelling',
-            'Employee wellbeing',
-            'Data privacy protection'
-        ]
-    },
-    'NVDA': {
-        'name': 'NVIDIA Corporation',
-        'sector': 'Technology',
-        'environmental': 88,
-        'social': 85,
-        'governance': 90,
-        'overall': 88,
-        'carbon_neutral': False,
-        'renewable_energy': 65,
-        'sustainability_goals': [
-            'AI for climate solutions',
-            'Sustainable computing',
-            'Diverse workforce',
-            'Ethical AI development'
-        ],
-        'key_initiatives': [
-            'Energy efficient GPUs',
-            'STEM education programs',
-            'Responsible AI research',
-            'Supply chain transparency'
-        ]
-    },
-    'META': {
-        'name': 'Meta Platforms Inc.',
-        'sector': 'Technology',
-        'environmental': 82,
-        'social': 76,
-        'governance': 78,
-        'overall': 79,
-        'carbon_neutral': True,
-        'renewable_energy': 100,
-        'sustainability_goals': [
-            'Net zero emissions by 2030',
-            'Digital inclusion',
-            'Privacy protection',
-            'Responsible innovation'
-        ],
-        'key_initiatives': [
-            '100% renewable energy',
-            'Digital literacy programs',
-            'Content moderation',
-            'Transparent governance'
-        ]
-    },
-    'AMZN': {
-        'name': 'Amazon.com Inc.',
-        'sector': 'E-commerce',
-        'environmental': 78,
-        'social': 82,
-        'governance': 85,
-        'overall': 82,
-        'carbon_neutral': False,
-        'renewable_energy': 85,
-        'sustainability_goals': [
-            'Net zero carbon by 2040',
-            'Climate pledge fund',
-            'Sustainable packaging',
-            'Employee development'
-        ],
-        'key_initiatives': [
-            'Electric delivery fleet',
-            'Renewable energy projects',
-            'Skills training programs',
-            'Supplier diversity'
-        ]
+# Drop cached payloads as soon as company data is committed
+company_events.subscribe(lambda changes: response_cache.clear())
+company_events.subscribe(lambda changes: ranking_index.invalidate())
+company_events.subscribe(lambda changes: search_index.invalidate())
+company_events.subscribe(lambda changes: company_tables.invalidate())
+
+# Simulated AI processing time per analysis, and the longest a client may long-poll
+ANALYSIS_DELAY_SECONDS = float(os.environ.get('ESG_ANALYSIS_DELAY', 2))
+# Suggested back-off when the analysis queue is full: about one analysis worth of time
+QUEUE_FULL_RETRY_AFTER = str(max(1, math.ceil(ANALYSIS_DELAY_SECONDS)))
+MAX_ANALYSIS_WAIT_SECONDS = 30
+
+# Largest number of symbols accepted by a single batch analysis request
+MAX_BATCH_SYMBOLS = int(os.environ.get('ESG_MAX_BATCH_SYMBOLS', 5000))
+MAX_SYMBOL_LENGTH = 10
+
+# Profile used for symbols that are not in the company database
+MOCK_SUSTAINABILITY_GOALS = [
+    'Carbon neutrality by 2030',
+    'Sustainable operations',
+    'Employee wellbeing',
+    'Ethical governance'
+]
+MOCK_KEY_INITIATIVES = [
+    'Green energy transition',
+    'Diversity programs',
+    'Transparent reporting',
+    'Community engagement'
+]
+
+# Changes whenever scoring or the mock profile does; company data is versioned by the table itself
+ANALYSIS_VERSION = hashlib.sha1(json_codec.encode({
+    'mock_goals': MOCK_SUSTAINABILITY_GOALS,
+    'mock_initiatives': MOCK_KEY_INITIATIVES,
+    'scoring': scoring.SCORING_VERSION
+})).hexdigest()[:12]
+
+def analysis_key(symbol, companies=None, day=None):
+    """Cache key and seed for a symbol's analysis: same symbol, data, scoring and UTC date, same result"""
+    if companies is None:
+        companies = company_tables.get()
+    day = day or datetime.now(timezone.utc).date().isoformat()
+    return f'{symbol}|{companies.version}|{ANALYSIS_VERSION}|{day}'
+
+def cached_analysis(symbol):
+    """(key, memoized result or None) for today's analysis of a validated symbol"""
+    key = analysis_key(symbol)
+    return key, analysis_cache.get(key)
+
+def run_analysis(company_symbol):
+    """Run the ESG analysis for a single symbol"""
+    # Simulate AI processing time
+    time.sleep(ANALYSIS_DELAY_SECONDS)
+    
+    return analyze_symbols([company_symbol])[0]
+
+def job_payload(job):
+    """Current state of an analysis job, as (status_code, payload, headers)"""
+    if job.status == COMPLETED:
+        return 200, job.result, {}
+    if job.status == FAILED:
+        return 500, {'error': job.error, 'job_id': job.id}, {}
+    
+    status_url = f'/api/esg/analyze/{job.id}'
+    return 202, {**job.to_dict(), 'status_url': status_url}, {
+        'Location': status_url,
+        'Retry-After': '1'
     }
-}
+
+def inline_wait(prefer):
+    """Seconds a POST /analyze waits for its result by default
+
+    Clients that send Prefer: respond-async get the 202 job at once and poll
+    it; older clients keep the synchronous 200 they were written against.
+    """
+    tokens = {token.split('=')[0].strip().lower() for token in (prefer or '').replace(';', ',').split(',')}
+    return 0 if 'respond-async' in tokens else MAX_ANALYSIS_WAIT_SECONDS
+
+def _job_response(job, wait):
+    """Build the API response for an analysis job, optionally long-polling"""
+    if wait > 0:
+        job.wait(min(wait, MAX_ANALYSIS_WAIT_SECONDS))
+    
+    status_code, payload, headers = job_payload(job)
+    response = jsonify(payload)
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
 
 @esg_bp.route('/api/esg/analyze', methods=['POST'])
 def analyze_company():
-    """Analyze ESG profile for a specific company"""
+    """Queue an ESG analysis for a specific company"""
     try:
         data = request.get_json()
-        company_symbol = data.get('symbol', '').upper()
-        
-        if not company_symbol:
-            return jsonify({'error': 'Company symbol is required'}), 400
+        company_symbol, error = validate_symbol(data.get('symbol', ''))
         
-        # Simulate AI processing time
-        time.sleep(2)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if company_symbol in ESG_COMPANIES:
-            company_data = ESG_COMPANIES[company_symbol]
-            
-            # Add some randomization to simulate real-time analysis
-            environmental = company_data['environmental'] + random.randint(-3, 3)
-            social = company_data['social'] + random.randint(-3, 3)
-            governance = company_data['governance'] + random.randint(-3, 3)
-            overall = (environmental + social + governance) // 3
-            
-            # Determine recommendation based on overall score
-            if overall >= 85:
-                recommendation = 'Strong Buy'
-                risk_level = 'Low'
-            elif overall >= 75:
-                recommendation = 'Buy'
-                risk_level = 'Medium'
-            else:
-                recommendation = 'Hold'
-                risk_level = 'High'
-            
-            result = {
-                'symbol': company_symbol,
-                'name': company_data['name'],
-                'sector': company_data['sector'],
-                'scores': {
-                    'environmental': max(0, min(100, environmental)),
-                    'social': max(0, min(100, social)),
-                    'governance': max(0, min(100, governance)),
-                    'overall': max(0, min(100, overall))
-                },
-                'recommendation': recommendation,
-                'risk_level': risk_level,
-                'carbon_neutral': company_data['carbon_neutral'],
-                'renewable_energy': company_data['renewable_energy'],
-                'sustainability_goals': company_data['sustainability_goals'],
-                'key_initiatives': company_data['key_initiatives'],
-                'analysis_timestamp': datetime.now().isoformat(),
-                'confidence': random.randint(85, 98)
-            }
-            
-            return jsonify(result)
-        else:
-            # Generate mock data for unknown companies
-            environmental = random.randint(60, 95)
-            social = random.randint(65, 90)
-            governance = random.randint(70, 95)
-            overall = (environmental + social + governance) // 3
-            
-            if overall >= 85:
-                recommendation = 'Strong Buy'
-                risk_level = 'Low'
-            elif overall >= 75:
-                recommendation = 'Buy'
-                risk_level = 'Medium'
-            else:
-                recommendation = 'Hold'
-                risk_level = 'High'
-            
-            result = {
-                'symbol': company_symbol,
-                'name': f'{company_symbol} Corporation',
-                'sector': 'Technology',
-                'scores': {
-                    'environmental': environmental,
-                    'social': social,
-                    'governance': governance,
-                    'overall': overall
-                },
-                'recommendation': recommendation,
-                'risk_level': risk_level,
-                'carbon_neutral': random.choice([True, False]),
-                'renewable_energy': random.randint(30, 100),
-                'sustainability_goals': [
-                    'Carbon neutrality by 2030',
-                    'Sustainable operations',
-                    'Employee wellbeing',
-                    'Ethical governance'
-                ],
-                'key_initiatives': [
-                    'Green energy transition',
-                    'Diversity programs',
-                    'Transparent reporting',
-                    'Community engagement'
-                ],
-                'analysis_timestamp': datetime.now().isoformat(),
-                'confidence': random.randint(75, 95)
-            }
-            
+        # Already analyzed today: the answer cannot differ, so skip the queue
+        key, result = cached_analysis(company_symbol)
+        if result is not None:
             return jsonify(result)
+        
+        # Concurrent requests for the same analysis share one in-flight job
+        job = analysis_jobs.submit(company_symbol, run_analysis, company_symbol, key=key)
+        wait = request.args.get('wait', type=float)
+        return _job_response(job, inline_wait(request.headers.get('Prefer')) if wait is None else wait)
             
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': QUEUE_FULL_RETRY_AFTER}
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@esg_bp.route('/api/esg/rankings', methods=['GET'])
-def get_esg_rankings():
-    """Get top ESG performing companies"""
+@esg_bp.route('/api/esg/analyze/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Get the status or result of a queued ESG analysis"""
     try:
-        # Generate rankings based on stored data
-        rankings = []
-        for symbol, data in ESG_COMPANIES.items():
-            rankings.append({
-                'symbol': symbol,
-                'name': data['name'],
-                'sector': data['sector'],
-                'overall_score': data['overall'],
-                'environmental': data['environmental'],
-                'social': data['social'],
-                'governance': data['governance'],
-                'carbon_neutral': data['carbon_neutral'],
-                'renewable_energy': data['renewable_energy']
-            })
+        job = analysis_jobs.get(job_id)
         
-        # Sort by overall score
-        rankings.sort(key=lambda x: x['overall_score'], reverse=True)
+        if job is None:
+            return jsonify({'error': 'Analysis job not found'}), 404
         
-        # Add ranking positions
-        for i, company in enumerate(rankings):
-            company['rank'] = i + 1
-            if company['overall_score'] >= 85:
-                company['recommendation'] = 'Strong Buy'
-            elif company['overall_score'] >= 75:
-                company['recommendation'] = 'Buy'
-            else:
-                company['recommendation'] = 'Hold'
-        
-        return jsonify(rankings)
+        return _job_response(job, request.args.get('wait', 0, type=float))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@esg_bp.route('/api/esg/trends', methods=['GET'])
-def get_esg_trends():
-    """Get ESG performance trends over time"""
+def validate_symbol(raw):
+    """Normalize a requested symbol, returning (symbol, error)"""
+    symbol = raw.strip().upper() if isinstance(raw, str) else ''
+    if not symbol:
+        return symbol, 'Company symbol is required'
+    if len(symbol) > MAX_SYMBOL_LENGTH:
+        return symbol, f'Company symbol must be at most {MAX_SYMBOL_LENGTH} characters'
+    return symbol, None
+
+def analyze_symbols(raw_symbols):
+    """Analyze many symbols, keeping input order
+
+    Results are seeded from (symbol, data version, date) and memoized, so
+    only symbols not yet analyzed today are scored, in one vectorized pass.
+    """
+    count = len(raw_symbols)
+    symbols, errors = zip(*map(validate_symbol, raw_symbols)) if count else ((), ())
+    
+    companies = company_tables.get()
+    day = datetime.now(timezone.utc).date().isoformat()
+    keys = {
+        symbol: analysis_key(symbol, companies, day)
+        for symbol, error in zip(symbols, errors) if error is None
+    }
+    analyses = analysis_cache.get_many(list(keys.values()))
+    missing = [symbol for symbol, key in keys.items() if key not in analyses]
+    if missing:
+        scored = score_symbols(companies, missing, [keys[symbol] for symbol in missing])
+        analysis_cache.set_many(scored)
+        analyses.update(scored)
+    
+    return [
+        {'symbol': raw, 'error': error} if error is not None else analyses[keys[symbol]]
+        for raw, symbol, error in zip(raw_symbols, symbols, errors)
+    ]
+
+def score_symbols(companies, symbols, keys):
+    """Score validated symbols in one vectorized pass, as {key: result}
+
+    Companies in the table are scored from their stored pillars, others
+    from mock draws. Every random draw comes from the symbol's key, so
+    scoring the same key again (in any worker) gives the same result.
+    """
+    seeds = scoring.stable_seeds(keys)
+    rows = companies.rows(symbols)
+    known = rows >= 0
+    
+    # Stored pillar scores (plus jitter) for known companies, mock draws otherwise
+    pillars = np.empty((len(symbols), 3), dtype=np.int64)
+    pillars[known] = scoring.seeded_jitter(np.rint(companies.pillars(rows[known])), seeds[known])
+    pillars[~known] = scoring.seeded_mock_pillars(seeds[~known])
+    
+    scored = scoring.score(pillars)
+    confidence = np.where(
+        known,
+        scoring.seeded_integers(seeds, 3, 85, 98),
+        scoring.seeded_integers(seeds, 3, 75, 95)
+    )
+    carbon_neutral = scoring.seeded_integers(seeds, 4, 0, 1).astype(bool)
+    carbon_neutral[known] = companies.carbon_neutral[rows[known]]
+    renewable_energy = scoring.seeded_integers(seeds, 5, 30, 100)
+    renewable_energy[known] = np.rint(companies.renewable_energy[rows[known]])
+    
+    timestamp = datetime.now().isoformat()
+    environmental = scored['environmental'].tolist()
+    social = scored['social'].tolist()
+    governance = scored['governance'].tolist()
+    overall = scored['overall'].tolist()
+    recommendations = scored['recommendation'].tolist()
+    risk_levels = scored['risk_level'].tolist()
+    confidence = confidence.tolist()
+    carbon_neutral = carbon_neutral.tolist()
+    renewable_energy = renewable_energy.tolist()
+    rows = rows.tolist()
+    
+    results = {}
+    for i, symbol in enumerate(symbols):
+        row = rows[i]
+        if row >= 0:
+            profile = {
+                'name': companies.name(row),
+                'sector': companies.sector(row),
+                'sustainability_goals': companies.goals(row),
+                'key_initiatives': companies.initiatives(row)
+            }
+        else:
+            profile = {
+                'name': f'{symbol} Corporation',
+                'sector': 'Technology',
+                'sustainability_goals': MOCK_SUSTAINABILITY_GOALS,
+                'key_initiatives': MOCK_KEY_INITIATIVES
+            }
+        
+        results[keys[i]] = {
+            'symbol': symbol,
+            'name': profile['name'],
+            'sector': profile['sector'],
+            'scores': {
+                'environmental': environmental[i],
+                'social': social[i],
+                'governance': governance[i],
+                'overall': overall[i]
+            },
+            'recommendation': recommendations[i],
+            'risk_level': risk_levels[i],
+            'carbon_neutral': carbon_neutral[i],
+            'renewable_energy': renewable_energy[i],
+            'sustainability_goals': profile['sustainability_goals'],
+            'key_initiatives': profile['key_initiatives'],
+            'analysis_timestamp': timestamp,
+            'confidence': confidence[i]
+        }
+    
+    return results
+
+def batch_payload(data):
+    """Batch analysis for a request body, as (status_code, payload)"""
+    symbols = data.get('symbols') if isinstance(data, dict) else None
+    
+    if not isinstance(symbols, list) or not symbols:
+        return 400, {'error': 'A non-empty list of symbols is required'}
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return 413, {'error': f'At most {MAX_BATCH_SYMBOLS} symbols are allowed per batch'}
+    
+    results = analyze_symbols(symbols)
+    return 200, {
+        'results': results,
+        'count': len(results),
+        'failed': sum(1 for result in results if 'error' in result)
+    }
+
+@esg_bp.route('/api/esg/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze ESG profiles for many companies in a single request"""
     try:
-        # Generate trend data for the last 6 months
-        trends = []
-        base_date = datetime.now() - timedelta(days=150)
+        status_code, payload = batch_payload(request.get_json())
+        return jsonify(payload), status_code
         
-        for i in range(6):
-            month_date = base_date + timedelta(days=30 * i)
-            trends.append({
-                'month': month_date.strftime('%b'),
-                'environmental': 72 + i * 2 + random.randint(-1, 1),
-                'social': 68 + i * 2 + random.randint(-1, 1),
-                'governance': 85 + i + random.randint(-1, 1),
-                'overall': 75 + i * 1.5 + random.randint(-1, 1)
-            })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def portfolio_payload(data):
+    """Weighted ESG aggregates for one or many portfolios, as (status_code, payload)"""
+    try:
+        ids, symbols, weights, owners = portfolio.parse_portfolios(data)
+    except portfolio.TooManyHoldings as e:
+        return 413, {'error': str(e)}
+    except ValueError as e:
+        return 400, {'error': str(e)}
+    
+    results = portfolio.aggregate(company_tables.get(), ids, symbols, weights, owners)
+    return 200, {'portfolios': results, 'count': len(results)}
+
+@esg_bp.route('/api/esg/portfolio', methods=['POST'])
+def analyze_portfolios():
+    """Aggregate ESG scores, sector exposure and carbon metrics for weighted portfolios"""
+    try:
+        status_code, payload = portfolio_payload(request.get_json())
+        return jsonify(payload), status_code
         
-        return jsonify(trends)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def rankings_payload(db, args):
+    """Rankings page for the given query args, as (payload, headers)"""
+    limit = args.get('limit', rankings.DEFAULT_PAGE_SIZE, type=int)
+    offset = args.get('offset', 0, type=int)
+    cursor = args.get('cursor')
+    sectors = [
+        sector.strip()
+        for value in args.getlist('sector')
+        for sector in value.split(',')
+        if sector.strip()
+    ]
+    
+    if not 1 <= limit <= rankings.MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {rankings.MAX_PAGE_SIZE}')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    
+    if args.get('weights'):
+        return weighted_rankings_payload(db, args, rankings.parse_weights(args['weights']), limit, offset, sectors)
+    
+    page, total, next_cursor = ranking_index.page(
+        db,
+        limit=limit,
+        offset=offset,
+        cursor=rankings.decode_cursor(cursor) if cursor else None,
+        sectors=sectors
+    )
+    
+    # Keep the body a plain list; paging details travel in headers
+    headers = {'X-Total-Count': str(total)}
+    if next_cursor:
+        query = urlencode({'limit': limit, 'cursor': next_cursor, 'sector': sectors}, doseq=True)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'</api/esg/rankings?{query}>; rel="next"'
+    return page, headers
+
+def weighted_rankings_payload(db, args, weights, limit, offset, sectors):
+    """Rankings page under custom pillar weights, as (payload, headers); pages by offset"""
+    if args.get('cursor'):
+        raise ValueError('cursor cannot be combined with weights; page with offset')
+    
+    page, total = ranking_index.weighted_page(db, weights, limit=limit, offset=offset, sectors=sectors)
+    headers = {'X-Total-Count': str(total)}
+    if offset + limit < total:
+        query = urlencode(
+            {'limit': limit, 'offset': offset + limit, 'weights': args['weights'], 'sector': sectors}, doseq=True
+        )
+        headers['Link'] = f'</api/esg/rankings?{query}>; rel="next"'
+    return page, headers
+
+def trends_payload(db, args):
+    """Score trends for the given query args, as (payload, headers)"""
+    return trends.score_trends(
+        db,
+        granularity=args.get('granularity', 'month'),
+        symbol=args.get('symbol'),
+        sector=args.get('sector'),
+        start=args.get('start'),
+        end=args.get('end')
+    ), {}
+
+def sectors_payload(db, args):
+    """Per-sector aggregates, as (payload, headers)"""
+    return aggregates.sector_analysis(db), {}
+
+def metrics_payload(db, args):
+    """Universe-wide metrics, as (payload, headers)"""
+    return aggregates.esg_metrics(db), {}
+
+def search_payload(db, args):
+    """Full-text and prefix search over names, symbols, goals and initiatives, as (payload, headers)"""
+    query = args.get('q', '').strip()
+    limit = args.get('limit', search.DEFAULT_LIMIT, type=int)
+    fields = [
+        field.strip()
+        for value in args.getlist('field')
+        for field in value.split(',')
+        if field.strip()
+    ] or search.FIELDS
+    
+    if not query:
+        raise ValueError('q is required')
+    if not 1 <= limit <= search.MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {search.MAX_LIMIT}')
+    unknown = [field for field in fields if field not in search.FIELDS]
+    if unknown:
+        raise ValueError(f"field must be one of: {', '.join(search.FIELDS)}")
+    
+    results = search_index.search(db, query, fields=fields, limit=limit)
+    return {'query': query, 'results': results, 'count': len(results)}, {}
+
+def screen_payload(db, args):
+    """Companies matching a compound filter, sorted and cut to the top k, as (payload, headers)"""
+    limit = args.get('limit', screening.DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= screening.MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {screening.MAX_LIMIT}')
+    
+    return screening.screen(
+        db,
+        filter_text=args.get('filter', '').strip(),
+        sort=args.get('sort', '-overall'),
+        limit=limit
+    ), {}
+
+# Read-only endpoints by path, shared with the ASGI server
+READ_ENDPOINTS = {
+    '/api/esg/rankings': rankings_payload,
+    '/api/esg/trends': trends_payload,
+    '/api/esg/sectors': sectors_payload,
+    '/api/esg/metrics': metrics_payload,
+    '/api/esg/search': search_payload,
+    '/api/esg/screen': screen_payload
+}
+
+# Pushed to /api/esg/stream clients whenever they change, in place of polling these endpoints
+live_updates.broadcaster.add_source('rankings', lambda db: rankings_payload(db, MultiDict())[0])
+live_updates.broadcaster.add_source('metrics', lambda db: metrics_payload(db, MultiDict())[0])
+
+def _read_response(payload_fn):
+    """Run a read endpoint against the request session and wrap it in a JSON response"""
+    try:
+        payload, headers = payload_fn(db_session(), request.args)
+        response = jsonify(payload)
+        response.headers.update(headers)
+        return response
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@esg_bp.route('/api/esg/rankings', methods=['GET'])
+@cached_response()
+def get_esg_rankings():
+    """Get top ESG performing companies"""
+    return _read_response(rankings_payload)
+
+@esg_bp.route('/api/esg/trends', methods=['GET'])
+@cached_response()
+def get_esg_trends():
+    """Get ESG performance trends over time"""
+    return _read_response(trends_payload)
+
 @esg_bp.route('/api/esg/sectors', methods=['GET'])
+@cached_response()
 def get_sector_analysis():
     """Get ESG performance by sector"""
+    return _read_response(sectors_payload)
+
+@esg_bp.route('/api/esg/metrics', methods=['GET'])
+@cached_response()
+def get_esg_metrics():
+    """Get overall ESG metrics and statistics"""
+    return _read_response(metrics_payload)
+
+@esg_bp.route('/api/esg/search', methods=['GET'])
+@cached_response()
+def search_companies():
+    """Search companies by name, symbol, goal or initiative"""
+    return _read_response(search_payload)
+
+@esg_bp.route('/api/esg/screen', methods=['GET'])
+@cached_response()
+def screen_companies():
+    """Screen companies with a compound filter, e.g. environmental >= 80 AND carbon_neutral"""
+    return _read_response(screen_payload)
+
+@esg_bp.route('/api/esg/export', methods=['GET'])
+def export_universe():
+    """Stream the full company universe (or score history) as NDJSON, CSV or Parquet"""
     try:
-        sectors = [
-            {
-                'sector': 'Technology',
-                'environmental': 78,
-                'social': 82,
-                'governance': 88,
-                'companies_count': 245
-            },
-            {
-                'sector': 'Healthcare',
-                'environmental': 65,
-                'social': 85,
-                'governance': 82,
-                'companies_count': 156
-            },
-            {
-                'sector': 'Financial Services',
-                'environmental': 58,
-                'social': 72,
-                'governance': 92,
-                'companies_count': 189
-            },
-            {
-                'sector': 'Energy',
-                'environmental': 45,
-                'social': 68,
-                'governance': 75,
-                'companies_count': 98
-            },
-            {
-                'sector': 'Consumer Goods',
-                'environmental': 62,
-                'social': 78,
-                'governance': 80,
-                'companies_count': 167
-            }
-        ]
+        export_format = request.args.get('format', 'ndjson')
+        dataset = request.args.get('dataset', 'companies')
+        chunks = export.export_stream(dataset=dataset, export_format=export_format)
         
-        return jsonify(sectors)
+        filename = f"esg-{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+        return Response(chunks, mimetype=export.FORMATS[export_format], headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no'
+        })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@esg_bp.route('/api/esg/metrics', methods=['GET'])
-def get_esg_metrics():
-    """Get overall ESG metrics and statistics"""
+@esg_bp.route('/api/esg/changes', methods=['GET'])
+def get_changes():
+    """Companies inserted, updated or deleted since a change cursor, for delta sync"""
     try:
-        metrics = {
-            'total_companies': 2847,
-            'average_esg_score': 78.4,
-            'sustainable_leaders': 342,
-            'carbon_neutral_companies': 156,
-            'score_distribution': {
-                'excellent': 342,  # 85+
-                'good': 1245,      # 70-84
-                'fair': 987,       # 55-69
-                'poor': 273        # <55
-            },
-            'sector_leaders': [
-                {'sector': 'Technology', 'leader': 'MSFT', 'score': 92},
-                {'sector': 'Healthcare', 'leader': 'JNJ', 'score': 89},
-                {'sector': 'Financial', 'leader': 'JPM', 'score': 87},
-                {'sector': 'Energy', 'leader': 'NEE', 'score': 85},
-                {'sector': 'Consumer', 'leader': 'PG', 'score': 88}
-            ]
-        }
+        limit = request.args.get('limit', changes.DEFAULT_LIMIT, type=int)
+        if not 1 <= limit <= changes.MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {changes.MAX_LIMIT}')
         
-        return jsonify(metrics)
+        return jsonify(changes.changes_since(db_session(), since=request.args.get('since'), limit=limit))
         
+    except changes.CursorExpired as e:
+        return jsonify({'error': str(e)}), 410
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@esg_bp.route('/api/esg/stream', methods=['GET'])
+def stream_updates():
+    """The live update stream is served by asgi.py only
+
+    Under WSGI every connected client would hold a worker thread for as long
+    as it stays connected; a single sync worker would serve nothing else.
+    """
+    return jsonify({
+        'error': 'The live update stream needs the ASGI server (uvicorn --app-dir src asgi:app)'
+    }), 501
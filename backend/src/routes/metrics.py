@@ -0,0 +1,12 @@
+from flask import Blueprint, Response, jsonify
+
+from services import telemetry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint; 404 unless ESG_METRICS_ENABLED is set"""
+    if not telemetry.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(telemetry.render_metrics(), mimetype='text/plain; version=0.0.4')
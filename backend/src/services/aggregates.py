@@ -0,0 +1,44 @@
+from sqlalchemy import select
+
+from models.esg_sector_summary import ESGSectorSummary
+
+
+def _summaries(session):
+    """Sector summary rows of sectors that still have companies (backfilled by init_db)"""
+    summaries = session.scalars(select(ESGSectorSummary)).all()
+    return [summary for summary in summaries if summary.companies_count > 0]
+
+
+def sector_analysis(session):
+    """Per-sector mean scores and company counts, largest sectors first"""
+    summaries = sorted(_summaries(session), key=lambda s: (-s.companies_count, s.sector))
+    return [summary.to_dict() for summary in summaries]
+
+
+def esg_metrics(session):
+    """Universe-wide ESG statistics derived from the sector summaries"""
+    summaries = _summaries(session)
+    total = sum(s.companies_count for s in summaries)
+    overall_total = sum(s.overall_total for s in summaries)
+
+    # Leaders are kept on the summary rows, so this is one query however many sectors there are
+    leaders = [
+        {'sector': summary.sector, 'leader': summary.leader_symbol, 'score': summary.leader_score}
+        for summary in summaries if summary.leader_symbol is not None
+    ]
+    leaders.sort(key=lambda leader: (-leader['score'], leader['sector']))
+
+    excellent = sum(s.excellent_count for s in summaries)
+    return {
+        'total_companies': total,
+        'average_esg_score': round(overall_total / total, 1) if total else 0.0,
+        'sustainable_leaders': excellent,
+        'carbon_neutral_companies': sum(s.carbon_neutral_count for s in summaries),
+        'score_distribution': {
+            'excellent': excellent,                             # 85+
+            'good': sum(s.good_count for s in summaries),       # 70-84
+            'fair': sum(s.fair_count for s in summaries),       # 55-69
+            'poor': sum(s.poor_count for s in summaries)        # <55
+        },
+        'sector_leaders': leaders
+    }
@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict
+
+from services import json_codec
+from services.shared_cache import shared_store
+
+MAX_ENTRIES = int(os.environ.get('ESG_ANALYSIS_CACHE_SIZE', 10000))
+# Analyses are keyed by date, so shared entries never need to outlive a couple of days
+STORE_TTL_SECONDS = float(os.environ.get('ESG_ANALYSIS_STORE_TTL', 2 * 24 * 3600))
+
+
+class AnalysisCache:
+    """Bounded LRU of analysis results, optionally backed by a shared store
+
+    Results are deterministic for a key, so entries never go stale; the
+    LRU bound only caps memory. Misses fall through to the store, whose
+    hits are promoted into the LRU.
+    """
+
+    # Namespace of analysis entries in a store shared with other caches
+    STORE_PREFIX = 'analysis:'
+
+    def __init__(self, max_entries=MAX_ENTRIES, store=None, store_ttl=STORE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.store = store
+        self.store_ttl = store_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        """{key: result} for every key held locally or in the store"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = result
+        missing = [key for key in keys if key not in found]
+        if missing and self.store is not None:
+            stored = self.store.get_many([self.STORE_PREFIX + key for key in missing])
+            shared = {
+                key[len(self.STORE_PREFIX):]: json_codec.decode(value) for key, value in stored.items()
+            }
+            self._remember(shared)
+            found.update(shared)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set_many(self, results):
+        """Cache {key: result}; results must not be mutated afterwards"""
+        if not results:
+            return
+        self._remember(results)
+        if self.store is not None:
+            self.store.set_many(
+                {self.STORE_PREFIX + key: json_codec.encode(result) for key, result in results.items()},
+                self.store_ttl
+            )
+
+    def _remember(self, results):
+        with self._lock:
+            for key, result in results.items():
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every local entry (the shared store keeps its own)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+analysis_cache = AnalysisCache(store=shared_store)
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker pool sizing and retention of finished jobs
+ANALYSIS_WORKERS = int(os.environ.get('ESG_ANALYSIS_WORKERS', 8))
+JOB_TTL_SECONDS = float(os.environ.get('ESG_ANALYSIS_JOB_TTL', 300))
+MAX_TRACKED_JOBS = int(os.environ.get('ESG_ANALYSIS_MAX_JOBS', 10000))
+# Unfinished jobs accepted per worker before new analyses are turned away
+MAX_PENDING_JOBS = int(os.environ.get('ESG_ANALYSIS_MAX_PENDING', 1000))
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class QueueFull(Exception):
+    """Too many analyses are waiting to run; the client should retry later"""
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AnalysisJob:
+    """A single queued ESG analysis"""
+
+    __slots__ = ('id', 'symbol', 'key', 'status', 'result', 'error',
+                 'created_at', 'finished_at', '_done', '_waiters', '_waiters_lock')
+
+    def __init__(self, symbol, key=None):
+        self.id = uuid.uuid4().hex
+        self.symbol = symbol
+        self.key = key
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.monotonic()
+        self.finished_at = None
+        self._done = threading.Event()
+        self._waiters = []
+        self._waiters_lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or the timeout elapses"""
+        return self._done.wait(timeout)
+
+    async def wait_async(self, timeout):
+        """Like wait(), but suspends the coroutine instead of blocking a thread"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._waiters_lock:
+            if self.done:
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._waiters_lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+        return self.done
+
+    def _set_done(self):
+        with self._waiters_lock:
+            self._done.set()
+            waiters, self._waiters = self._waiters, []
+        # Finishing may happen on a pool thread; hand each waiter back to its own loop
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def to_dict(self):
+        """Convert job state to dictionary for API responses"""
+        return {
+            'job_id': self.id,
+            'symbol': self.symbol,
+            'status': self.status
+        }
+
+
+class AnalysisJobQueue:
+    """Runs analyses on a background thread pool and tracks their results"""
+
+    def __init__(self, max_workers=ANALYSIS_WORKERS, job_ttl=JOB_TTL_SECONDS,
+                 max_jobs=MAX_TRACKED_JOBS, max_pending=MAX_PENDING_JOBS):
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = None
+        self._jobs = {}
+        # Unfinished jobs by key, so concurrent requests for the same analysis share one job
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        # Created lazily so a forked gunicorn worker never inherits dead threads
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='esg-analysis'
+            )
+            self._pid = os.getpid()
+        return self._executor
+
+    def create(self, symbol, key=None):
+        """Register a job that the caller will run and finish itself, as (job, created)
+
+        With a key, a job still in flight for the same key is returned
+        instead (created is False) and the caller must not run it again.
+        Raises QueueFull when max_pending jobs are already unfinished.
+        """
+        with self._lock:
+            job = self._in_flight.get(key) if key is not None else None
+            if job is not None:
+                self.coalesced += 1
+                return job, False
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull('Too many analyses are queued; retry later')
+            self._prune()
+            job = AnalysisJob(symbol, key)
+            self._jobs[job.id] = job
+            self._pending += 1
+            if key is not None:
+                self._in_flight[key] = job
+        return job, True
+
+    def submit(self, symbol, fn, *args, key=None):
+        """Enqueue fn(*args) on the worker pool and return the job tracking it
+
+        Submissions with the key of an unfinished job join that job rather
+        than running fn again (single flight).
+        """
+        job, created = self.create(symbol, key)
+        if created:
+            with self._lock:
+                executor = self._get_executor()
+            executor.submit(self._run, job, fn, args)
+        return job
+
+    def finish(self, job, result=None, error=None):
+        """Record the outcome of a job and wake anything waiting on it"""
+        if error is None:
+            job.result = result
+            job.status = COMPLETED
+        else:
+            job.error = error
+            job.status = FAILED
+        with self._lock:
+            if job.finished_at is None:
+                self._pending -= 1
+            job.finished_at = time.monotonic()
+            if job.key is not None and self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        job._set_done()
+
+    def get(self, job_id):
+        """Look up a job by id, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        """Number of jobs that have not finished yet"""
+        with self._lock:
+            return self._pending
+
+    def _run(self, job, fn, args):
+        job.status = RUNNING
+        try:
+            self.finish(job, result=fn(*args))
+        except Exception as e:
+            self.finish(job, error=str(e))
+
+    def _prune(self):
+        # Drop expired results, then the oldest finished jobs if still over the limit
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        if len(self._jobs) >= self.max_jobs:
+            finished = sorted(
+                (job for job in self._jobs.values() if job.done),
+                key=lambda job: job.finished_at
+            )
+            for job in finished[:len(self._jobs) - self.max_jobs + 1]:
+                del self._jobs[job.id]
+
+
+analysis_jobs = AnalysisJobQueue()
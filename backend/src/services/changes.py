@@ -0,0 +1,132 @@
+import base64
+import binascii
+
+from sqlalchemy import and_, or_, select
+
+from models.esg_company import ESGCompany
+from models.esg_company_change import ESGCompanyChange, current_sequence
+from services import json_codec
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+_companies = ESGCompany.__table__
+_changes = ESGCompanyChange.__table__
+
+_COMPANY_COLUMNS = (
+    _companies.c.id, _companies.c.symbol, _companies.c.name, _companies.c.sector,
+    _companies.c.environmental_score, _companies.c.social_score, _companies.c.governance_score,
+    _companies.c.overall_score, _companies.c.carbon_neutral, _companies.c.renewable_energy_percentage,
+    _companies.c.sustainability_goals, _companies.c.key_initiatives, _companies.c.last_updated,
+    _companies.c.data_source
+)
+
+
+class CursorExpired(Exception):
+    """The cursor predates deletions that are no longer kept; the client must resync from scratch"""
+
+
+def encode_cursor(sequence, symbol='', company_id=None):
+    """Opaque cursor: changes after (sequence, symbol), or a full sync paused after company_id
+
+    With no symbol the cursor points past every change numbered up to sequence.
+    """
+    state = {'s': sequence, 'k': symbol, 'i': company_id}
+    return base64.urlsafe_b64encode(json_codec.encode(state)).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(sequence, symbol, company_id) of a cursor; raises ValueError"""
+    try:
+        state = json_codec.decode(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return (
+            int(state['s']),
+            str(state['k']),
+            int(state['i']) if state['i'] is not None else None
+        )
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise ValueError('since is not a valid change cursor')
+
+
+def _company_payload(row):
+    return {
+        'symbol': row.symbol,
+        'name': row.name,
+        'sector': row.sector,
+        'scores': {
+            'environmental': row.environmental_score,
+            'social': row.social_score,
+            'governance': row.governance_score,
+            'overall': row.overall_score
+        },
+        'carbon_neutral': row.carbon_neutral,
+        'renewable_energy': row.renewable_energy_percentage,
+        'sustainability_goals': row.sustainability_goals.split('|') if row.sustainability_goals else [],
+        'key_initiatives': row.key_initiatives.split('|') if row.key_initiatives else [],
+        'last_updated': row.last_updated.isoformat() if row.last_updated is not None else None,
+        'data_source': row.data_source
+    }
+
+
+def _after(sequence, symbol):
+    # An empty symbol means every change of `sequence` has been delivered
+    if not symbol:
+        return _changes.c.seq > sequence
+    return or_(_changes.c.seq > sequence, and_(_changes.c.seq == sequence, _changes.c.symbol > symbol))
+
+
+def _full_sync(connection, sequence, company_id, limit):
+    # Every current company by id; changes committed meanwhile follow as deltas after `sequence`
+    rows = connection.execute(
+        select(*_COMPANY_COLUMNS).where(_companies.c.id > company_id).order_by(_companies.c.id).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    cursor = encode_cursor(sequence, company_id=rows[-1].id) if has_more else encode_cursor(sequence)
+    return {
+        'upserted': [_company_payload(row) for row in rows],
+        'deleted': [],
+        'cursor': cursor,
+        'has_more': has_more
+    }
+
+
+def changes_since(session, since=None, limit=DEFAULT_LIMIT):
+    """Companies upserted and symbols deleted after a cursor, plus the cursor to poll with next
+
+    Without since, every current company is returned (a full initial sync,
+    paged like any other response). Changes are keyed on a sequence
+    number assigned in commit order, so a cursor never passes a change
+    that commits later. Clients keep polling while has_more is true.
+    """
+    connection = session.connection()
+    latest, pruned_through = current_sequence(connection)
+
+    if not since:
+        return _full_sync(connection, latest, 0, limit)
+    sequence, symbol, company_id = decode_cursor(since)
+    # Deletions up to and including pruned_through are gone; a cursor part-way through that
+    # sequence may have been about to receive one of them
+    if sequence < pruned_through or (sequence == pruned_through and symbol):
+        raise CursorExpired('Change cursor has expired; sync again without since')
+    if company_id is not None:
+        return _full_sync(connection, sequence, company_id, limit)
+
+    rows = connection.execute(
+        select(_changes.c.seq, _changes.c.symbol.label('changed_symbol'), _changes.c.deleted, *_COMPANY_COLUMNS)
+        .select_from(_changes.outerjoin(_companies, _companies.c.symbol == _changes.c.symbol))
+        .where(_after(sequence, symbol))
+        .order_by(_changes.c.seq, _changes.c.symbol)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        sequence, symbol = rows[-1].seq, rows[-1].changed_symbol
+
+    return {
+        'upserted': [_company_payload(row) for row in rows if not row.deleted and row.id is not None],
+        'deleted': [row.changed_symbol for row in rows if row.deleted or row.id is None],
+        'cursor': encode_cursor(sequence, symbol),
+        'has_more': has_more
+    }
@@ -0,0 +1,80 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models.esg_company import ESGCompany
+
+INSERT = 'insert'
+UPDATE = 'update'
+DELETE = 'delete'
+# Statement-level writes (bulk update/delete, Core inserts) where the rows are not known
+BULK = 'bulk'
+
+_SESSION_KEY = 'esg_company_changes'
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Call callback(changes) after every commit that wrote ESGCompany rows
+
+    changes is a list of (operation, symbol) tuples; symbol is None for BULK.
+    """
+    with _subscribers_lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def publish(changes):
+    """Notify subscribers of committed company changes
+
+    Writers that bypass the ORM unit of work call this themselves once
+    their transaction has committed.
+    """
+    if not changes:
+        return
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        callback(changes)
+
+
+def _record(session, operation, symbol):
+    if session is not None:
+        session.info.setdefault(_SESSION_KEY, []).append((operation, symbol))
+
+
+@event.listens_for(ESGCompany, 'after_insert')
+def _after_insert(mapper, connection, target):
+    _record(object_session(target), INSERT, target.symbol)
+
+
+@event.listens_for(ESGCompany, 'after_update')
+def _after_update(mapper, connection, target):
+    _record(object_session(target), UPDATE, target.symbol)
+
+
+@event.listens_for(ESGCompany, 'after_delete')
+def _after_delete(mapper, connection, target):
+    _record(object_session(target), DELETE, target.symbol)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _on_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is ESGCompany:
+        _record(orm_execute_state.session, BULK, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    publish(session.info.pop(_SESSION_KEY, None))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop(_SESSION_KEY, None)
@@ -0,0 +1,203 @@
+import csv
+import json
+import math
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert, or_
+
+from database.config import upsert_insert
+from models.esg_company import ESGCompany
+from models.esg_company_tag import MAX_TAG_LENGTH, replace_tags, split_tags
+from models.esg_company_change import record_changes
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Accepted input field names -> esg_companies columns
+FIELD_ALIASES = {
+    'symbol': 'symbol',
+    'name': 'name',
+    'sector': 'sector',
+    'environmental': 'environmental_score',
+    'environmental_score': 'environmental_score',
+    'social': 'social_score',
+    'social_score': 'social_score',
+    'governance': 'governance_score',
+    'governance_score': 'governance_score',
+    'overall': 'overall_score',
+    'overall_score': 'overall_score',
+    'carbon_neutral': 'carbon_neutral',
+    'renewable_energy': 'renewable_energy_percentage',
+    'renewable_energy_percentage': 'renewable_energy_percentage',
+    'sustainability_goals': 'sustainability_goals',
+    'key_initiatives': 'key_initiatives',
+    'data_source': 'data_source'
+}
+
+_SCORE_COLUMNS = ('environmental_score', 'social_score', 'governance_score')
+
+# Columns compared on conflict; unchanged rows keep their last_updated
+_DATA_COLUMNS = (
+    'name', 'sector', 'environmental_score', 'social_score', 'governance_score',
+    'overall_score', 'carbon_neutral', 'renewable_energy_percentage',
+    'sustainability_goals', 'key_initiatives', 'data_source'
+)
+
+_TRUE_VALUES = {'1', 'true', 't', 'yes', 'y'}
+
+
+def read_csv(path):
+    """Stream records from a CSV file with a header row"""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def read_jsonl(path):
+    """Stream records from a file holding one JSON object per line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # Handed on so normalize() reports it like any other bad record
+                yield ValueError(f'invalid JSON: {e.msg}')
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl
+}
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE_VALUES
+
+
+def _as_list_text(value):
+    # Lists (JSONL) and pipe-joined strings (CSV) are both stored pipe-joined
+    if value is None or value == '':
+        return None
+    if isinstance(value, (list, tuple)):
+        return '|'.join(str(item) for item in value)
+    return str(value)
+
+
+def _tag_text(value, column):
+    # Each entry becomes an esg_company_tags row; one overlong entry would fail the whole chunk on insert
+    text = _as_list_text(value)
+    if any(len(tag) > MAX_TAG_LENGTH for tag in split_tags(text)):
+        raise ValueError(f'{column} entries must be at most {MAX_TAG_LENGTH} characters')
+    return text
+
+
+def _percentage(value, column):
+    # nan would become NULL on SQLite and invalid JSON everywhere else
+    number = float(value)
+    if not math.isfinite(number) or not 0 <= number <= 100:
+        raise ValueError(f'{column} must be a number between 0 and 100')
+    return number
+
+
+def normalize(record):
+    """Map one input record onto esg_companies columns; raises ValueError if unusable"""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+    row = {}
+    for key, value in record.items():
+        column = FIELD_ALIASES.get(key.strip().lower()) if key else None
+        if column is not None and value not in (None, ''):
+            row[column] = value
+
+    for column in ('symbol', 'name', 'sector', *_SCORE_COLUMNS):
+        if column not in row:
+            raise ValueError(f'missing {column}')
+
+    row['symbol'] = str(row['symbol']).strip().upper()
+    if not row['symbol'] or len(row['symbol']) > 10:
+        raise ValueError('symbol must be 1-10 characters')
+    row['name'] = str(row['name']).strip()
+    row['sector'] = str(row['sector']).strip()
+
+    for column in (*_SCORE_COLUMNS, 'overall_score', 'renewable_energy_percentage'):
+        if column in row:
+            row[column] = _percentage(row[column], column)
+    if 'overall_score' not in row:
+        row['overall_score'] = float(sum(row[column] for column in _SCORE_COLUMNS) // 3)
+
+    row['carbon_neutral'] = _as_bool(row.get('carbon_neutral', False))
+    row.setdefault('renewable_energy_percentage', 0.0)
+    row['sustainability_goals'] = _tag_text(row.get('sustainability_goals'), 'sustainability_goals')
+    row['key_initiatives'] = _tag_text(row.get('key_initiatives'), 'key_initiatives')
+    row.setdefault('data_source', 'ESG Intelligence Engine')
+    return row
+
+
+def upsert_companies(connection, rows):
+    """Insert rows or update existing symbols in one executemany; returns rows sent"""
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    for row in rows:
+        row['last_updated'] = now
+
+    table = ESGCompany.__table__
+    dialect_insert = upsert_insert(connection)
+    if dialect_insert is None:
+        # Backends without ON CONFLICT: replace matching symbols, then insert
+        connection.execute(table.delete().where(table.c.symbol.in_([row['symbol'] for row in rows])))
+        connection.execute(insert(table), rows)
+        _replace_tags(connection, rows)
+        record_changes(connection, [row['symbol'] for row in rows])
+        return len(rows)
+
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.symbol],
+        set_={name: stmt.excluded[name] for name in (*_DATA_COLUMNS, 'last_updated')},
+        where=or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in _DATA_COLUMNS))
+    )
+    # Rows identical to the stored ones are skipped by the WHERE and not returned
+    changed = connection.execute(stmt.returning(table.c.symbol), rows).scalars().all()
+    _replace_tags(connection, rows)
+    record_changes(connection, changed)
+    return len(rows)
+
+
+def _replace_tags(connection, rows):
+    # Core writes skip the ORM hooks that keep esg_company_tags in step
+    replace_tags(connection, (
+        (row['symbol'], row['sustainability_goals'], row['key_initiatives']) for row in rows
+    ))
+
+
+def iter_chunks(records, chunk_size=DEFAULT_CHUNK_SIZE, on_error=None):
+    """Normalize records into lists of at most chunk_size rows
+
+    Invalid records are skipped and reported as on_error(record_number,
+    message). A symbol repeated within one chunk keeps its last occurrence.
+    """
+    records = iter(records)
+    position = 0
+    while True:
+        batch = list(islice(records, chunk_size))
+        if not batch:
+            return
+        rows = {}
+        for record in batch:
+            position += 1
+            try:
+                row = normalize(record)
+            except (ValueError, TypeError, AttributeError) as e:
+                if on_error is not None:
+                    on_error(position, str(e))
+                continue
+            rows[row['symbol']] = row
+        if rows:
+            yield list(rows.values())
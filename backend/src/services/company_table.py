@@ -0,0 +1,377 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from database.config import engine
+from models.esg_company import ESGCompany
+from models.esg_company_tag import split_tags
+from services.rankings import company_fingerprint
+
+# How often a worker re-checks the table for changes made by other processes
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('ESG_COMPANY_TABLE_REFRESH_SECONDS', 5))
+# Optional directory holding a memory-mapped snapshot shared by every worker on the host
+SNAPSHOT_DIR = os.environ.get('ESG_COMPANY_SNAPSHOT', '')
+# How long a replaced snapshot version is kept before a later save removes it
+SNAPSHOT_GRACE_SECONDS = 60
+
+LOAD_BATCH_SIZE = 10000
+SYMBOL_BYTES = 10
+
+# FNV-1a over the fixed-width symbol bytes
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_UINT64_MASK = (1 << 64) - 1
+
+_ARRAYS = (
+    'symbols', 'name_offsets', 'name_bytes', 'sector_codes', 'environmental', 'social', 'governance',
+    'overall', 'carbon_neutral', 'renewable_energy', 'goal_offsets', 'goal_ids',
+    'initiative_offsets', 'initiative_ids', 'slots'
+)
+_META_FILE = 'meta.json'
+
+
+def _symbol_bytes(symbols):
+    """Fixed-width byte array of symbols; symbols that do not fit become empty (never found)"""
+    encoded = [symbol.encode() for symbol in symbols]
+    return np.array([value if len(value) <= SYMBOL_BYTES else b'' for value in encoded], dtype=f'S{SYMBOL_BYTES}')
+
+
+def _hashes(symbol_bytes):
+    with np.errstate(over='ignore'):
+        columns = np.frombuffer(symbol_bytes.tobytes(), dtype=np.uint8).reshape(-1, SYMBOL_BYTES)
+        hashes = np.full(len(symbol_bytes), _FNV_OFFSET, dtype=np.uint64)
+        for column in columns.T:
+            hashes = (hashes ^ column) * _FNV_PRIME
+    return hashes
+
+
+def _build_slots(symbol_bytes):
+    """Open-addressing table (linear probing, at most half full) of row indexes, -1 = empty"""
+    capacity = 1 << max(3, int(2 * len(symbol_bytes)).bit_length())
+    slots = np.full(capacity, -1, dtype=np.int32)
+    mask = np.uint64(capacity - 1)
+    pending = np.arange(len(symbol_bytes), dtype=np.int64)
+    positions = (_hashes(symbol_bytes) & mask).astype(np.int64)
+    while len(pending):
+        free = slots[positions] == -1
+        # One row per free slot claims it this round; the rest probe onwards
+        _, first = np.unique(positions[free], return_index=True)
+        claimed = np.flatnonzero(free)[first]
+        slots[positions[claimed]] = pending[claimed]
+        keep = np.ones(len(pending), dtype=bool)
+        keep[claimed] = False
+        pending = pending[keep]
+        positions = (positions[keep] + 1) & (capacity - 1)
+    return slots
+
+
+def _tag_lists(texts, pool):
+    """(offsets, ids) of per-row tag lists, interning each distinct text into pool"""
+    ids = {text: i for i, text in enumerate(pool)}
+    offsets = [0]
+    row_ids = []
+    for joined in texts:
+        for text in split_tags(joined):
+            if text not in ids:
+                ids[text] = len(pool)
+                pool.append(sys.intern(text))
+            row_ids.append(ids[text])
+        offsets.append(len(row_ids))
+    return np.array(offsets, dtype=np.uint32), np.array(row_ids, dtype=np.int32)
+
+
+class CompanyTable:
+    """Immutable, array-backed snapshot of esg_companies
+
+    Columns are numpy arrays (struct of arrays): scores and flags are
+    scanned without touching Python objects, names live in one UTF-8 blob,
+    sectors and goal/initiative texts are interned codes, and a symbol
+    hash index makes lookups O(1). Nothing is refcounted per row, so the
+    arrays stay shared copy-on-write after fork, and a snapshot can be
+    memory-mapped from disk.
+    """
+
+    def __init__(self, arrays, sectors, tag_pool, fingerprint):
+        self.arrays = arrays
+        self.sectors = sectors
+        self.tag_pool = tag_pool
+        self.fingerprint = fingerprint
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.version = self._version()
+
+    @classmethod
+    def from_columns(cls, columns, fingerprint=None):
+        """Build a table from the symbol, name, sector, environmental, social, governance,
+        overall, carbon_neutral, renewable_energy, goals and initiatives column lists"""
+        symbols, names, sectors, environmental, social, governance, overall, carbon_neutral, \
+            renewable_energy, goals, initiatives = columns
+
+        encoded_names = [name.encode() for name in names]
+        sector_names = sorted(set(sectors))
+        sector_codes = {sector: code for code, sector in enumerate(sector_names)}
+        tag_pool = []
+        goal_offsets, goal_ids = _tag_lists(goals, tag_pool)
+        initiative_offsets, initiative_ids = _tag_lists(initiatives, tag_pool)
+        symbol_bytes = _symbol_bytes(symbols)
+
+        arrays = {
+            'symbols': symbol_bytes,
+            'name_offsets': np.cumsum([0] + [len(name) for name in encoded_names], dtype=np.uint32),
+            'name_bytes': np.frombuffer(b''.join(encoded_names), dtype=np.uint8),
+            'sector_codes': np.array([sector_codes[sector] for sector in sectors], dtype=np.uint16),
+            'environmental': np.array(environmental, dtype=np.float32),
+            'social': np.array(social, dtype=np.float32),
+            'governance': np.array(governance, dtype=np.float32),
+            'overall': np.array(overall, dtype=np.float32),
+            'carbon_neutral': np.array([bool(value) for value in carbon_neutral], dtype=bool),
+            'renewable_energy': np.array([value or 0.0 for value in renewable_energy], dtype=np.float32),
+            'goal_offsets': goal_offsets,
+            'goal_ids': goal_ids,
+            'initiative_offsets': initiative_offsets,
+            'initiative_ids': initiative_ids,
+            'slots': _build_slots(symbol_bytes)
+        }
+        return cls(arrays, [sys.intern(sector) for sector in sector_names], tag_pool, fingerprint)
+
+    @classmethod
+    def from_database(cls, connection, fingerprint=None):
+        """Build a table from esg_companies, streaming rows in batches"""
+        companies = ESGCompany.__table__
+        result = connection.execute(
+            select(
+                companies.c.symbol, companies.c.name, companies.c.sector,
+                companies.c.environmental_score, companies.c.social_score, companies.c.governance_score,
+                companies.c.overall_score, companies.c.carbon_neutral, companies.c.renewable_energy_percentage,
+                companies.c.sustainability_goals, companies.c.key_initiatives
+            ).order_by(companies.c.id).execution_options(stream_results=True)
+        )
+        # Transposed batch by batch, so the full list of row tuples never exists at once
+        columns = [[] for _ in result.keys()]
+        for partition in result.partitions(LOAD_BATCH_SIZE):
+            for column, values in zip(columns, zip(*partition)):
+                column.extend(values)
+        return cls.from_columns(columns, fingerprint)
+
+    def save(self, directory):
+        """Write the table to a versioned directory and point the `directory` symlink at it
+
+        The link is swapped with one rename, so a reader always finds a
+        complete snapshot behind it. Returns the versioned directory.
+        """
+        target = f'{directory}.{self.version}-{_fingerprint_digest(self.fingerprint)}'
+        if not os.path.isdir(target):
+            staging = f'{target}.{os.getpid()}.tmp'
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for name in _ARRAYS:
+                np.save(os.path.join(staging, f'{name}.npy'), self.arrays[name])
+            with open(os.path.join(staging, _META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'sectors': self.sectors, 'tag_pool': self.tag_pool, 'fingerprint': self.fingerprint}, f)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another worker wrote the same version at the same moment
+                shutil.rmtree(staging, ignore_errors=True)
+        else:
+            # Reused: restart its grace period so no other worker removes it as stale
+            os.utime(target)
+
+        link = f'{directory}.{os.getpid()}.link'
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.basename(target), link)
+        if os.path.isdir(directory) and not os.path.islink(directory):
+            # A snapshot written before versioned directories: a link cannot replace it in place
+            legacy = f'{directory}.{os.getpid()}.old'
+            os.rename(directory, legacy)
+            shutil.rmtree(legacy, ignore_errors=True)
+        os.replace(link, directory)
+        _remove_stale_versions(directory, current=os.path.realpath(target))
+        return target
+
+    @classmethod
+    def open(cls, directory):
+        """Memory-map a snapshot written by save(); pages are shared by every process mapping it"""
+        # Resolve the link once, so every file comes from the same version
+        directory = os.path.realpath(directory)
+        with open(os.path.join(directory, _META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+        return cls(
+            arrays,
+            [sys.intern(sector) for sector in meta['sectors']],
+            [sys.intern(text) for text in meta['tag_pool']],
+            meta['fingerprint']
+        )
+
+    def _version(self):
+        digest = hashlib.blake2b(digest_size=8)
+        for name in _ARRAYS[:-1]:
+            digest.update(np.ascontiguousarray(self.arrays[name]).tobytes())
+        digest.update(json.dumps([self.sectors, self.tag_pool]).encode())
+        return digest.hexdigest()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def rows(self, symbols):
+        """Row index of each symbol, -1 where the table does not hold it"""
+        keys = _symbol_bytes(symbols)
+        capacity = len(self.slots)
+        positions = (_hashes(keys) & np.uint64(capacity - 1)).astype(np.int64)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        active = np.flatnonzero(keys != b'')
+        while len(active):
+            candidates = self.slots[positions[active]]
+            occupied = candidates >= 0
+            # Only occupied slots are read, so an empty table never indexes its zero-length columns
+            found = occupied.copy()
+            found[occupied] = self.symbols[candidates[occupied]] == keys[active[occupied]]
+            rows[active[found]] = candidates[found]
+            # An empty slot ends the probe: that symbol is absent
+            active = active[occupied & ~found]
+            positions[active] = (positions[active] + 1) & (capacity - 1)
+        return rows
+
+    def row(self, symbol):
+        """Row index of one symbol, or -1; a scalar probe, avoiding per-call array overhead"""
+        key = symbol.encode()
+        if not key or len(key) > SYMBOL_BYTES:
+            return -1
+        key_hash = int(_FNV_OFFSET)
+        for byte in key.ljust(SYMBOL_BYTES, b'\0'):
+            key_hash = ((key_hash ^ byte) * int(_FNV_PRIME)) & _UINT64_MASK
+        mask = len(self.slots) - 1
+        position = key_hash & mask
+        while True:
+            candidate = int(self.slots[position])
+            if candidate < 0:
+                return -1
+            if self.symbols[candidate] == key:
+                return candidate
+            position = (position + 1) & mask
+
+    def __contains__(self, symbol):
+        return self.row(symbol) >= 0
+
+    def name(self, row):
+        return bytes(self.name_bytes[self.name_offsets[row]:self.name_offsets[row + 1]]).decode()
+
+    def sector(self, row):
+        return self.sectors[self.sector_codes[row]]
+
+    def _tags(self, offsets, ids, row):
+        return [self.tag_pool[i] for i in ids[offsets[row]:offsets[row + 1]]]
+
+    def goals(self, row):
+        return self._tags(self.goal_offsets, self.goal_ids, row)
+
+    def initiatives(self, row):
+        return self._tags(self.initiative_offsets, self.initiative_ids, row)
+
+    def pillars(self, rows):
+        """(len(rows), 3) environmental/social/governance scores"""
+        return np.column_stack([self.environmental[rows], self.social[rows], self.governance[rows]])
+
+
+def _remove_stale_versions(directory, current):
+    # Replaced versions stay for a grace period, for readers that resolved the link a moment ago
+    # and workers that wrote a version but have not linked it yet; processes that mapped a
+    # removed version keep their pages
+    parent, name = os.path.split(os.path.abspath(directory))
+    cutoff = time.time() - SNAPSHOT_GRACE_SECONDS
+    for entry in os.listdir(parent):
+        path = os.path.join(parent, entry)
+        if not entry.startswith(f'{name}.') or path == current or os.path.islink(path):
+            continue
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass  # removed by another worker meanwhile
+
+
+def _fingerprint_digest(fingerprint):
+    return hashlib.blake2b(json.dumps(fingerprint).encode(), digest_size=4).hexdigest()
+
+
+def _fingerprint(connection):
+    # JSON-safe, so it can be stored in a snapshot's metadata and compared after loading
+    count, max_id, last_updated = company_fingerprint(connection)
+    return [count, max_id, last_updated.isoformat() if last_updated is not None else None]
+
+
+class CompanyTableCache:
+    """Current CompanyTable, rebuilt when esg_companies changes
+
+    With a snapshot directory, a worker maps the snapshot when it matches
+    the database and otherwise builds the table and writes a fresh one.
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL_SECONDS, snapshot_dir=SNAPSHOT_DIR):
+        self.refresh_interval = refresh_interval
+        self.snapshot_dir = snapshot_dir
+        self._table = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force the next lookup to re-check the database"""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def _snapshot(self, fingerprint):
+        directory = os.path.realpath(self.snapshot_dir)
+        meta = os.path.join(directory, _META_FILE)
+        if not os.path.exists(meta):
+            return None
+        with open(meta, encoding='utf-8') as f:
+            if json.load(f)['fingerprint'] != fingerprint:
+                return None
+        return CompanyTable.open(directory)
+
+    def _build(self, connection, fingerprint):
+        if self.snapshot_dir:
+            try:
+                table = self._snapshot(fingerprint)
+            except (OSError, ValueError):
+                # Replaced and removed by another worker while we read it: build from the database
+                table = None
+            if table is not None:
+                return table
+        table = CompanyTable.from_database(connection, fingerprint)
+        if self.snapshot_dir:
+            try:
+                return CompanyTable.open(table.save(self.snapshot_dir))
+            except (OSError, ValueError):
+                # Superseded before we could map it; the table in memory is just as current
+                pass
+        return table
+
+    def get(self):
+        """Current table; checks the database at most once per refresh interval"""
+        now = time.monotonic()
+        table = self._table
+        if table is not None and now - self._checked_at < self.refresh_interval:
+            return table
+
+        # Query without holding the lock; see RankingIndex.get
+        with engine.connect() as connection:
+            fingerprint = _fingerprint(connection)
+            if table is None or table.fingerprint != fingerprint:
+                table = self._build(connection, fingerprint)
+        with self._lock:
+            self._table = table
+            self._checked_at = now
+        return table
+
+
+company_tables = CompanyTableCache()
@@ -0,0 +1,171 @@
+import csv
+import io
+
+from sqlalchemy import select
+
+from database.config import engine
+from models.esg_company import ESGCompany
+from models.esg_score_history import ESGScoreHistory
+from services import json_codec
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: parquet export is unavailable without pyarrow
+    pa = pq = None
+
+# Rows fetched per server-side cursor round trip, and per encoded chunk
+EXPORT_BATCH_SIZE = 5000
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Exported columns per dataset; company exports use the loader's field names
+DATASETS = {
+    'companies': (
+        ESGCompany.__table__,
+        (
+            'symbol', 'name', 'sector', 'environmental_score', 'social_score', 'governance_score',
+            'overall_score', 'carbon_neutral', 'renewable_energy_percentage',
+            'sustainability_goals', 'key_initiatives', 'last_updated', 'data_source'
+        ),
+        ('symbol',)
+    ),
+    'history': (
+        ESGScoreHistory.__table__,
+        ('symbol', 'recorded_at', 'environmental', 'social', 'governance', 'overall'),
+        ('symbol', 'recorded_at')
+    )
+}
+
+# Pipe-joined text columns, exported as lists where the format has them
+_LIST_COLUMNS = {'sustainability_goals', 'key_initiatives'}
+
+
+def parquet_available():
+    return pq is not None
+
+
+def _partitions(dataset, batch_size):
+    """Yield lists of rows from a server-side cursor, batch_size at a time"""
+    table, columns, order_by = DATASETS[dataset]
+    statement = select(*(table.c[name] for name in columns)).order_by(*(table.c[name] for name in order_by))
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for partition in result.partitions():
+            yield partition
+
+
+def _column_lists(columns, rows, as_lists, iso_dates=True):
+    """Transpose a partition into one list per column, with export-ready values"""
+    values = {name: list(column) for name, column in zip(columns, zip(*rows))}
+    for name, column in values.items():
+        if name in _LIST_COLUMNS:
+            values[name] = [
+                (text.split('|') if text else []) if as_lists else (text or '')
+                for text in column
+            ]
+        elif iso_dates and name in ('last_updated', 'recorded_at'):
+            values[name] = [value.isoformat() if value is not None else None for value in column]
+    return values
+
+
+def _ndjson(dataset, columns, batch_size):
+    for rows in _partitions(dataset, batch_size):
+        encoded = json_codec.encode_rows(_column_lists(columns, rows, as_lists=True))
+        yield b'\n'.join(encoded) + b'\n'
+
+
+def _csv(dataset, columns, batch_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in _partitions(dataset, batch_size):
+        values = _column_lists(columns, rows, as_lists=False)
+        writer.writerows(zip(*(values[name] for name in columns)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
+
+
+def _parquet_schema(dataset, columns):
+    table = DATASETS[dataset][0]
+    fields = []
+    for name in columns:
+        python_type = table.c[name].type.python_type
+        if name in _LIST_COLUMNS:
+            arrow_type = pa.list_(pa.string())
+        elif python_type is bool:
+            arrow_type = pa.bool_()
+        elif python_type in (int, float):
+            arrow_type = pa.float64() if python_type is float else pa.int64()
+        elif name in ('last_updated', 'recorded_at'):
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append((name, arrow_type))
+    return pa.schema(fields)
+
+
+def _parquet(dataset, columns, batch_size):
+    sink = _ChunkSink()
+    schema = _parquet_schema(dataset, columns)
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in _partitions(dataset, batch_size):
+        # One row group per partition, flushed to the client as soon as it is written
+        writer.write_table(pa.table(_column_lists(columns, rows, as_lists=True, iso_dates=False), schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+_WRITERS = {
+    'ndjson': _ndjson,
+    'csv': _csv,
+    'parquet': _parquet
+}
+
+
+def export_stream(dataset='companies', export_format='ndjson', batch_size=EXPORT_BATCH_SIZE):
+    """Generator of response chunks for a full export of dataset
+
+    Rows are read through a server-side cursor and encoded one partition
+    at a time, so memory stays flat regardless of table size.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of: {', '.join(DATASETS)}")
+    if export_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    if export_format == 'parquet' and not parquet_available():
+        raise ValueError('parquet export requires pyarrow to be installed')
+
+    columns = DATASETS[dataset][1]
+    return _WRITERS[export_format](dataset, columns, batch_size)
@@ -0,0 +1,117 @@
+import json
+import math
+from json.encoder import encode_basestring_ascii
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+_ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Sorted keys keep output identical to Flask's default provider; datetimes go
+    # through Flask's default hook so they still render as HTTP dates
+    _ORJSON_OPTIONS = (
+        orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+
+class RawJSON:
+    """Already-encoded JSON document that encode() returns as-is (top level only)"""
+
+    __slots__ = ('body',)
+
+    def __init__(self, body):
+        self.body = body
+
+    @classmethod
+    def array(cls, encoded_items):
+        """JSON array from a sequence of already-encoded items"""
+        return cls(b'[' + b','.join(encoded_items) + b']')
+
+
+def _fallback_default(value):
+    # numpy scalars and arrays, which orjson handles natively
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return _default(value)
+
+
+def encode(obj):
+    """Compact JSON bytes for obj"""
+    if isinstance(obj, RawJSON):
+        return obj.body
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_fallback_default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def decode(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_LITERALS = {True: 'true', False: 'false', None: 'null'}
+
+
+def _encode_number(value):
+    # repr() is only JSON for builtin ints and finite floats; numpy scalars subclass float but
+    # repr as np.float64(...), so they are unwrapped first
+    if type(value) is not int and type(value) is not float and hasattr(value, 'item'):
+        value = value.item()
+    if type(value) is float:
+        # nan/inf have no JSON spelling; null, as orjson writes them
+        return repr(value) if math.isfinite(value) else 'null'
+    if type(value) is int:
+        return repr(value)
+    return encode(value).decode()
+
+
+def _encode_column(values):
+    """JSON text for each value of one column, converting the whole column at once"""
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, str):
+        return [encode_basestring_ascii(value) if value is not None else 'null' for value in values]
+    if isinstance(sample, bool):
+        return [_LITERALS[value] for value in values]
+    if isinstance(sample, (int, float)):
+        return [_encode_number(value) for value in values]
+    return [encode(value).decode() for value in values]
+
+
+def encode_rows(columns):
+    """One encoded JSON object per row from equal-length column lists
+
+    Builds each object's text directly from the columns, without an
+    intermediate dict per row; keys come out sorted, like encode().
+    """
+    names = sorted(columns)
+    encoded_columns = [_encode_column(columns[name]) for name in names]
+    prefixes = ['{' + encode_basestring_ascii(names[0]) + ':'] + [',' + encode_basestring_ascii(name) + ':' for name in names[1:]]
+    template = ''.join(prefix.replace('{', '{{').replace('}', '}}') + '{}' for prefix in prefixes) + '}}'
+    return [template.format(*values).encode() for values in zip(*encoded_columns)]
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by encode()/decode()"""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return decode(s)
+
+    def encode(self, obj):
+        return encode(obj)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
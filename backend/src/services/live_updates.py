@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from database.config import SessionLocal
+from models.esg_company import ESGCompany
+from services import company_events, json_codec
+
+# Frames a client may fall behind by before it is disconnected
+BUFFER_FRAMES = int(os.environ.get('ESG_STREAM_BUFFER_FRAMES', 32))
+# Concurrent stream clients per worker; further connections are refused
+MAX_CLIENTS = int(os.environ.get('ESG_STREAM_MAX_CLIENTS', 1000))
+# Comment frames keep idle connections open through proxies
+HEARTBEAT_SECONDS = float(os.environ.get('ESG_STREAM_HEARTBEAT_SECONDS', 15))
+# Commits landing this close together are sent as one update
+COALESCE_SECONDS = float(os.environ.get('ESG_STREAM_COALESCE_SECONDS', 0.25))
+# Snapshots are also rebuilt this often, to pick up writes made by other workers
+POLL_SECONDS = float(os.environ.get('ESG_STREAM_POLL_SECONDS', 5))
+# Larger commits send no per-company scores event, only the refreshed snapshots
+MAX_SCORE_SYMBOLS = 500
+
+SCORE_BATCH_SIZE = 500
+
+HEARTBEAT_FRAME = b': keepalive\n\n'
+# Sent first: how long EventSource clients wait before reconnecting
+RETRY_FRAME = b'retry: 3000\n\n'
+
+
+class TooManyClients(Exception):
+    pass
+
+
+class Subscription:
+    """One stream client: a bounded queue of encoded SSE frames
+
+    Frames are pushed by the broadcaster thread; the client waits on an
+    asyncio.Event of its event loop, so an idle client holds no thread.
+    """
+
+    __slots__ = ('frames', 'limit', 'closed', '_ready', '_loop')
+
+    def __init__(self, loop, limit=BUFFER_FRAMES):
+        self.frames = deque()
+        self.limit = limit
+        self.closed = False
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def push(self, frame):
+        """Queue a frame; False (and closed) if the client has fallen too far behind"""
+        if self.closed:
+            return False
+        if len(self.frames) >= self.limit:
+            self.close()
+            return False
+        self.frames.append(frame)
+        self._notify()
+        return True
+
+    def close(self):
+        """Stop the stream; a waiting client wakes up and finds it closed"""
+        self.closed = True
+        self._notify()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:  # the client's event loop is gone
+            self.closed = True
+
+    def _drain(self):
+        self._ready.clear()
+        frames = []
+        while self.frames:
+            frames.append(self.frames.popleft())
+        return frames
+
+    async def wait(self, timeout=HEARTBEAT_SECONDS):
+        """Frames queued since the last call, waiting up to timeout; [] on timeout"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._drain()
+
+
+def encode_frame(event, event_id, data):
+    """One SSE message; data is already JSON-encoded"""
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), data)
+
+
+class Broadcaster:
+    """Per-worker fan-out of company changes to stream clients
+
+    One background thread turns committed company changes into SSE frames
+    (a scores event for the companies written, then every registered
+    snapshot that changed) and pushes the same bytes to each client.
+    Snapshots are rebuilt at most once per batch of commits however many
+    clients are connected, and clients that stop reading are dropped
+    instead of buffering without bound.
+    """
+
+    def __init__(self, buffer_frames=BUFFER_FRAMES, max_clients=MAX_CLIENTS):
+        self.buffer_frames = buffer_frames
+        self.max_clients = max_clients
+        self.sources = {}
+        self.dropped = 0
+        self._subscriptions = set()
+        self._pending = []
+        # Latest frame and content digest per snapshot, replayed to new clients
+        self._latest = {}
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add_source(self, event, build):
+        """Send build(session) as `event` whenever its result changes"""
+        self.sources[event] = build
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, loop):
+        """New Subscription on loop, primed with the latest snapshots; raises TooManyClients"""
+        subscription = Subscription(loop, self.buffer_frames)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                raise TooManyClients('Too many stream clients')
+            self._subscriptions.add(subscription)
+            for frame, _ in self._latest.values():
+                subscription.push(frame)
+            stale = not self._latest
+        self._ensure_thread()
+        if stale:
+            self._wake.set()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.close()
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            if not self._subscriptions:
+                # Nobody is watching: snapshots would go stale, rebuild them on the next connect
+                self._latest.clear()
+
+    def notify(self, changes):
+        """company_events subscriber; runs on the committing thread, so it only records"""
+        with self._lock:
+            if not self._subscriptions:
+                return
+            self._pending.extend(changes)
+        self._wake.set()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so a preloaded worker starts its own
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='esg-live-updates', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            if self._wake.wait(POLL_SECONDS):
+                time.sleep(COALESCE_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                changes, self._pending = self._pending, []
+                idle = not self._subscriptions
+            if idle:
+                continue
+            try:
+                self._publish(changes)
+            except Exception:
+                # A failed rebuild is retried on the next poll; the thread must not die
+                time.sleep(POLL_SECONDS)
+
+    def _publish(self, changes):
+        session = SessionLocal()
+        try:
+            frames = []
+            scores = _score_changes(session, changes)
+            if scores is not None:
+                frames.append(encode_frame('scores', next(self._event_ids), json_codec.encode(scores)))
+            for event, build in self.sources.items():
+                data = json_codec.encode(build(session))
+                digest = hashlib.blake2b(data, digest_size=16).digest()
+                if event in self._latest and self._latest[event][1] == digest:
+                    continue
+                frame = encode_frame(event, next(self._event_ids), data)
+                with self._lock:
+                    self._latest[event] = (frame, digest)
+                frames.append(frame)
+        finally:
+            session.close()
+        if frames:
+            self._fan_out(frames)
+
+    def _fan_out(self, frames):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if all(subscription.push(frame) for frame in frames):
+                continue
+            self.dropped += 1
+            self.unsubscribe(subscription)
+
+
+def _score_changes(session, changes):
+    """{'upserted': [...], 'deleted': [...]} for the companies a batch of commits wrote, or None"""
+    written = {}
+    for operation, symbol in changes:
+        if operation == company_events.BULK:
+            return None
+        written[symbol] = operation
+    if not written or len(written) > MAX_SCORE_SYMBOLS:
+        return None
+
+    symbols = [symbol for symbol, operation in written.items() if operation != company_events.DELETE]
+    upserted = {}
+    for start in range(0, len(symbols), SCORE_BATCH_SIZE):
+        batch = symbols[start:start + SCORE_BATCH_SIZE]
+        for company in session.query(ESGCompany).filter(ESGCompany.symbol.in_(batch)):
+            upserted[company.symbol] = company.to_dict()
+    # Written then deleted again before the batch was sent
+    deleted = [symbol for symbol in written if symbol not in upserted]
+    return {'upserted': [upserted[symbol] for symbol in symbols if symbol in upserted], 'deleted': deleted}
+
+
+broadcaster = Broadcaster()
+company_events.subscribe(broadcaster.notify)
@@ -0,0 +1,133 @@
+import math
+import os
+
+import numpy as np
+
+# Request limits: portfolios per request and holdings across all of them
+MAX_PORTFOLIOS = int(os.environ.get('ESG_MAX_PORTFOLIOS', 1000))
+MAX_HOLDINGS = int(os.environ.get('ESG_MAX_PORTFOLIO_HOLDINGS', 100000))
+
+PILLARS = ('environmental', 'social', 'governance', 'overall')
+
+
+class TooManyHoldings(ValueError):
+    pass
+
+
+def _holding(holding):
+    """(symbol, weight) from {'symbol': ..., 'weight': ...} or [symbol, weight]"""
+    if isinstance(holding, dict):
+        symbol, weight = holding.get('symbol'), holding.get('weight')
+    elif isinstance(holding, (list, tuple)) and len(holding) == 2:
+        symbol, weight = holding
+    else:
+        raise ValueError('Each holding must be {"symbol": ..., "weight": ...} or [symbol, weight]')
+    if not isinstance(symbol, str) or not symbol.strip():
+        raise ValueError('Each holding needs a symbol')
+    if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not math.isfinite(weight) or weight < 0:
+        raise ValueError(f'Weight of {symbol} must be a non-negative number')
+    return symbol.strip().upper(), weight
+
+
+def parse_portfolios(data):
+    """(ids, symbols, weights, owners) flattened across every portfolio in a request body
+
+    The body is {"portfolios": [{"id": ..., "holdings": [...]}, ...]} or a
+    single {"holdings": [...]}; owners[i] is the portfolio of holding i.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    portfolios = data.get('portfolios', [data] if 'holdings' in data else None)
+    if not isinstance(portfolios, list) or not portfolios:
+        raise ValueError('A non-empty list of portfolios is required')
+    if len(portfolios) > MAX_PORTFOLIOS:
+        raise TooManyHoldings(f'At most {MAX_PORTFOLIOS} portfolios are allowed per request')
+
+    ids, symbols, weights, counts = [], [], [], []
+    for index, portfolio in enumerate(portfolios):
+        holdings = portfolio.get('holdings') if isinstance(portfolio, dict) else None
+        if not isinstance(holdings, list) or not holdings:
+            raise ValueError(f'Portfolio {index} needs a non-empty list of holdings')
+        if len(symbols) + len(holdings) > MAX_HOLDINGS:
+            raise TooManyHoldings(f'At most {MAX_HOLDINGS} holdings are allowed per request')
+        for symbol, weight in map(_holding, holdings):
+            symbols.append(symbol)
+            weights.append(weight)
+        ids.append(portfolio.get('id', index))
+        counts.append(len(holdings))
+
+    owners = np.repeat(np.arange(len(ids)), counts)
+    return ids, symbols, np.array(weights, dtype=np.float64), owners
+
+
+def _ratio(numerator, denominator):
+    # bincount of no items is int64; the quotient is always float
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+
+def aggregate(table, ids, symbols, weights, owners):
+    """Weighted ESG profile of every portfolio, in one pass over all holdings
+
+    Weights are normalized over the holdings the company table knows;
+    coverage is the share of each portfolio's weight that could be scored.
+    """
+    count = len(ids)
+    rows = table.rows(symbols)
+    matched = rows >= 0
+    known_rows = rows[matched]
+    known_owners = owners[matched]
+    known_weights = weights[matched]
+
+    total_weight = np.bincount(owners, weights=weights, minlength=count)
+    scored_weight = np.bincount(known_owners, weights=known_weights, minlength=count)
+
+    def weighted(values):
+        return _ratio(np.bincount(known_owners, weights=known_weights * values, minlength=count), scored_weight)
+
+    scores = {pillar: np.round(weighted(getattr(table, pillar)[known_rows]), 1).tolist() for pillar in PILLARS}
+    carbon_neutral_share = np.round(weighted(table.carbon_neutral[known_rows]), 4).tolist()
+    renewable_energy = np.round(weighted(table.renewable_energy[known_rows]), 1).tolist()
+    coverage = np.round(_ratio(scored_weight, total_weight), 4).tolist()
+    holdings = np.bincount(owners, minlength=count).tolist()
+    matched_holdings = np.bincount(known_owners, minlength=count).tolist()
+
+    # Sector exposure: one bincount over (portfolio, sector) cells
+    sector_count = len(table.sectors)
+    cells = known_owners * sector_count + table.sector_codes[known_rows]
+    cell_size = count * sector_count
+    cell_weight = np.bincount(cells, weights=known_weights, minlength=cell_size).reshape(count, sector_count)
+    cell_overall = _ratio(
+        np.bincount(cells, weights=known_weights * table.overall[known_rows], minlength=cell_size),
+        cell_weight.ravel()
+    ).reshape(count, sector_count)
+    cell_holdings = np.bincount(cells, minlength=cell_size).reshape(count, sector_count)
+    exposure = np.round(_ratio(cell_weight, scored_weight[:, None]), 4)
+    cell_overall = np.round(cell_overall, 1)
+
+    unmatched = [[] for _ in range(count)]
+    for index in np.flatnonzero(~matched).tolist():
+        unmatched[owners[index]].append(symbols[index])
+
+    results = []
+    for i, portfolio_id in enumerate(ids):
+        present = np.flatnonzero(cell_holdings[i])
+        codes = present[np.argsort(-exposure[i, present], kind='stable')]
+        results.append({
+            'id': portfolio_id,
+            'holdings': holdings[i],
+            'matched': matched_holdings[i],
+            'coverage': coverage[i],
+            'scores': {pillar: scores[pillar][i] for pillar in PILLARS},
+            'carbon_neutral_share': carbon_neutral_share[i],
+            'renewable_energy': renewable_energy[i],
+            'sectors': [
+                {'sector': table.sectors[code], 'weight': weight, 'overall': overall, 'holdings': held}
+                for code, weight, overall, held in zip(
+                    codes.tolist(), exposure[i, codes].tolist(), cell_overall[i, codes].tolist(),
+                    cell_holdings[i, codes].tolist()
+                )
+            ],
+            'unmatched': unmatched[i]
+        })
+    return results
@@ -0,0 +1,240 @@
+import base64
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models.esg_company import ESGCompany
+from services import json_codec, scoring
+
+# How often a worker re-checks the table for changes made by other processes
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('ESG_RANKINGS_REFRESH_SECONDS', 5))
+
+# Sector filters whose rank positions are kept per snapshot
+MAX_CACHED_SECTOR_SETS = 64
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(overall_score, symbol):
+    """Opaque keyset cursor pointing just after the given ranking entry"""
+    raw = json.dumps([overall_score, symbol]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        overall_score, symbol = json.loads(raw)
+        return float(overall_score), str(symbol)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_weights(text):
+    """(environmental, social, governance) weights summing to 1 from 'e,s,g', e.g. '50,25,25'"""
+    try:
+        weights = [float(part) for part in text.split(',')]
+    except ValueError:
+        weights = []
+    if len(weights) != 3 or not all(math.isfinite(w) and w >= 0 for w in weights) or sum(weights) <= 0:
+        raise ValueError('weights must be three non-negative numbers: environmental,social,governance')
+    total = sum(weights)
+    return tuple(w / total for w in weights)
+
+
+def company_fingerprint(session):
+    """Cheap summary of esg_companies that changes whenever a row is added, removed or updated"""
+    return tuple(session.execute(
+        select(
+            func.count(ESGCompany.id),
+            func.max(ESGCompany.id),
+            func.max(ESGCompany.last_updated)
+        )
+    ).one())
+
+
+class _RankOrder:
+    """Immutable snapshot of the universe sorted by overall score
+
+    Rows are kept as pre-encoded JSON objects, so serving a page is a join
+    of byte strings rather than a re-serialization of per-row dicts.
+    """
+
+    def __init__(self, symbols, sectors, overall_scores, pillars, encoded_rows, fingerprint):
+        self.fingerprint = fingerprint
+        self.symbols = symbols
+        self.overall_scores = overall_scores
+        # (3, n) environmental/social/governance columns in rank order, for re-weighting
+        self.pillars = np.array(pillars, dtype=np.float32).reshape(3, len(symbols))
+        self.encoded_rows = encoded_rows
+        # Sort keys matching ORDER BY overall_score DESC, symbol ASC, for keyset cursors
+        self.keys = list(zip((-score for score in overall_scores), symbols))
+
+        sector_names = sorted(set(sectors))
+        self.sector_codes = {name.lower(): code for code, name in enumerate(sector_names)}
+        self.row_sectors = np.array(
+            [self.sector_codes[sector.lower()] for sector in sectors], dtype=np.int32
+        )
+        self._positions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.encoded_rows)
+
+    def positions(self, sectors):
+        """Rank positions of rows within the given sectors, cached per set of known sectors"""
+        # Keyed on resolved codes, so unknown names and spellings cannot grow the cache
+        names = (sector.lower() for sector in sectors)
+        key = frozenset(self.sector_codes[name] for name in names if name in self.sector_codes)
+        with self._lock:
+            cached = self._positions.get(key)
+            if cached is not None:
+                self._positions.move_to_end(key)
+                return cached
+        cached = np.flatnonzero(np.isin(self.row_sectors, list(key)))
+        with self._lock:
+            self._positions[key] = cached
+            while len(self._positions) > MAX_CACHED_SECTOR_SETS:
+                self._positions.popitem(last=False)
+        return cached
+
+
+class RankingIndex:
+    """Cached rank order of ESGCompany rows, rebuilt only when the table changes"""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._order = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force the next read to rebuild the rank order"""
+        with self._lock:
+            self._order = None
+
+    def _build(self, session, fingerprint):
+        result = session.execute(
+            select(
+                ESGCompany.symbol,
+                ESGCompany.name,
+                ESGCompany.sector,
+                ESGCompany.overall_score,
+                ESGCompany.environmental_score,
+                ESGCompany.social_score,
+                ESGCompany.governance_score,
+                ESGCompany.carbon_neutral,
+                ESGCompany.renewable_energy_percentage
+            ).order_by(ESGCompany.overall_score.desc(), ESGCompany.symbol)
+        ).all()
+
+        symbols, names, sectors, overall, environmental, social, governance, carbon_neutral, renewable = (
+            [list(column) for column in zip(*result)] if result else [[] for _ in range(9)]
+        )
+        encoded_rows = json_codec.encode_rows({
+            'symbol': symbols,
+            'name': names,
+            'sector': sectors,
+            'overall_score': overall,
+            'environmental': environmental,
+            'social': social,
+            'governance': governance,
+            'carbon_neutral': carbon_neutral,
+            'renewable_energy': renewable,
+            'rank': list(range(1, len(result) + 1)),
+            'recommendation': scoring.recommendations(np.array(overall, dtype=float)).tolist()
+        })
+        return _RankOrder(symbols, sectors, overall, [environmental, social, governance], encoded_rows, fingerprint)
+
+    def get(self, session):
+        """Current rank order, rebuilding it if the table changed since the last check"""
+        now = time.monotonic()
+        order = self._order
+        if order is not None and now - self._checked_at < self.refresh_interval:
+            return order
+
+        # Query without holding the lock: under the ASGI server the session yields to
+        # the event loop mid-query, and a blocked lock there would stall every request
+        fingerprint = company_fingerprint(session)
+        if order is None or order.fingerprint != fingerprint:
+            order = self._build(session, fingerprint)
+        with self._lock:
+            self._order = order
+            self._checked_at = now
+        return order
+
+    def page(self, session, limit=DEFAULT_PAGE_SIZE, offset=0, cursor=None, sectors=None):
+        """Return (rows, total, next_cursor) for one page; rows is a pre-encoded JSON array"""
+        order = self.get(session)
+
+        if sectors:
+            positions = order.positions(sectors)
+        else:
+            positions = None
+        total = len(order) if positions is None else len(positions)
+
+        # Resolve the starting point: keyset cursor takes precedence over offset
+        if cursor is not None:
+            start_position = bisect.bisect_right(order.keys, (-cursor[0], cursor[1]))
+            if positions is None:
+                start = start_position
+            else:
+                start = int(np.searchsorted(positions, start_position))
+        else:
+            start = offset
+
+        if positions is None:
+            selected = range(start, min(start + limit, total))
+        else:
+            selected = positions[start:start + limit].tolist()
+        rows = json_codec.RawJSON.array([order.encoded_rows[i] for i in selected])
+
+        next_cursor = None
+        if selected and start + limit < total:
+            last = selected[-1]
+            next_cursor = encode_cursor(order.overall_scores[last], order.symbols[last])
+        return rows, total, next_cursor
+
+    def weighted_page(self, session, weights, limit=DEFAULT_PAGE_SIZE, offset=0, sectors=None):
+        """Return (rows, total) for one page ranked by weighted pillar scores
+
+        Scores come from one pass over the pillar columns; a partial
+        selection finds the cut-off score for the page, so only the rows
+        up to it are sorted rather than the whole universe. Each row gains
+        weighted_score and weighted_rank; ties keep the overall order.
+        """
+        order = self.get(session)
+        scores = np.asarray(weights, dtype=np.float32) @ order.pillars
+        positions = order.positions(sectors) if sectors else None
+        if positions is not None:
+            scores = scores[positions]
+        total = len(scores)
+
+        k = min(offset + limit, total)
+        if offset >= k:
+            return json_codec.RawJSON.array([]), total
+        cutoff = np.partition(scores, total - k)[total - k]
+        candidates = np.flatnonzero(scores >= cutoff)
+        # Stable, so equal weighted scores stay in overall rank order
+        ranked = candidates[np.argsort(-scores[candidates], kind='stable')][offset:k]
+
+        rows_at = ranked if positions is None else positions[ranked]
+        weighted_scores = np.round(scores[ranked].astype(np.float64), 2).tolist()
+        # Extend the pre-encoded rows in place of re-encoding them
+        rows = [
+            order.encoded_rows[position][:-1] + b',"weighted_rank":%d,"weighted_score":%r}' % (rank, score)
+            for rank, position, score in zip(range(offset + 1, k + 1), rows_at.tolist(), weighted_scores)
+        ]
+        return json_codec.RawJSON.array(rows), total
+
+
+ranking_index = RankingIndex()
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, request
+
+from services import json_codec
+from services.shared_cache import shared_store
+
+DEFAULT_TTL_SECONDS = float(os.environ.get('ESG_RESPONSE_CACHE_TTL', 60))
+MAX_ENTRIES = int(os.environ.get('ESG_RESPONSE_CACHE_SIZE', 512))
+
+# Clients always revalidate; an unchanged payload costs a 304 and no body
+CACHE_CONTROL = 'no-cache'
+
+# Per-response headers that must not be replayed from the cache
+_SKIPPED_HEADERS = {'content-length', 'content-type', 'etag', 'cache-control'}
+
+# Namespace of responses in the shared store, and the key holding their current generation
+_STORE_PREFIX = 'response:'
+_GENERATION_KEY = 'response-generation'
+_GENERATION_TTL_SECONDS = 30 * 24 * 3600
+
+
+class CachedResponse:
+    """Pre-serialized response body plus what is needed to replay it"""
+
+    __slots__ = ('body', 'etag', 'mimetype', 'headers', 'expires_at')
+
+    def __init__(self, body, etag, mimetype, headers, expires_at):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.headers = headers
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of serialized responses with per-entry TTL
+
+    With a shared store, local misses fall back to responses cached by
+    other workers. Shared entries are tagged with a generation token that
+    clear() replaces, which invalidates them for every worker at once.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    def get(self, key):
+        """Fresh entry for key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            if self.store is None:
+                self.misses += 1
+                return None
+
+        entry = self._shared_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.shared_hits += 1
+        self._remember(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        self._remember(key, entry)
+        if self.store is not None:
+            self._shared_set(key, entry)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _shared_get(self, key):
+        values = self.store.get_many([_GENERATION_KEY, _STORE_PREFIX + key])
+        generation, stored = values.get(_GENERATION_KEY), values.get(_STORE_PREFIX + key)
+        if generation is None or stored is None:
+            return None
+        header, body = stored.split(b'\n', 1)
+        meta = json_codec.decode(header)
+        remaining = meta['expires'] - time.time()
+        if meta['generation'] != generation.decode() or remaining <= 0:
+            return None
+        return CachedResponse(
+            body=body,
+            etag=meta['etag'],
+            mimetype=meta['mimetype'],
+            headers=[tuple(item) for item in meta['headers']],
+            expires_at=time.monotonic() + remaining
+        )
+
+    def _shared_set(self, key, entry):
+        ttl = entry.expires_at - time.monotonic()
+        if ttl <= 0:
+            return
+        generation = self.store.get_many([_GENERATION_KEY]).get(_GENERATION_KEY) or self._new_generation()
+        header = json_codec.encode({
+            'generation': generation.decode(),
+            'etag': entry.etag,
+            'mimetype': entry.mimetype,
+            'headers': entry.headers,
+            'expires': time.time() + ttl
+        })
+        self.store.set_many({_STORE_PREFIX + key: header + b'\n' + entry.body}, ttl)
+
+    def _new_generation(self):
+        generation = os.urandom(8).hex().encode()
+        self.store.set_many({_GENERATION_KEY: generation}, _GENERATION_TTL_SECONDS)
+        return generation
+
+    def clear(self):
+        """Drop every entry, including those shared with other workers"""
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self._new_generation()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache(store=shared_store)
+
+
+def cache_key(path, args):
+    """Cache key for a path and its query args, independent of argument order"""
+    items = sorted(args.items(multi=True))
+    return path + '?' + '&'.join(f'{k}={v}' for k, v in items)
+
+
+def make_entry(body, mimetype, headers, ttl):
+    """Build a cache entry for a serialized body, dropping headers that are set on replay"""
+    return CachedResponse(
+        body=body,
+        etag=hashlib.sha1(body).hexdigest(),
+        mimetype=mimetype,
+        headers=[(name, value) for name, value in headers if name.lower() not in _SKIPPED_HEADERS],
+        expires_at=time.monotonic() + ttl
+    )
+
+
+def _replay(entry):
+    if request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.headers.extend(entry.headers)
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def cached_response(ttl=DEFAULT_TTL_SECONDS, cache=response_cache):
+    """Serve a GET view from the response cache, answering conditional requests with 304"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = cache_key(request.path, request.args)
+            entry = cache.get(key)
+            if entry is not None:
+                return _replay(entry)
+
+            response = view(*args, **kwargs)
+            if isinstance(response, tuple) or response.status_code != 200:
+                return response
+
+            entry = make_entry(response.get_data(), response.mimetype, response.headers, ttl)
+            cache.set(key, entry)
+            return _replay(entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,102 @@
+import hashlib
+
+import numpy as np
+
+# Overall score thresholds for each rating tier
+STRONG_BUY_THRESHOLD = 85
+BUY_THRESHOLD = 75
+
+# Tier index -> label, best tier first
+RECOMMENDATIONS = np.array(['Strong Buy', 'Buy', 'Hold'])
+RISK_LEVELS = np.array(['Low', 'Medium', 'High'])
+
+# Ranges used to draw pillar scores for companies we hold no data on
+MOCK_SCORE_RANGES = ((60, 95), (65, 90), (70, 95))
+
+JITTER_SPREAD = 3
+
+# Bump whenever scoring or the seeded draws change, so memoized analyses are not reused
+SCORING_VERSION = 1
+
+# splitmix64 constants, used to turn (seed, stream) into independent 64-bit draws
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def overall_scores(environmental, social, governance):
+    """Equal-weighted overall score, rounded down like the original formula"""
+    return (np.asarray(environmental) + np.asarray(social) + np.asarray(governance)) // 3
+
+
+def rating_tiers(overall):
+    """Map overall scores to tier indexes into RECOMMENDATIONS / RISK_LEVELS"""
+    overall = np.asarray(overall)
+    return np.select(
+        [overall >= STRONG_BUY_THRESHOLD, overall >= BUY_THRESHOLD],
+        [0, 1],
+        default=2
+    )
+
+
+def recommendations(overall):
+    """Recommendation label for each overall score"""
+    return RECOMMENDATIONS[rating_tiers(overall)]
+
+
+def stable_seeds(keys):
+    """64-bit seed per key string, identical across processes and runs"""
+    return np.array([
+        int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+        for key in keys
+    ], dtype=np.uint64)
+
+
+def seeded_integers(seeds, stream, low, high):
+    """One integer in [low, high] per seed; each stream number gives an independent draw
+
+    Counter-based (splitmix64), so a whole batch is drawn in a few array
+    operations and the same seed always yields the same value.
+    """
+    with np.errstate(over='ignore'):
+        z = np.asarray(seeds, dtype=np.uint64) + _GOLDEN_GAMMA * np.uint64(stream + 1)
+        z = (z ^ (z >> np.uint64(30))) * _MIX_1
+        z = (z ^ (z >> np.uint64(27))) * _MIX_2
+        z = z ^ (z >> np.uint64(31))
+    return low + (z % np.uint64(high - low + 1)).astype(np.int64)
+
+
+def seeded_jitter(pillars, seeds, spread=JITTER_SPREAD):
+    """Uniform integer noise in [-spread, spread] added to an (N, 3) pillar array, seeded per row"""
+    pillars = np.asarray(pillars, dtype=np.int64).reshape(-1, 3)
+    return pillars + np.column_stack([
+        seeded_integers(seeds, stream, -spread, spread) for stream in range(3)
+    ]).reshape(-1, 3)
+
+
+def seeded_mock_pillars(seeds):
+    """(N, 3) pillar scores for companies without stored data, seeded per row"""
+    return np.column_stack([
+        seeded_integers(seeds, stream, low, high)
+        for stream, (low, high) in enumerate(MOCK_SCORE_RANGES)
+    ]).reshape(-1, 3)
+
+
+def score(pillars):
+    """Score N companies from an (N, 3) array of environmental/social/governance
+
+    Returns a dict of column arrays: clamped pillar scores, overall score,
+    recommendation and risk level.
+    """
+    pillars = np.asarray(pillars, dtype=np.int64).reshape(-1, 3)
+    overall = np.clip(overall_scores(pillars[:, 0], pillars[:, 1], pillars[:, 2]), 0, 100)
+    pillars = np.clip(pillars, 0, 100)
+    tiers = rating_tiers(overall)
+    return {
+        'environmental': pillars[:, 0],
+        'social': pillars[:, 1],
+        'governance': pillars[:, 2],
+        'overall': overall,
+        'recommendation': RECOMMENDATIONS[tiers],
+        'risk_level': RISK_LEVELS[tiers]
+    }
@@ -0,0 +1,315 @@
+import re
+
+import numpy as np
+from sqlalchemy import and_, false, not_, or_, select
+
+from models.esg_company import ESGCompany
+from services import json_codec, scoring
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_FILTER_LENGTH = 2000
+MAX_NESTING = 20
+MAX_IN_VALUES = 500
+
+_companies = ESGCompany.__table__
+
+# Screenable fields -> columns; pillar names also accept their column names
+NUMERIC_FIELDS = {
+    'environmental': _companies.c.environmental_score,
+    'social': _companies.c.social_score,
+    'governance': _companies.c.governance_score,
+    'overall': _companies.c.overall_score,
+    'renewable_energy': _companies.c.renewable_energy_percentage
+}
+TEXT_FIELDS = {
+    'symbol': _companies.c.symbol,
+    'name': _companies.c.name,
+    'sector': _companies.c.sector
+}
+BOOLEAN_FIELDS = {
+    'carbon_neutral': _companies.c.carbon_neutral
+}
+_FIELD_ALIASES = {
+    'environmental_score': 'environmental',
+    'social_score': 'social',
+    'governance_score': 'governance',
+    'overall_score': 'overall',
+    'renewable_energy_percentage': 'renewable_energy'
+}
+SORTABLE_FIELDS = {**NUMERIC_FIELDS, **TEXT_FIELDS}
+
+_COMPARISONS = {
+    '=': lambda column, value: column == value,
+    '==': lambda column, value: column == value,
+    '!=': lambda column, value: column != value,
+    '<>': lambda column, value: column != value,
+    '<': lambda column, value: column < value,
+    '<=': lambda column, value: column <= value,
+    '>': lambda column, value: column > value,
+    '>=': lambda column, value: column >= value
+}
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+      | (?P<op><=|>=|==|!=|<>|<|>|=)
+      | (?P<punct>[(),])
+      | (?P<word>[A-Za-z_][A-Za-z0-9_.&-]*)
+    )''', re.VERBOSE)
+
+_KEYWORDS = {'and', 'or', 'not', 'in', 'between', 'true', 'false'}
+
+
+class _Token:
+    __slots__ = ('kind', 'value', 'position')
+
+    def __init__(self, kind, value, position):
+        self.kind = kind
+        self.value = value
+        self.position = position
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    end = len(text.rstrip())
+    while position < end:
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f'Unexpected character at position {position + 1}')
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'string':
+            quote = value[0]
+            value = value[1:-1].replace(quote * 2, quote)
+        elif kind == 'word' and value.lower() in _KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append(_Token(kind, value, start))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser from a filter string to a SQLAlchemy condition
+
+    filter    := or_expr
+    or_expr   := and_expr (OR and_expr)*
+    and_expr  := not_expr (AND not_expr)*
+    not_expr  := NOT not_expr | primary
+    primary   := '(' or_expr ')' | predicate
+    predicate := field op value | field [NOT] IN '(' value, ... ')'
+               | field BETWEEN value AND value | boolean_field
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.index = 0
+        self.depth = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError('filter is empty')
+        condition = self._or()
+        if self.index < len(self.tokens):
+            self._fail('Unexpected', self.tokens[self.index])
+        return condition
+
+    def _fail(self, message, token=None):
+        if token is None:
+            raise ValueError(f'{message} end of filter')
+        raise ValueError(f'{message} {token.value!r} at position {token.position + 1}')
+
+    def _peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            self._fail('Unexpected')
+        self.index += 1
+        return token
+
+    def _accept(self, kind, value=None):
+        token = self._peek()
+        if token is not None and token.kind == kind and (value is None or token.value == value):
+            self.index += 1
+            return token
+        return None
+
+    def _expect(self, kind, value=None):
+        token = self._accept(kind, value)
+        if token is None:
+            self._fail(f'Expected {value or kind}, got', self._peek())
+        return token
+
+    def _or(self):
+        conditions = [self._and()]
+        while self._accept('keyword', 'or'):
+            conditions.append(self._and())
+        return conditions[0] if len(conditions) == 1 else or_(*conditions)
+
+    def _and(self):
+        conditions = [self._not()]
+        while self._accept('keyword', 'and'):
+            conditions.append(self._not())
+        return conditions[0] if len(conditions) == 1 else and_(*conditions)
+
+    def _not(self):
+        if self._accept('keyword', 'not'):
+            return not_(self._not())
+        return self._primary()
+
+    def _primary(self):
+        if self._accept('punct', '('):
+            self.depth += 1
+            if self.depth > MAX_NESTING:
+                raise ValueError(f'filter nests more than {MAX_NESTING} levels deep')
+            condition = self._or()
+            self._expect('punct', ')')
+            self.depth -= 1
+            return condition
+        return self._predicate()
+
+    def _predicate(self):
+        token = self._next()
+        if token.kind != 'word':
+            self._fail('Expected a field name, got', token)
+        name = _FIELD_ALIASES.get(token.value.lower(), token.value.lower())
+
+        if name in BOOLEAN_FIELDS:
+            column = BOOLEAN_FIELDS[name]
+            operator = self._accept('op')
+            # Plain equality rather than IS TRUE, which PostgreSQL cannot answer from a b-tree index
+            if operator is None:
+                return column == True  # noqa: E712
+            value = self._boolean(self._next())
+            if operator.value in ('=', '=='):
+                return column == value
+            if operator.value in ('!=', '<>'):
+                return column != value
+            self._fail('Unsupported operator for a boolean field:', operator)
+
+        if name in NUMERIC_FIELDS:
+            column, convert = NUMERIC_FIELDS[name], self._number
+        elif name in TEXT_FIELDS:
+            column, convert = TEXT_FIELDS[name], self._text
+        else:
+            self._fail('Unknown field', token)
+
+        negated = self._accept('keyword', 'not')
+        if self._accept('keyword', 'in'):
+            values = self._value_list(convert)
+            condition = column.in_(values) if values else false()
+            return not_(condition) if negated else condition
+        if negated:
+            self._fail('Expected IN after NOT, got', self._peek())
+
+        if self._accept('keyword', 'between'):
+            low = convert(self._next())
+            self._expect('keyword', 'and')
+            high = convert(self._next())
+            return column.between(low, high)
+
+        operator = self._expect('op')
+        return _COMPARISONS[operator.value](column, convert(self._next()))
+
+    def _value_list(self, convert):
+        self._expect('punct', '(')
+        values = []
+        if not self._accept('punct', ')'):
+            values.append(convert(self._next()))
+            while self._accept('punct', ','):
+                values.append(convert(self._next()))
+            self._expect('punct', ')')
+        if len(values) > MAX_IN_VALUES:
+            raise ValueError(f'IN lists are limited to {MAX_IN_VALUES} values')
+        return values
+
+    def _number(self, token):
+        if token.kind != 'number':
+            self._fail('Expected a number, got', token)
+        return token.value
+
+    def _text(self, token):
+        if token.kind in ('string', 'word'):
+            return token.value
+        if token.kind == 'number':
+            return f'{token.value:g}'
+        self._fail('Expected a text value, got', token)
+
+    def _boolean(self, token):
+        if token.kind == 'keyword' and token.value in ('true', 'false'):
+            return token.value == 'true'
+        if token.kind == 'number' and token.value in (0, 1):
+            return bool(token.value)
+        self._fail('Expected true or false, got', token)
+
+
+def compile_filter(text):
+    """SQLAlchemy condition on esg_companies for a screening filter; raises ValueError"""
+    if len(text) > MAX_FILTER_LENGTH:
+        raise ValueError(f'filter must be at most {MAX_FILTER_LENGTH} characters')
+    return _Parser(text).parse()
+
+
+def compile_sort(text):
+    """ORDER BY clauses for a comma-separated field list; a leading '-' sorts descending"""
+    clauses = []
+    for item in (part.strip() for part in text.split(',')):
+        if not item:
+            continue
+        descending = item.startswith('-')
+        name = item.lstrip('-+').lower()
+        name = _FIELD_ALIASES.get(name, name)
+        if name not in SORTABLE_FIELDS:
+            raise ValueError(f"sort field must be one of: {', '.join(SORTABLE_FIELDS)}")
+        column = SORTABLE_FIELDS[name]
+        clauses.append(column.desc() if descending else column.asc())
+    # Symbol last so results (and top-k cut-offs) are deterministic
+    clauses.append(_companies.c.symbol.asc())
+    return clauses
+
+
+def screen(session, filter_text=None, sort='-overall', limit=DEFAULT_LIMIT):
+    """Top `limit` companies matching the filter, as a pre-encoded JSON array
+
+    The filter and sort compile into a single indexed query; only the
+    returned rows are read into Python.
+    """
+    statement = select(
+        _companies.c.symbol,
+        _companies.c.name,
+        _companies.c.sector,
+        _companies.c.overall_score,
+        _companies.c.environmental_score,
+        _companies.c.social_score,
+        _companies.c.governance_score,
+        _companies.c.carbon_neutral,
+        _companies.c.renewable_energy_percentage
+    )
+    if filter_text:
+        statement = statement.where(compile_filter(filter_text))
+    statement = statement.order_by(*compile_sort(sort)).limit(limit)
+
+    rows = session.connection().execute(statement).all()
+    symbols, names, sectors, overall, environmental, social, governance, carbon_neutral, renewable = (
+        [list(column) for column in zip(*rows)] if rows else [[] for _ in range(9)]
+    )
+    encoded = json_codec.encode_rows({
+        'symbol': symbols,
+        'name': names,
+        'sector': sectors,
+        'overall_score': overall,
+        'environmental': environmental,
+        'social': social,
+        'governance': governance,
+        'carbon_neutral': carbon_neutral,
+        'renewable_energy': renewable,
+        'recommendation': scoring.recommendations(np.array(overall, dtype=float)).tolist()
+    })
+    return json_codec.RawJSON.array(encoded)
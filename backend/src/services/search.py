@@ -0,0 +1,222 @@
+import bisect
+import os
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from models.esg_company import ESGCompany
+from models.esg_company_tag import ESGCompanyTag, GOAL, INITIATIVE
+from services.rankings import company_fingerprint
+
+# How often a worker re-checks the tables for changes made by other processes
+REFRESH_INTERVAL_SECONDS = float(os.environ.get('ESG_SEARCH_REFRESH_SECONDS', 5))
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_QUERY_TOKENS = 8
+# Shorter tokens only match whole terms, so "a" does not expand to half the vocabulary
+MIN_PREFIX_LENGTH = 2
+
+SYMBOL = 'symbol'
+NAME = 'name'
+
+# Field codes packed into the low bits of each posting, and their relevance weights
+FIELDS = (SYMBOL, NAME, GOAL, INITIATIVE)
+_FIELD_CODES = {field: code for code, field in enumerate(FIELDS)}
+_FIELD_WEIGHTS = np.array([8.0, 4.0, 2.0, 2.0], dtype=np.float32)
+_FIELD_BITS = 2
+_EXACT_BONUS = 1.0
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens of text"""
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+class _SearchSnapshot:
+    """Inverted index over one version of the company universe
+
+    terms is the sorted vocabulary; postings[i] holds the (row << 2 | field)
+    codes of every place terms[i] occurs, so a prefix query is a bisect
+    over terms plus a concatenation of postings.
+    """
+
+    def __init__(self, companies, tags, fingerprint):
+        self.fingerprint = fingerprint
+        self.symbols = [row.symbol for row in companies]
+        self.names = [row.name for row in companies]
+        self.sectors = [row.sector for row in companies]
+        self.overall_scores = np.array([row.overall_score for row in companies], dtype=float)
+        row_of = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+        # Goals and initiatives per row, for reporting which ones matched
+        self.tags = [{GOAL: [], INITIATIVE: []} for _ in companies]
+
+        # Names and symbols are mostly unique, so they are tokenized per row
+        occurrences = {}
+        for row, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            for field, text in ((SYMBOL, symbol), (NAME, name)):
+                code = row << _FIELD_BITS | _FIELD_CODES[field]
+                for term in set(tokenize(text)):
+                    occurrences.setdefault(term, []).append(code)
+
+        # Goals and initiatives repeat across many companies: group their rows
+        # by text so each distinct text is tokenized once
+        codes_by_text = {}
+        for symbol, kind, text in tags:
+            row = row_of.get(symbol)
+            if row is None:
+                continue
+            text = sys.intern(text)
+            self.tags[row][kind].append(text)
+            codes_by_text.setdefault(text, []).append(row << _FIELD_BITS | _FIELD_CODES[kind])
+
+        postings = {term: [np.array(codes, dtype=np.int64)] for term, codes in occurrences.items()}
+        for text, codes in codes_by_text.items():
+            codes = np.array(codes, dtype=np.int64)
+            for term in set(tokenize(text)):
+                postings.setdefault(term, []).append(codes)
+
+        self.terms = sorted(postings)
+        self.postings = [np.concatenate(postings[term]) for term in self.terms]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _matches(self, token, prefix):
+        """Postings for token, expanded to every term it prefixes; also flags exact matches"""
+        start = bisect.bisect_left(self.terms, token)
+        if prefix:
+            end = bisect.bisect_left(self.terms, token + '\x7f')
+        else:
+            end = start + 1 if start < len(self.terms) and self.terms[start] == token else start
+        if end <= start:
+            return None, None
+        selected = range(start, end)
+        codes = np.concatenate([self.postings[i] for i in selected])
+        exact = np.concatenate([
+            np.full(len(self.postings[i]), self.terms[i] == token) for i in selected
+        ])
+        return codes, exact
+
+    def search(self, tokens, fields, limit):
+        """(rows, relevance) of the best matches holding every token"""
+        field_mask = np.zeros(len(FIELDS), dtype=bool)
+        field_mask[[_FIELD_CODES[field] for field in fields]] = True
+
+        total = None
+        for token in tokens:
+            codes, exact = self._matches(token, prefix=len(token) >= MIN_PREFIX_LENGTH)
+            if codes is None:
+                return [], []
+            field_codes = codes & ((1 << _FIELD_BITS) - 1)
+            keep = field_mask[field_codes]
+            weights = _FIELD_WEIGHTS[field_codes[keep]] + exact[keep] * _EXACT_BONUS
+
+            # Best-scoring occurrence of this token per company
+            scores = np.zeros(len(self), dtype=np.float32)
+            np.maximum.at(scores, codes[keep] >> _FIELD_BITS, weights)
+            total = scores if total is None else np.where(scores > 0, total + scores, 0)
+
+        # Most relevant first, then by ESG score (scores are at most 100)
+        rows = np.flatnonzero(total)
+        order_keys = total[rows] * 1000.0 + self.overall_scores[rows]
+        if len(rows) > limit:
+            best = np.argpartition(-order_keys, limit - 1)[:limit]
+            rows, order_keys = rows[best], order_keys[best]
+        rows = rows[np.argsort(-order_keys, kind='stable')]
+        return rows.tolist(), total[rows].tolist()
+
+    def matched_tags(self, row, kind, tokens):
+        """Goals or initiatives of a row with a term starting with any query token"""
+        tagged = self.tags[row][kind]
+        matched = []
+        for text in tagged:
+            terms = tokenize(text)
+            if any(term.startswith(token) for token in tokens for term in terms):
+                matched.append(text)
+        return matched
+
+
+class SearchIndex:
+    """Cached inverted index over company names, symbols, goals and initiatives"""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL_SECONDS):
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force the next search to rebuild the index"""
+        with self._lock:
+            self._snapshot = None
+
+    def _build(self, session, fingerprint):
+        # Plain Core queries on the session's connection skip ORM result processing
+        companies_table, tags_table = ESGCompany.__table__, ESGCompanyTag.__table__
+        companies = session.connection().execute(
+            select(
+                companies_table.c.symbol, companies_table.c.name,
+                companies_table.c.sector, companies_table.c.overall_score
+            ).order_by(companies_table.c.id)
+        ).all()
+        # Tags of databases created before they were normalized are backfilled by init_db
+        tags = session.connection().execute(
+            select(tags_table.c.symbol, tags_table.c.kind, tags_table.c.text).order_by(
+                tags_table.c.symbol, tags_table.c.kind, tags_table.c.position
+            )
+        ).all()
+        return _SearchSnapshot(companies, tags, fingerprint)
+
+    def get(self, session):
+        """Current index, rebuilding it if the table changed since the last check"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < self.refresh_interval:
+            return snapshot
+
+        # Query without holding the lock; see RankingIndex.get
+        fingerprint = company_fingerprint(session)
+        if snapshot is None or snapshot.fingerprint != fingerprint:
+            snapshot = self._build(session, fingerprint)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = now
+        return snapshot
+
+    def search(self, session, query, fields=FIELDS, limit=DEFAULT_LIMIT):
+        """Companies matching every token of query, best first
+
+        Each token matches whole terms and, from MIN_PREFIX_LENGTH
+        characters on, any term it prefixes.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        if not tokens:
+            raise ValueError('Search query must contain letters or digits')
+        snapshot = self.get(session)
+        rows, relevance = snapshot.search(tokens, fields, limit)
+
+        results = []
+        for row, score in zip(rows, relevance):
+            results.append({
+                'symbol': snapshot.symbols[row],
+                'name': snapshot.names[row],
+                'sector': snapshot.sectors[row],
+                'overall_score': float(snapshot.overall_scores[row]),
+                'relevance': round(score, 2),
+                'matched_goals': snapshot.matched_tags(row, GOAL, tokens) if GOAL in fields else [],
+                'matched_initiatives': (
+                    snapshot.matched_tags(row, INITIATIVE, tokens) if INITIATIVE in fields else []
+                )
+            })
+        return results
+
+
+search_index = SearchIndex()
@@ -0,0 +1,254 @@
+import fcntl
+import fnmatch
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a redis:// shared cache
+    redis = None
+
+from database.config import DATABASE_URL
+
+# '' (each worker caches alone), 'local', 'mmap', 'mmap:///path/to/file' or 'redis://host:port/db'
+SHARED_CACHE_URL = os.environ.get('ESG_SHARED_CACHE', '')
+# Layout of the memory-mapped table; entries larger than a slot are not shared
+MMAP_SLOTS = int(os.environ.get('ESG_SHARED_CACHE_SLOTS', 4096))
+MMAP_SLOT_SIZE = int(os.environ.get('ESG_SHARED_CACHE_SLOT_SIZE', 64 * 1024))
+
+# Prefer tmpfs so the mapped file is plain shared memory rather than disk-backed
+_DEFAULT_MMAP_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class MmapStore:
+    """Fixed-size hash table in a memory-mapped file, shared by every worker on a host
+
+    Every store implements get_many(keys) -> {key: bytes},
+    set_many({key: bytes}, ttl) and clear(). Here each key hashes to a
+    short run of fixed-size slots; a full run evicts the entry closest
+    to expiry. Processes serialize on a POSIX lock over the file.
+    """
+
+    _FILE_HEADER = struct.Struct('<4sII')  # magic, slot count, slot size
+    _SLOT_HEADER = struct.Struct('<QdII')  # key hash (0 = empty), expires at (epoch), key and value length
+    _MAGIC = b'ESG1'
+    _PROBES = 4
+
+    def __init__(self, path, slots=MMAP_SLOTS, slot_size=MMAP_SLOT_SIZE):
+        if slot_size <= self._SLOT_HEADER.size:
+            raise ValueError(f'slot size must be larger than {self._SLOT_HEADER.size} bytes')
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.size = self._FILE_HEADER.size + slots * slot_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _mapped(self):
+        # Opened per process: POSIX locks and the mapping must not be inherited across fork
+        if self._pid != os.getpid():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, self._FILE_HEADER.size, 0)
+                expected = self._FILE_HEADER.pack(self._MAGIC, self.slots, self.slot_size)
+                if header != expected:
+                    # New file, or one laid out by a differently configured worker: start empty.
+                    # Never shrink it, which would fault other processes still mapping it
+                    if os.fstat(fd).st_size < self.size:
+                        os.ftruncate(fd, self.size)
+                    empty = bytes(self._SLOT_HEADER.size)
+                    for slot in range(self.slots):
+                        os.pwrite(fd, empty, self._FILE_HEADER.size + slot * self.slot_size)
+                    os.pwrite(fd, expected, 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._fd, self._map, self._pid = fd, mmap.mmap(fd, self.size), os.getpid()
+        return self._map
+
+    def _slots_for(self, key):
+        key_hash = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') | 1
+        first = key_hash % self.slots
+        offsets = [
+            self._FILE_HEADER.size + (first + probe) % self.slots * self.slot_size
+            for probe in range(min(self._PROBES, self.slots))
+        ]
+        return key_hash, offsets
+
+    def _find(self, data, key, key_hash, offsets):
+        for offset in offsets:
+            slot_hash, expires_at, key_length, value_length = self._SLOT_HEADER.unpack_from(data, offset)
+            start = offset + self._SLOT_HEADER.size
+            if slot_hash == key_hash and data[start:start + key_length] == key:
+                return offset, expires_at, start + key_length, value_length
+        return None
+
+    def get_many(self, keys):
+        found = {}
+        now = time.time()
+        with self._lock:
+            data = self._mapped()
+            fcntl.lockf(self._fd, fcntl.LOCK_SH)
+            try:
+                for key in keys:
+                    encoded = key.encode()
+                    match = self._find(data, encoded, *self._slots_for(encoded))
+                    if match is not None and match[1] > now:
+                        _, _, start, length = match
+                        found[key] = data[start:start + length]
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return found
+
+    def set_many(self, values, ttl):
+        expires_at = time.time() + ttl
+        capacity = self.slot_size - self._SLOT_HEADER.size
+        with self._lock:
+            data = self._mapped()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                for key, value in values.items():
+                    encoded = key.encode()
+                    if len(encoded) + len(value) > capacity:
+                        continue
+                    key_hash, offsets = self._slots_for(encoded)
+                    match = self._find(data, encoded, key_hash, offsets)
+                    # Same key, else the slot that expires first (empty slots expire at 0)
+                    offset = match[0] if match is not None else min(
+                        offsets, key=lambda slot: self._SLOT_HEADER.unpack_from(data, slot)[1]
+                    )
+                    start = offset + self._SLOT_HEADER.size
+                    data[start:start + len(encoded) + len(value)] = encoded + value
+                    self._SLOT_HEADER.pack_into(data, offset, key_hash, expires_at, len(encoded), len(value))
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def clear(self):
+        with self._lock:
+            data = self._mapped()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                empty = bytes(self._SLOT_HEADER.size)
+                for slot in range(self.slots):
+                    offset = self._FILE_HEADER.size + slot * self.slot_size
+                    data[offset:offset + len(empty)] = empty
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+
+class NetworkStore:
+    """Store backed by a Redis-compatible network cache, shared across hosts
+
+    The client needs mget, pipeline().set(key, value, px=...), scan_iter
+    and delete. Cache outages degrade to misses rather than failed requests.
+    """
+
+    def __init__(self, client, prefix='esg:'):
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        try:
+            values = self.client.mget([self.prefix + key for key in keys])
+        except Exception:
+            self.errors += 1
+            return {}
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, values, ttl):
+        if not values:
+            return
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipeline.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+            pipeline.execute()
+        except Exception:
+            self.errors += 1
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class LocalClient:
+    """In-process stand-in for the subset of the Redis client NetworkStore uses"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def mget(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            entries = [self._live(key, now) for key in keys]
+        return [entry[0] if entry is not None else None for entry in entries]
+
+    def set(self, key, value, px):
+        with self._lock:
+            self._entries[key] = (bytes(value), time.monotonic() + px / 1000)
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+    def scan_iter(self, match='*'):
+        with self._lock:
+            keys = [key for key in self._entries if fnmatch.fnmatchcase(key, match)]
+        return iter(keys)
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._entries.pop(key, None) is not None for key in keys)
+
+
+class _LocalPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, px):
+        self.commands.append((key, value, px))
+
+    def execute(self):
+        for command in self.commands:
+            self.client.set(*command)
+        self.commands = []
+
+
+def create_store(url=SHARED_CACHE_URL):
+    """Shared store for a cache URL, or None when workers should cache alone"""
+    if not url:
+        return None
+    if url == 'local':
+        return NetworkStore(LocalClient())
+    if url == 'mmap' or url.startswith('mmap://'):
+        # By default one file per database, so unrelated deployments on a host never share entries
+        database = hashlib.sha1(DATABASE_URL.encode()).hexdigest()[:12]
+        path = url[len('mmap://'):] or os.path.join(_DEFAULT_MMAP_DIR, f'esg-shared-cache-{database}')
+        return MmapStore(path)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise ValueError('a redis:// shared cache requires the redis package to be installed')
+        return NetworkStore(redis.Redis.from_url(url))
+    raise ValueError('ESG_SHARED_CACHE must be empty, local, mmap[://path] or a redis:// URL')
+
+
+shared_store = create_store()
@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional: without it only pre-generated .br files are served as brotli
+    brotli = None
+
+# Built frontend to serve; defaults to the app's static folder
+STATIC_DIR = os.environ.get('ESG_STATIC_DIR', '')
+
+# Smaller files are not worth a compressed variant
+MIN_COMPRESS_BYTES = 1024
+
+# Hashed bundle names (Vite: assets/index-BmxJnJta.js) never change content, so caches keep them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+# Vite's default [name]-[hash][extname]: exactly 8 base64url characters. Used only for builds
+# without a manifest, since a hand-named file can still look like this
+_HASHED_ASSET = re.compile(r'^assets/[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+# Written by `vite build` with build.manifest; lists every file it named by content hash
+VITE_MANIFEST = '.vite/manifest.json'
+_BUILD_METADATA_DIR = '.vite'
+
+_COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+    'image/vnd.microsoft.icon'
+)
+_VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _compressible(mimetype):
+    return mimetype.startswith(_COMPRESSIBLE_TYPES)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _manifest_files(directory):
+    """Files a Vite build manifest lists as content-hashed, or None if the build has no manifest"""
+    path = os.path.join(directory, VITE_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        chunks = json.load(f).values()
+    files = set()
+    for chunk in chunks:
+        files.add(chunk['file'])
+        files.update(chunk.get('css', ()))
+        files.update(chunk.get('assets', ()))
+    return files
+
+
+class StaticAsset:
+    """One file of the built frontend, with its encoded variants held in memory"""
+
+    __slots__ = ('mimetype', 'etag', 'cache_control', 'bodies')
+
+    def __init__(self, mimetype, etag, cache_control, bodies):
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        # Content-Encoding -> body; 'identity' is always present
+        self.bodies = bodies
+
+
+class StaticSite:
+    """In-memory manifest of a built single-page app
+
+    Every file is read once at startup. Requests are answered from the
+    manifest: the best encoding the client accepts, long-lived caching for
+    hashed assets, and index.html for extensionless paths (client-side
+    routes), with no filesystem access or exceptions per request.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.assets = {}
+        if os.path.isdir(directory):
+            self._load()
+        self.index = self.assets.get('index.html')
+
+    def _load(self):
+        hashed = _manifest_files(self.directory)
+        for root, dirs, files in os.walk(self.directory):
+            # Build metadata is read above, not served
+            dirs[:] = [name for name in dirs if name != _BUILD_METADATA_DIR]
+            for filename in files:
+                path = os.path.join(root, filename)
+                base, extension = os.path.splitext(path)
+                # Pre-generated variants are loaded with the file they encode
+                if extension in _VARIANT_SUFFIXES.values() and os.path.exists(base):
+                    continue
+                relative = os.path.relpath(path, self.directory).replace(os.sep, '/')
+                immutable = relative in hashed if hashed is not None else bool(_HASHED_ASSET.match(relative))
+                self.assets[relative] = self._asset(path, immutable)
+
+    def _asset(self, path, immutable):
+        body = _read(path)
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        bodies = {'identity': body}
+        if _compressible(mimetype) and len(body) >= MIN_COMPRESS_BYTES:
+            for encoding, suffix in _VARIANT_SUFFIXES.items():
+                if os.path.exists(path + suffix):
+                    bodies[encoding] = _read(path + suffix)
+            # Variants that were not generated at build time are compressed once, here
+            if 'br' not in bodies and brotli is not None:
+                bodies['br'] = brotli.compress(body)
+            if 'gzip' not in bodies:
+                bodies['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            # Only keep variants that are actually smaller
+            bodies = {
+                encoding: encoded for encoding, encoded in bodies.items()
+                if encoding == 'identity' or len(encoded) < len(body)
+            }
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return StaticAsset(mimetype, hashlib.sha1(body).hexdigest(), cache_control, bodies)
+
+    def resolve(self, path):
+        """Asset for a request path: the file itself, index.html for app routes, else None"""
+        path = path.strip('/') or 'index.html'
+        asset = self.assets.get(path)
+        if asset is not None:
+            return asset
+        # A missing file (anything with an extension) is a 404, not the HTML shell
+        if '.' in path.rsplit('/', 1)[-1]:
+            return None
+        return self.index
+
+    def response(self, asset):
+        """Response for the current request, negotiating Content-Encoding"""
+        encoding = 'identity'
+        if len(asset.bodies) > 1:
+            encoding = request.accept_encodings.best_match(
+                [name for name in ('br', 'gzip') if name in asset.bodies] + ['identity'],
+                default='identity'
+            )
+        response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if len(asset.bodies) > 1:
+            response.vary.add('Accept-Encoding')
+        # Each encoding is a different representation, so it gets its own validator
+        response.set_etag(asset.etag if encoding == 'identity' else f'{asset.etag}-{encoding}')
+        response.headers['Cache-Control'] = asset.cache_control
+        return response.make_conditional(request)
+
+
+def precompress(directory):
+    """Write .gz (and, with brotli installed, .br) files next to every compressible file"""
+    written = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [name for name in dirs if name != _BUILD_METADATA_DIR]
+        for filename in files:
+            path = os.path.join(root, filename)
+            mimetype = mimetypes.guess_type(path)[0] or ''
+            if path.endswith(tuple(_VARIANT_SUFFIXES.values())) or not _compressible(mimetype):
+                continue
+            body = _read(path)
+            if len(body) < MIN_COMPRESS_BYTES:
+                continue
+            variants = {'.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['.br'] = brotli.compress(body)
+            for suffix, encoded in variants.items():
+                with open(path + suffix, 'wb') as f:
+                    f.write(encoded)
+                written += 1
+    return written
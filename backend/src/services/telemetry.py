@@ -0,0 +1,317 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from services.analysis_cache import analysis_cache
+from services.analysis_jobs import analysis_jobs
+from services.json_codec import FastJSONProvider
+from services.live_updates import broadcaster
+from services.response_cache import response_cache
+
+# Instrumentation is off unless enabled; when off no hooks are installed at all
+METRICS_ENABLED = os.environ.get('ESG_METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+# Sampling profiler for slow requests, off unless a threshold is set
+PROFILE_SLOW_MS = float(os.environ.get('ESG_PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('ESG_PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.environ.get('ESG_PROFILE_DIR', 'profiles')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(series):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += bucket_count
+                le = _labels((*self.label_names, 'le'), (*labels, bound if bound == '+Inf' else repr(float(bound))))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{base} {total}')
+            lines.append(f'{self.name}_count{base} {count}')
+        return lines
+
+
+class LabeledCounter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in values)
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _gauge(name, help_text, value, metric_type='gauge'):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}', f'{name} {value}']
+
+
+request_latency = Histogram(
+    'esg_http_request_duration_seconds', 'Time spent handling a request', ('method', 'route')
+)
+requests_total = LabeledCounter(
+    'esg_http_requests_total', 'Requests handled, by response status', ('method', 'route', 'status')
+)
+request_db_queries = Histogram(
+    'esg_request_db_queries', 'Database queries issued per request', ('route',), QUERY_COUNT_BUCKETS
+)
+request_db_seconds = Histogram(
+    'esg_request_db_seconds', 'Time spent in database queries per request', ('route',)
+)
+serialization_seconds = Histogram(
+    'esg_serialization_seconds', 'Time spent encoding JSON response bodies'
+)
+
+
+class RequestStats:
+    """Counters accumulated over one request"""
+
+    __slots__ = ('db_queries', 'db_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+
+_current_stats = ContextVar('esg_request_stats', default=None)
+
+
+def start_request():
+    """Begin collecting per-request stats in the current context"""
+    stats = RequestStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def finish_request(method, route, status, elapsed, stats):
+    """Record one finished request"""
+    request_latency.observe(elapsed, (method, route))
+    requests_total.inc((method, route, str(status)))
+    if stats is not None:
+        request_db_queries.observe(stats.db_queries, (route,))
+        request_db_seconds.observe(stats.db_seconds, (route,))
+    _current_stats.set(None)
+
+
+def observe_serialization(seconds):
+    serialization_seconds.observe(seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context: a statement that raises leaves nothing behind on the connection
+    context._esg_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = context._esg_query_started
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+class InstrumentedJSONProvider(FastJSONProvider):
+    """Flask JSON provider that records how long encoding takes"""
+
+    def encode(self, obj):
+        started = time.perf_counter()
+        try:
+            return super().encode(obj)
+        finally:
+            observe_serialization(time.perf_counter() - started)
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and dumps the slow ones
+
+    Output is one collapsed stack per line ("frame;frame;frame count"),
+    ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_MS, interval_ms=PROFILE_INTERVAL_MS, output_dir=PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.output_dir = output_dir
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def begin(self):
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._sample, name='esg-profiler', daemon=True)
+                self._thread.start()
+            self._wakeup.set()
+
+    def end(self, label, elapsed):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and elapsed >= self.threshold:
+            self._dump(label, elapsed, samples)
+
+    def _sample(self):
+        while True:
+            self._wakeup.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+                if not self._active:
+                    # Sleep until the next request begins
+                    self._wakeup.clear()
+            del frames
+            time.sleep(self.interval)
+
+    def _dump(self, label, elapsed, samples):
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{int(elapsed * 1000)}ms-{label}.folded"
+        path = os.path.join(self.output_dir, ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name))
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+profiler = SlowRequestProfiler() if PROFILE_SLOW_MS > 0 else None
+
+
+def install_db_hooks():
+    """Count queries and their time on every engine, sync or async"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app):
+    """Install request, query and serialization instrumentation if enabled"""
+    if not METRICS_ENABLED and profiler is None:
+        return
+
+    if METRICS_ENABLED:
+        install_db_hooks()
+        app.json = InstrumentedJSONProvider(app)
+
+    @app.before_request
+    def begin_request_metrics():
+        g.esg_request_started = time.perf_counter()
+        if METRICS_ENABLED:
+            g.esg_request_stats = start_request()
+        if profiler is not None:
+            profiler.begin()
+
+    @app.after_request
+    def record_request_metrics(response):
+        elapsed = time.perf_counter() - g.esg_request_started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        if METRICS_ENABLED:
+            finish_request(request.method, route, response.status_code, elapsed, g.esg_request_stats)
+        if profiler is not None:
+            profiler.end(f'{request.method}{route}', elapsed)
+        return response
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    hits, misses = response_cache.hits, response_cache.misses
+    lines = []
+    for metric in (request_latency, requests_total, request_db_queries, request_db_seconds, serialization_seconds):
+        lines.extend(metric.render())
+    lines.extend(_gauge('esg_response_cache_hits_total', 'Response cache hits', hits, 'counter'))
+    lines.extend(_gauge('esg_response_cache_misses_total', 'Response cache misses', misses, 'counter'))
+    lines.extend(_gauge(
+        'esg_response_cache_hit_ratio', 'Response cache hits over lookups since start',
+        round(hits / (hits + misses), 4) if hits + misses else 0
+    ))
+    lines.extend(_gauge(
+        'esg_response_cache_shared_hits_total', 'Response cache hits served from the shared cache',
+        response_cache.shared_hits, 'counter'
+    ))
+    lines.extend(_gauge('esg_response_cache_entries', 'Responses currently cached', len(response_cache)))
+    lines.extend(_gauge('esg_analysis_cache_hits_total', 'Memoized analysis hits', analysis_cache.hits, 'counter'))
+    lines.extend(_gauge(
+        'esg_analysis_cache_misses_total', 'Analyses that had to be computed', analysis_cache.misses, 'counter'
+    ))
+    lines.extend(_gauge('esg_analysis_queue_depth', 'Analysis jobs not yet finished', analysis_jobs.queue_depth()))
+    lines.extend(_gauge(
+        'esg_analysis_coalesced_total', 'Analysis requests that joined an in-flight job',
+        analysis_jobs.coalesced, 'counter'
+    ))
+    lines.extend(_gauge(
+        'esg_analysis_rejected_total', 'Analysis requests refused because the queue was full',
+        analysis_jobs.rejected, 'counter'
+    ))
+    lines.extend(_gauge('esg_stream_clients', 'Connected live update stream clients', len(broadcaster)))
+    lines.extend(_gauge(
+        'esg_stream_dropped_total', 'Stream clients disconnected for falling behind', broadcaster.dropped, 'counter'
+    ))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from models.esg_score_history import (
+    ESGScoreHistory, ESGScoreRollup, ROLLUP_GRANULARITIES, SCOPE_ALL, SCOPE_SECTOR,
+    SCOPE_SYMBOL, DAY, WEEK, MONTH, period_start
+)
+
+# Upper bound on periods per response, so any request reads a bounded number of rows
+MAX_POINTS = 1000
+
+# Range served when the client does not pass start/end
+DEFAULT_SPAN = {
+    DAY: timedelta(days=30),
+    WEEK: timedelta(weeks=12),
+    MONTH: timedelta(days=150)
+}
+
+_PERIOD_DAYS = {DAY: 1, WEEK: 7, MONTH: 28}
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an ISO date (YYYY-MM-DD)')
+
+
+def _point(start, samples, environmental, social, governance, overall):
+    return {
+        'period': start.isoformat(),
+        'month': start.strftime('%b'),
+        'environmental': round(environmental / samples, 1),
+        'social': round(social / samples, 1),
+        'governance': round(governance / samples, 1),
+        'overall': round(overall / samples, 1),
+        'samples': samples
+    }
+
+
+def _daily_symbol_points(session, symbol, start, end):
+    # No daily rollup per symbol: fold the raw snapshots, which are bounded by the range
+    rows = session.execute(
+        select(
+            ESGScoreHistory.recorded_at, ESGScoreHistory.environmental, ESGScoreHistory.social,
+            ESGScoreHistory.governance, ESGScoreHistory.overall
+        )
+        .where(ESGScoreHistory.symbol == symbol)
+        .where(ESGScoreHistory.recorded_at >= datetime.combine(start, datetime.min.time()))
+        .where(ESGScoreHistory.recorded_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        .order_by(ESGScoreHistory.recorded_at)
+    ).all()
+
+    totals = {}
+    for recorded_at, environmental, social, governance, overall in rows:
+        day = recorded_at.date()
+        current = totals.get(day, (0, 0.0, 0.0, 0.0, 0.0))
+        totals[day] = (
+            current[0] + 1, current[1] + environmental, current[2] + social,
+            current[3] + governance, current[4] + overall
+        )
+    return [_point(day, *sums) for day, sums in sorted(totals.items())]
+
+
+def score_trends(session, granularity=MONTH, symbol=None, sector=None, start=None, end=None):
+    """Mean pillar scores per period for the universe, a sector or a symbol"""
+    if granularity not in (DAY, WEEK, MONTH):
+        raise ValueError('granularity must be one of day, week, month')
+    if symbol and sector:
+        raise ValueError('Pass either symbol or sector, not both')
+
+    end = _parse_date(end, 'end') if end else datetime.utcnow().date()
+    start = _parse_date(start, 'start') if start else end - DEFAULT_SPAN[granularity]
+    start = period_start(start, granularity)
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days // _PERIOD_DAYS[granularity] + 1 > MAX_POINTS:
+        raise ValueError(f'Requested range spans more than {MAX_POINTS} {granularity} periods')
+
+    if symbol:
+        scope, scope_key = SCOPE_SYMBOL, symbol.upper()
+    elif sector:
+        scope, scope_key = SCOPE_SECTOR, sector
+    else:
+        scope, scope_key = SCOPE_ALL, ''
+
+    if granularity not in ROLLUP_GRANULARITIES[scope]:
+        return _daily_symbol_points(session, scope_key, start, end)
+
+    rollups = session.execute(
+        select(
+            ESGScoreRollup.period_start, ESGScoreRollup.samples, ESGScoreRollup.environmental_total,
+            ESGScoreRollup.social_total, ESGScoreRollup.governance_total, ESGScoreRollup.overall_total
+        )
+        .where(ESGScoreRollup.scope == scope)
+        .where(ESGScoreRollup.scope_key == scope_key)
+        .where(ESGScoreRollup.granularity == granularity)
+        .where(ESGScoreRollup.period_start >= start)
+        .where(ESGScoreRollup.period_start <= end)
+        .order_by(ESGScoreRollup.period_start)
+    ).all()
+    return [_point(*row) for row in rollups if row.samples]
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# The app reads its configuration at import time: point it at a throwaway database first
+_DB_DIR = tempfile.mkdtemp(prefix='esg-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'esg.db')}"
+os.environ.setdefault('ESG_ANALYSIS_DELAY', '0')
+os.environ.setdefault('ESG_SHARED_CACHE', '')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
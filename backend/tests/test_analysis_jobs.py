@@ -0,0 +1,33 @@
+from main import app
+from routes import esg
+
+
+def test_analyze_answers_inline_without_prefer():
+    response = app.test_client().post('/api/esg/analyze', json={'symbol': 'SYNC1'})
+
+    assert response.status_code == 200
+    assert response.get_json()['symbol'] == 'SYNC1'
+    assert 'overall' in response.get_json()['scores']
+
+
+def test_analyze_returns_job_when_client_prefers_async(monkeypatch):
+    monkeypatch.setattr(esg, 'ANALYSIS_DELAY_SECONDS', 0.5)
+    client = app.test_client()
+
+    response = client.post('/api/esg/analyze', json={'symbol': 'ASYNC1'}, headers={'Prefer': 'respond-async'})
+
+    assert response.status_code == 202
+    assert response.headers['Retry-After'] == '1'
+    job = response.get_json()
+    assert response.headers['Location'] == job['status_url']
+
+    result = client.get(f"{job['status_url']}?wait=5")
+    assert result.status_code == 200
+    assert result.get_json()['symbol'] == 'ASYNC1'
+
+
+def test_inline_wait_reads_prefer_tokens():
+    assert esg.inline_wait('respond-async, wait=5') == 0
+    assert esg.inline_wait('handling=lenient; Respond-Async') == 0
+    assert esg.inline_wait(None) == esg.MAX_ANALYSIS_WAIT_SECONDS
+    assert esg.inline_wait('return=minimal') == esg.MAX_ANALYSIS_WAIT_SECONDS
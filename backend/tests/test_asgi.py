@@ -0,0 +1,24 @@
+import asyncio
+
+import httpx
+
+import asgi
+
+
+def _post(path, body):
+    async def request():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.post(path, json=body)
+    return asyncio.run(request())
+
+
+def test_unexpected_analyze_error_is_a_json_500(monkeypatch):
+    def fail(symbol):
+        raise RuntimeError('connection pool exhausted')
+    monkeypatch.setattr(asgi, 'cached_analysis', fail)
+
+    response = _post('/api/esg/analyze', {'symbol': 'AAPL'})
+
+    assert response.status_code == 500
+    assert response.json() == {'error': 'connection pool exhausted'}
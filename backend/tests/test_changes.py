@@ -0,0 +1,73 @@
+from sqlalchemy import delete, update
+
+from database.config import SessionLocal, engine, init_db
+from main import app
+from models.esg_company import ESGCompany
+from models.esg_company_change import ESGChangeCounter, current_sequence
+from services.changes import encode_cursor
+
+
+def _company(symbol, score=50.0):
+    return ESGCompany(
+        symbol=symbol, name=f'{symbol} Co', sector='Technology',
+        environmental_score=score, social_score=score, governance_score=score, overall_score=score
+    )
+
+
+def _sync(client, cursor=None, limit=2):
+    """Follow has_more to the end: (upserted symbols, deleted symbols, final cursor)"""
+    upserted, deleted = [], []
+    while True:
+        query = f'?limit={limit}' + (f'&since={cursor}' if cursor else '')
+        response = client.get('/api/esg/changes' + query)
+        assert response.status_code == 200
+        payload = response.get_json()
+        upserted += [company['symbol'] for company in payload['upserted']]
+        deleted += payload['deleted']
+        cursor = payload['cursor']
+        if not payload['has_more']:
+            return upserted, deleted, cursor
+
+
+def test_full_sync_then_deltas_in_commit_order():
+    init_db()
+    client = app.test_client()
+    session = SessionLocal()
+    session.add_all([_company('CHA'), _company('CHB'), _company('CHC')])
+    session.commit()
+
+    upserted, _, cursor = _sync(client)
+    assert {'CHA', 'CHB', 'CHC'} <= set(upserted)
+    assert _sync(client, cursor) == ([], [], cursor)
+
+    session.query(ESGCompany).filter_by(symbol='CHA').one().overall_score = 90.0
+    session.commit()
+    session.execute(delete(ESGCompany).where(ESGCompany.symbol == 'CHB'))
+    session.commit()
+    session.add(_company('CHB', 60.0))
+    session.delete(session.query(ESGCompany).filter_by(symbol='CHC').one())
+    session.commit()
+    session.close()
+
+    upserted, deleted, _ = _sync(client, cursor, limit=1)
+    assert upserted == ['CHA', 'CHB']
+    assert deleted == ['CHC']
+
+
+def test_invalid_cursor_is_rejected():
+    assert app.test_client().get('/api/esg/changes?since=not-a-cursor').status_code == 400
+
+
+def test_cursor_inside_a_pruned_sequence_has_expired():
+    init_db()
+    client = app.test_client()
+    with engine.begin() as connection:
+        pruned_through = current_sequence(connection)[0] + 5
+        connection.execute(update(ESGChangeCounter.__table__).values(pruned_through=pruned_through))
+    try:
+        assert client.get(f'/api/esg/changes?since={encode_cursor(pruned_through, "AAPL")}').status_code == 410
+        assert client.get(f'/api/esg/changes?since={encode_cursor(pruned_through - 1)}').status_code == 410
+        assert client.get(f'/api/esg/changes?since={encode_cursor(pruned_through)}').status_code == 200
+    finally:
+        with engine.begin() as connection:
+            connection.execute(update(ESGChangeCounter.__table__).values(pruned_through=0))
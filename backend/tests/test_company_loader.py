@@ -0,0 +1,63 @@
+import csv
+
+import pytest
+
+from database.config import engine
+from load_companies import load_companies
+from models.esg_company import ESGCompany
+from models.esg_company_tag import MAX_TAG_LENGTH
+from services.company_loader import normalize
+from sqlalchemy import select
+
+RECORD = {
+    'symbol': 'GOOD',
+    'name': 'Good Co',
+    'sector': 'Technology',
+    'environmental_score': '80',
+    'social_score': '70',
+    'governance_score': '90'
+}
+
+
+@pytest.mark.parametrize('column', ['environmental_score', 'social_score', 'overall_score', 'renewable_energy_percentage'])
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', '150', '-1'])
+def test_normalize_rejects_non_finite_and_out_of_range_scores(column, value):
+    with pytest.raises(ValueError):
+        normalize({**RECORD, column: value})
+
+
+def test_normalize_accepts_bounds():
+    row = normalize({**RECORD, 'environmental_score': '0', 'renewable_energy_percentage': '100'})
+    assert row['environmental_score'] == 0.0
+    assert row['renewable_energy_percentage'] == 100.0
+
+
+def test_load_skips_non_finite_rows(tmp_path):
+    path = tmp_path / 'companies.csv'
+    rows = [
+        RECORD,
+        {**RECORD, 'symbol': 'NAN', 'environmental_score': 'nan'},
+        {**RECORD, 'symbol': 'INF', 'social_score': 'inf'},
+        {**RECORD, 'symbol': 'BIG', 'governance_score': '1e9'}
+    ]
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(RECORD))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    loaded, skipped = load_companies(str(path), chunk_size=2, snapshot=False)
+
+    assert (loaded, skipped) == (1, 3)
+    with engine.connect() as connection:
+        symbols = connection.execute(
+            select(ESGCompany.symbol).where(ESGCompany.symbol.in_(['GOOD', 'NAN', 'INF', 'BIG']))
+        ).scalars().all()
+    assert symbols == ['GOOD']
+
+
+def test_normalize_rejects_overlong_tags():
+    with pytest.raises(ValueError, match='key_initiatives'):
+        normalize({**RECORD, 'key_initiatives': 'Short|' + 'x' * (MAX_TAG_LENGTH + 1)})
+
+    row = normalize({**RECORD, 'sustainability_goals': ['x' * MAX_TAG_LENGTH, 'Net zero']})
+    assert row['sustainability_goals'] == 'x' * MAX_TAG_LENGTH + '|Net zero'
@@ -0,0 +1,61 @@
+import os
+import time
+
+from database.config import init_db
+from services.company_table import SNAPSHOT_GRACE_SECONDS, CompanyTable, CompanyTableCache
+
+
+def _table(symbols, fingerprint):
+    count = len(symbols)
+    return CompanyTable.from_columns([
+        symbols, [f'{symbol} Co' for symbol in symbols], ['Technology'] * count, [70.0] * count,
+        [70.0] * count, [70.0] * count, [70.0] * count, [False] * count, [0.0] * count, [None] * count,
+        [None] * count
+    ], fingerprint)
+
+
+def test_save_swaps_a_link_to_a_complete_version(tmp_path):
+    directory = str(tmp_path / 'companies')
+
+    first = _table(['AAA'], [1, 1, None]).save(directory)
+    assert os.path.realpath(directory) == os.path.realpath(first)
+    assert CompanyTable.open(directory).row('AAA') == 0
+
+    second = _table(['AAA', 'BBB'], [2, 2, None]).save(directory)
+    assert os.path.realpath(directory) == os.path.realpath(second)
+    assert CompanyTable.open(directory).row('BBB') == 1
+    # Kept for readers that resolved the link just before the swap
+    assert CompanyTable.open(first).row('BBB') == -1
+
+
+def test_save_removes_versions_past_their_grace_period(tmp_path):
+    directory = str(tmp_path / 'companies')
+    first = _table(['AAA'], [1, 1, None]).save(directory)
+    stale = time.time() - SNAPSHOT_GRACE_SECONDS - 1
+    os.utime(first, (stale, stale))
+
+    second = _table(['AAA', 'BBB'], [2, 2, None]).save(directory)
+    assert sorted(os.listdir(tmp_path)) == sorted(['companies', os.path.basename(second)])
+
+
+def test_save_replaces_a_snapshot_directory_from_before_versioning(tmp_path):
+    directory = tmp_path / 'companies'
+    directory.mkdir()
+    (directory / 'meta.json').write_text('{}')
+
+    _table(['AAA'], [1, 1, None]).save(str(directory))
+    assert os.path.islink(directory)
+    assert CompanyTable.open(str(directory)).row('AAA') == 0
+
+
+def test_unreadable_snapshot_falls_back_to_the_database(tmp_path):
+    init_db()
+    directory = tmp_path / 'companies'
+    (tmp_path / 'companies.broken').mkdir()
+    (tmp_path / 'companies.broken' / 'meta.json').write_text('not json')
+    os.symlink('companies.broken', directory)
+    cache = CompanyTableCache(snapshot_dir=str(directory))
+
+    table = cache.get()
+    assert table.fingerprint is not None
+    assert CompanyTable.open(str(directory)).fingerprint == table.fingerprint
@@ -0,0 +1,36 @@
+import pytest
+
+from main import app
+from services.company_table import CompanyTable, company_tables
+
+
+@pytest.fixture
+def empty_table(monkeypatch):
+    table = CompanyTable.from_columns([[] for _ in range(11)])
+    monkeypatch.setattr(company_tables, 'get', lambda: table)
+    return table
+
+
+def test_rows_of_empty_table_are_not_found(empty_table):
+    assert empty_table.rows(['AAPL', 'MSFT']).tolist() == [-1, -1]
+    assert empty_table.row('AAPL') == -1
+
+
+def test_batch_analysis_against_empty_table(empty_table):
+    response = app.test_client().post('/api/esg/analyze/batch', json={'symbols': ['AAPL', 'ZZZZ']})
+
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 2
+    assert payload['failed'] == 0
+
+
+def test_portfolio_against_empty_table(empty_table):
+    response = app.test_client().post('/api/esg/portfolio', json={'holdings': [['AAPL', 1], ['MSFT', 2]]})
+
+    assert response.status_code == 200
+    portfolio = response.get_json()['portfolios'][0]
+    assert portfolio['matched'] == 0
+    assert portfolio['coverage'] == 0
+    assert portfolio['sectors'] == []
+    assert portfolio['unmatched'] == ['AAPL', 'MSFT']
@@ -0,0 +1,43 @@
+import json
+import math
+
+import numpy as np
+
+from services import json_codec
+
+
+def _strict_loads(text):
+    # json.loads accepts NaN/Infinity by default; real clients do not
+    def reject(name):
+        raise AssertionError(f'{name} is not valid JSON')
+    return json.loads(text, parse_constant=reject)
+
+
+def test_encode_rows_writes_non_finite_floats_as_null():
+    rows = json_codec.encode_rows({
+        'symbol': ['A', 'B', 'C', 'D'],
+        'score': [1.5, math.nan, math.inf, -math.inf]
+    })
+
+    assert [_strict_loads(row)['score'] for row in rows] == [1.5, None, None, None]
+
+
+def test_encode_rows_keeps_ints_and_nulls():
+    rows = json_codec.encode_rows({'count': [None, 3, 0]})
+
+    assert [_strict_loads(row)['count'] for row in rows] == [None, 3, 0]
+
+
+def test_encode_rows_unwraps_numpy_scalars():
+    rows = json_codec.encode_rows({
+        'score': [np.float64(1.5), np.float32(2.5), np.float64('nan'), 4.0],
+        'count': [np.int64(3), 4, None, np.int32(5)],
+        'flag': [True, np.bool_(False), None, False]
+    })
+
+    assert [_strict_loads(row) for row in rows] == [
+        {'score': 1.5, 'count': 3, 'flag': True},
+        {'score': 2.5, 'count': 4, 'flag': False},
+        {'score': None, 'count': None, 'flag': None},
+        {'score': 4.0, 'count': 5, 'flag': False}
+    ]
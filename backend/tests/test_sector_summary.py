@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import delete, insert, select, update
+
+from database.config import SessionLocal, engine, init_db
+from models.esg_company import ESGCompany
+from models.esg_sector_summary import ESGSectorSummary, rebuild_sector_summaries
+from services import aggregates
+
+
+def _company(symbol, sector, score):
+    return {
+        'symbol': symbol, 'name': f'{symbol} Co', 'sector': sector, 'environmental_score': score,
+        'social_score': score, 'governance_score': score, 'overall_score': score, 'carbon_neutral': score >= 80
+    }
+
+
+def _summary_state(session):
+    rows = session.execute(select(ESGSectorSummary.__table__)).mappings().all()
+    return {
+        row['sector']: {name: pytest.approx(value) for name, value in row.items()}
+        for row in rows if row['companies_count'] > 0
+    }
+
+
+@pytest.fixture
+def session():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def test_bulk_writes_apply_the_same_deltas_as_a_rebuild(session):
+    session.execute(insert(ESGCompany), [
+        _company('SSA', 'Summary A', 90.0), _company('SSB', 'Summary A', 70.0), _company('SSC', 'Summary B', 50.0)
+    ])
+    session.execute(update(ESGCompany).where(ESGCompany.symbol == 'SSA').values(overall_score=60.0))
+    session.execute(update(ESGCompany), [{'id': session.scalar(select(ESGCompany.id).filter_by(symbol='SSC')),
+                                          'sector': 'Summary A'}])
+    session.execute(delete(ESGCompany).where(ESGCompany.symbol == 'SSB'))
+    incremental = _summary_state(session)
+
+    rebuild_sector_summaries(session.connection())
+    assert incremental == _summary_state(session)
+    assert incremental['Summary A']['leader_symbol'] == 'SSA'
+    assert 'Summary B' not in incremental
+
+
+def test_metrics_read_leaders_from_the_summary_rows(session):
+    session.add_all([ESGCompany(**_company('SSX', 'Summary X', 75.0)), ESGCompany(**_company('SSY', 'Summary X', 75.0))])
+    session.flush()
+    session.execute(update(ESGCompany).where(ESGCompany.symbol == 'SSX').values(overall_score=95.0))
+
+    leaders = {leader['sector']: leader for leader in aggregates.esg_metrics(session)['sector_leaders']}
+    assert leaders['Summary X'] == {'sector': 'Summary X', 'leader': 'SSX', 'score': 95.0}
+
+    session.delete(session.scalars(select(ESGCompany).filter_by(symbol='SSX')).one())
+    session.flush()
+    leaders = {leader['sector']: leader for leader in aggregates.esg_metrics(session)['sector_leaders']}
+    assert leaders['Summary X']['leader'] == 'SSY'
+
+
+def test_init_db_backfills_summaries_of_a_preloaded_table():
+    init_db()
+    with engine.begin() as connection:
+        connection.execute(delete(ESGSectorSummary.__table__))
+        # Core inserts skip the ORM hooks, as a table loaded before the summary existed would
+        connection.execute(insert(ESGCompany.__table__), [_company('SSP', 'Summary P', 88.0)])
+
+    init_db()
+    session = SessionLocal()
+    try:
+        summary = session.get(ESGSectorSummary, 'Summary P')
+        assert (summary.companies_count, summary.leader_symbol, summary.excellent_count) == (1, 'SSP', 1)
+    finally:
+        session.execute(delete(ESGCompany).where(ESGCompany.symbol == 'SSP'))
+        session.commit()
+        session.close()
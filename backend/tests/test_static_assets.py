@@ -0,0 +1,37 @@
+import json
+
+from services.static_assets import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticSite
+
+
+def _build(tmp_path, files, manifest=None):
+    for name in ['index.html', *files]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    if manifest is not None:
+        (tmp_path / '.vite').mkdir()
+        (tmp_path / '.vite' / 'manifest.json').write_text(json.dumps(manifest))
+    return StaticSite(str(tmp_path))
+
+
+def test_only_vite_hash_names_are_immutable_without_a_manifest(tmp_path):
+    site = _build(tmp_path, [
+        'assets/index-BmxJnJta.js', 'assets/index-DSecUvET.css', 'assets/logo-whitebg.png',
+        'assets/logo-whitebackground.png', 'assets/brand.v2-final.svg'
+    ])
+
+    immutable = {path for path, asset in site.assets.items() if asset.cache_control == IMMUTABLE_CACHE_CONTROL}
+    assert immutable == {'assets/index-BmxJnJta.js', 'assets/index-DSecUvET.css'}
+    assert site.assets['index.html'].cache_control == REVALIDATE_CACHE_CONTROL
+
+
+def test_manifest_decides_which_assets_are_immutable(tmp_path):
+    site = _build(tmp_path, ['assets/index-BmxJnJta.js', 'assets/index-DSecUvET.css', 'assets/brand-darkmode.png'], {
+        'index.html': {'file': 'assets/index-BmxJnJta.js', 'css': ['assets/index-DSecUvET.css'], 'isEntry': True}
+    })
+
+    assert site.assets['assets/index-BmxJnJta.js'].cache_control == IMMUTABLE_CACHE_CONTROL
+    assert site.assets['assets/index-DSecUvET.css'].cache_control == IMMUTABLE_CACHE_CONTROL
+    # Eight characters after a dash, but not a file the build hashed
+    assert site.assets['assets/brand-darkmode.png'].cache_control == REVALIDATE_CACHE_CONTROL
+    assert '.vite/manifest.json' not in site.assets
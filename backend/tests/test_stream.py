@@ -0,0 +1,31 @@
+import asyncio
+import threading
+
+from main import app
+from services import live_updates
+
+
+def test_wsgi_stream_points_at_asgi_server():
+    response = app.test_client().get('/api/esg/stream')
+
+    assert response.status_code == 501
+    assert 'ASGI' in response.get_json()['error']
+    assert len(live_updates.broadcaster) == 0
+
+
+def test_subscription_wakes_on_frame_pushed_from_another_thread():
+    async def receive():
+        subscription = live_updates.Subscription(asyncio.get_running_loop(), limit=2)
+        threading.Thread(target=subscription.push, args=(b'frame',)).start()
+        return await subscription.wait(timeout=5)
+
+    assert asyncio.run(receive()) == [b'frame']
+
+
+def test_subscription_closes_when_client_falls_behind():
+    async def overflow():
+        subscription = live_updates.Subscription(asyncio.get_running_loop(), limit=2)
+        pushed = [subscription.push(b'frame') for _ in range(3)]
+        return pushed, subscription.closed
+
+    assert asyncio.run(overflow()) == ([True, True, False], True)
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from services import telemetry
+
+
+def test_failed_statement_does_not_skew_later_query_timings():
+    telemetry.install_db_hooks()
+    engine = create_engine('sqlite://')
+    stats = telemetry.start_request()
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            connection.execute(text('SELECT 1'))
+
+            assert 'esg_query_started' not in connection.info
+    finally:
+        telemetry.finish_request('GET', '/test', 200, 0.0, stats)
+
+    assert stats.db_queries == 1
+    assert 0 <= stats.db_seconds < 1
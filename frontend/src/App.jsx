@@ -173,6 +173,8 @@ function App() {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          // Ask for the 202 job instead of having the server hold the request until the result is ready
+          'Prefer': 'respond-async',
         },
         body: JSON.stringify({ symbol: selectedCompany })
       })
@@ -181,7 +183,22 @@ function App() {
         throw new Error('Failed to analyze company')
       }
       
-      const data = await response.json()
+      let data = await response.json()
+      let status = response.status
+      let retryAfter = response.headers.get('Retry-After')
+      
+      // Analysis runs as a background job; poll its status URL until it completes.
+      // Short polls, not ?wait=: under a sync WSGI worker a long-poll would hold the worker.
+      while (status === 202 && data.job_id) {
+        await new Promise((resolve) => setTimeout(resolve, (Number(retryAfter) || 1) * 1000))
+        const jobResponse = await fetch(`${getApiUrl()}/${data.job_id}`)
+        if (!jobResponse.ok) {
+          throw new Error('Failed to analyze company')
+        }
+        data = await jobResponse.json()
+        status = jobResponse.status
+        retryAfter = jobResponse.headers.get('Retry-After')
+      }
       
       const results = {
         company: data.symbol,
@@ -7,6 +7,10 @@ import path from 'path'
 export default defineConfig({
   plugins: [react(),tailwindcss()],
   base: '/ESG-intelligence/',
+  build: {
+    // .vite/manifest.json tells the backend which files are content-hashed (cached as immutable)
+    manifest: true,
+  },
   resolve: {
     alias: {
       "@": path.resolve(__dirname, "./src"),